@@ -0,0 +1,177 @@
+"""Buffered activity log writer and cursor-paginated reads.
+
+Request handlers used to await an ``insert_one`` for every activity entry.
+``ActivityLogWriter.log`` only appends to an in-memory buffer; a background
+task writes the buffer with ``insert_many`` every ``flush_interval`` seconds,
+or sooner once ``batch_size`` entries are waiting.
+
+Reads page by keyset on ``(timestamp, id)`` instead of skip/limit, so every
+page is an index range scan however far back it is. Timestamps are stored
+as UTC ISO strings, which sort in time order.
+"""
+import asyncio
+import base64
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+
+# Newest first, ties broken by id so the order (and the cursor) is total
+SORT = [("timestamp", -1), ("id", -1)]
+FILTER_FIELDS = ('event_type', 'container_name', 'status')
+INDEXES = [SORT] + [[(field, 1)] + SORT for field in FILTER_FIELDS]
+DUPLICATE_KEY = 11000
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(f"{doc['timestamp']}|{doc['id']}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """``(timestamp, id)`` of the last entry of the previous page; raises ValueError"""
+    try:
+        timestamp, _, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not timestamp or not entry_id:
+        raise ValueError("invalid cursor")
+    return timestamp, entry_id
+
+
+def normalize_time(value: str) -> str:
+    """A user-supplied date/time as the stored UTC ISO form; naive values are taken as UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def build_query(cursor: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                **filters: Optional[str]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {field: value for field, value in filters.items() if value is not None}
+    timestamp: Dict[str, str] = {}
+    if since:
+        timestamp['$gte'] = normalize_time(since)
+    if until:
+        timestamp['$lt'] = normalize_time(until)
+    if timestamp:
+        query['timestamp'] = timestamp
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"timestamp": {"$lt": last_timestamp}},
+            {"timestamp": last_timestamp, "id": {"$lt": last_id}}
+        ]}]}
+    return query
+
+
+class ActivityLogWriter:
+    def __init__(self, collection, batch_size: int = 500, flush_interval: float = 0.5, max_buffer: int = 50000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.stats = {"logged": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._retry_delay = 0.0  # grows while MongoDB is failing, so errors aren't retried (and logged) every tick
+
+    def log(self, doc: Dict[str, Any]):
+        """Queue an entry; never waits on MongoDB"""
+        if len(self._buffer) >= self.max_buffer:
+            # MongoDB has been unreachable for a while; keep the newest entries
+            self._buffer.popleft()
+            self.stats['dropped'] += 1
+        self._buffer.append(doc)
+        self.stats['logged'] += 1
+        if len(self._buffer) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    async def ensure_indexes(self):
+        for keys in INDEXES:
+            await self.collection.create_index(keys)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch: List[Dict[str, Any]] = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                # insert_many gives each document an _id in place. Retried documents keep it, so
+                # any that a failed attempt did write come back as duplicate keys, not as copies
+                try:
+                    await self.collection.insert_many(batch, ordered=False)
+                except asyncio.CancelledError:
+                    self._buffer.extendleft(reversed(batch))
+                    raise
+                except BulkWriteError as e:
+                    failed = sorted({error['index'] for error in e.details.get('writeErrors', [])
+                                     if error.get('code') != DUPLICATE_KEY})
+                    self.stats['written'] += len(batch) - len(failed)
+                    if failed:
+                        self._failed(e, [batch[i] for i in failed])
+                        return
+                except Exception as e:
+                    self._failed(e, batch)
+                    return
+                else:
+                    self.stats['written'] += len(batch)
+                self._retry_delay = 0.0
+                self.stats['batches'] += 1
+
+    def _failed(self, error: Exception, docs: List[Dict[str, Any]]):
+        self.stats['errors'] += 1
+        self._retry_delay = min(max(self._retry_delay * 2, 1.0), 30.0)
+        logging.error(f"Error writing activity logs: {error}")
+        # Retry on the next flush, ahead of anything logged since
+        self._buffer.extendleft(reversed(docs))
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.pop()
+            self.stats['dropped'] += 1
+
+    async def page(self, limit: int = 50, cursor: Optional[str] = None, **filters) -> Dict[str, Any]:
+        """One page, newest first, plus the cursor for the next (older) page"""
+        if cursor is None and not self._retry_delay:
+            # The first page includes anything logged a moment ago, unless writes are backing off
+            await self.flush()
+        query = build_query(cursor=cursor, **filters)
+        logs = await self.collection.find(query, {"_id": 0}).sort(SORT).limit(limit).to_list(limit)
+        return {
+            "logs": logs,
+            "count": len(logs),
+            "next_cursor": encode_cursor(logs[-1]) if len(logs) == limit else None
+        }
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            if self._retry_delay:
+                await asyncio.sleep(self._retry_delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            await self.flush()
+
+    def status(self) -> Dict[str, Any]:
+        return {"buffered": len(self._buffer), "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval, **self.stats}
@@ -0,0 +1,453 @@
+"""Load-test the FastAPI app against a fake Docker daemon and an in-memory MongoDB.
+
+Serves N containers (with images and stats) from a stand-in Docker Engine API
+on localhost, swaps ``server.db`` for an in-memory stand-in that counts every
+operation, and drives the app in-process: ``GET /api/containers`` through an
+ASGI transport and K concurrent ``/ws`` connections through a minimal ASGI
+WebSocket client. For each container count it reports:
+
+- ``/api/containers`` latency (full rows with stats, and a ``fields`` page
+  without stats) and response size
+- ``/ws`` tick duration (from the app's own ``ws tick`` histogram), Docker API
+  requests, MongoDB operations and ``container_stats`` frame bytes per tick
+
+    python backend/benchmarks/bench_server.py --counts 10 100 1000 --clients 1 5
+    python backend/benchmarks/bench_server.py --stats-latency 0.05 --json after.json --compare before.json
+
+``--json`` writes the results; ``--compare`` prints the change against a
+previous ``--json`` file, so runs before and after a change are comparable.
+The app's lifespan isn't run, so no background task competes with the run;
+each fake daemon is handed to the app the way its Docker connector would.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# server.py reads these at import; the Motor client it creates is never used
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:1')
+os.environ.setdefault('DB_NAME', 'bench')
+
+import docker  # noqa: E402
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+from bench_stats_backends import API_VERSION, docker_stats_payload, fixture_container  # noqa: E402
+
+
+IMAGE_COUNT = 10
+
+
+# Fake Docker daemon
+def container_attrs(index: int) -> Dict[str, Any]:
+    """Inspect output for the index-th fixture container; every fifth one is stopped"""
+    c = fixture_container(index)
+    running = index % 5 != 4
+    image_id = f"sha256:{index % IMAGE_COUNT:064x}"
+    labels = {"com.docker.compose.project": f"stack-{index % 7}", "dockerwakeup.route": f"/app-{index}"}
+    network = {"NetworkID": f"{1:064x}", "IPAddress": f"172.17.{index // 250}.{index % 250 + 2}" if running else "",
+               "Gateway": "172.17.0.1", "MacAddress": "02:42:ac:11:00:02", "IPPrefixLen": 16, "Aliases": None}
+    return {
+        "Id": c['id'],
+        "Name": f"/{c['name']}",
+        "Created": f"2024-01-01T00:{index // 60 % 60:02d}:{index % 60:02d}.000000000Z",
+        "Image": image_id,
+        "State": {"Status": "running" if running else "exited", "Running": running, "Pid": c['pid'] if running else 0},
+        "Config": {"Hostname": c['id'][:12], "Domainname": "", "Image": f"bench/app-{index % IMAGE_COUNT}:latest",
+                   "Labels": labels, "Env": ["PATH=/usr/bin"]},
+        "HostConfig": {"NetworkMode": "bridge"},
+        "NetworkSettings": {
+            "IPAddress": network['IPAddress'], "Gateway": "172.17.0.1", "MacAddress": network['MacAddress'],
+            "Ports": {"80/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(20000 + index)}] if running else None},
+            "Networks": {"bridge": network}
+        }
+    }
+
+
+def container_summary(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``/containers/json`` entry for an inspect"""
+    binding = (attrs['NetworkSettings']['Ports'].get('80/tcp') or [None])[0]
+    return {
+        "Id": attrs['Id'],
+        "Names": [attrs['Name']],
+        "Image": attrs['Config']['Image'],
+        "ImageID": attrs['Image'],
+        "Created": 1704067200 + int(attrs['Id'], 16),
+        "State": attrs['State']['Status'],
+        "Status": "Up 2 hours" if attrs['State']['Running'] else "Exited (0) 2 hours ago",
+        "Labels": attrs['Config']['Labels'],
+        "Ports": [{"IP": "0.0.0.0", "PrivatePort": 80, "PublicPort": int(binding['HostPort']), "Type": "tcp"}] if binding else [],
+        "NetworkSettings": {"Networks": attrs['NetworkSettings']['Networks']}
+    }
+
+
+class FakeDockerDaemon:
+    """The Engine API calls the dashboard makes for containers, images and stats, with request counts.
+
+    ``stats_latency`` is added to each stats call (a real ``stats(stream=False)`` takes about a
+    second, the daemon samples twice), ``api_latency`` to every other call."""
+
+    def __init__(self, count: int, stats_latency: float = 0.0, api_latency: float = 0.0):
+        containers = [container_attrs(i) for i in range(count)]
+        inspect = {c['Id']: json.dumps(c).encode() for c in containers}
+        inspect.update({c['Name'].lstrip('/'): body for c, body in zip(containers, inspect.values())})
+        summaries = [container_summary(c) for c in containers]
+        stats = {c['id']: json.dumps(docker_stats_payload(c)).encode() for c in map(fixture_container, range(count))}
+        images = {
+            f"{i:064x}": json.dumps({"Id": f"sha256:{i:064x}", "RepoTags": [f"bench/app-{i}:latest"], "Size": 50_000_000}).encode()
+            for i in range(IMAGE_COUNT)
+        }
+        self.requests: Counter = Counter()
+        requests = self.requests
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                parts = url.path.strip('/').split('/')
+                if parts and parts[0].startswith('v1.'):
+                    parts = parts[1:]
+                query = parse_qs(url.query)
+                body, delay = None, api_latency
+                if parts == ['_ping']:
+                    body = b'OK'
+                elif parts == ['containers', 'json']:
+                    body = json.dumps(self.list_containers(query)).encode()
+                elif len(parts) == 3 and parts[0] == 'containers' and parts[2] == 'json':
+                    body = inspect.get(parts[1])
+                elif len(parts) == 3 and parts[0] == 'containers' and parts[2] == 'stats':
+                    body, delay = stats.get(parts[1]), stats_latency
+                elif len(parts) == 3 and parts[0] == 'images' and parts[2] == 'json':
+                    body = images.get(parts[1].split(':')[-1])
+                requests[parts[0] if parts else ''] += 1
+                if delay:
+                    time.sleep(delay)
+                self.send_response(200 if body else 404)
+                body = body or b'{"message": "not found"}'
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def list_containers(self, query: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+                filters = json.loads(query.get('filters', ['{}'])[0])
+                show_all = query.get('all', ['0'])[0] in ('1', 'true', 'True')
+                rows = [s for s in summaries if show_all or s['State'] == 'running']
+                if filters.get('status'):
+                    rows = [s for s in rows if s['State'] in filters['status']]
+                for label in filters.get('label', []):
+                    key, _, value = label.partition('=')
+                    rows = [s for s in rows if key in s['Labels'] and (not value or s['Labels'][key] == value)]
+                return rows
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 256
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"tcp://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# In-memory MongoDB
+def _compare(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return value == condition
+    for op, operand in condition.items():
+        if op == '$in':
+            ok = value in operand
+        elif op == '$ne':
+            ok = value != operand
+        elif value is None:
+            ok = False
+        else:
+            ok = {'$lt': lambda: value < operand, '$lte': lambda: value <= operand,
+                  '$gt': lambda: value > operand, '$gte': lambda: value >= operand}[op]()
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif not _compare(doc.get(key), condition):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if projection and not projection.get('_id', 1):
+        return {k: v for k, v in doc.items() if k != '_id'}
+    return dict(doc)
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, keys, direction=None):
+        keys = [(keys, direction or 1)] if isinstance(keys, str) else keys
+        for key, order in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(key) or '', reverse=order < 0)
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        return self.docs[:length] if length else list(self.docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class MemoryCollection:
+    """The Motor collection methods server.py uses, counting each call in ``ops``"""
+
+    def __init__(self, name: str, ops: Counter):
+        self.name = name
+        self.ops = ops
+        self.docs: List[Dict[str, Any]] = []
+
+    def _count(self, op: str):
+        self.ops[f"{op} {self.name}"] += 1
+
+    async def insert_one(self, doc: Dict[str, Any]):
+        self._count('insert')
+        doc.setdefault('_id', ObjectId())  # Motor sets _id on the caller's dict too
+        self.docs.append(dict(doc))
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True):
+        self._count('insert')
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+            self.docs.append(dict(doc))
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        self._count('find')
+        return next((_project(d, projection) for d in self.docs if matches(d, query or {})), None)
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> MemoryCursor:
+        self._count('find')
+        return MemoryCursor([_project(d, projection) for d in self.docs if matches(d, query or {})])
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        self._count('count')
+        return sum(1 for d in self.docs if matches(d, query))
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        self._count('update')
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None and upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith('$')}
+            self.docs.append(doc)
+        if doc is not None:
+            doc.update(update.get('$set', {}))
+
+    async def delete_one(self, query: Dict[str, Any]):
+        self._count('delete')
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[i]
+                break
+
+    async def delete_many(self, query: Dict[str, Any]):
+        self._count('delete')
+        self.docs = [d for d in self.docs if not matches(d, query)]
+
+    async def create_index(self, keys, **kwargs):
+        self._count('createIndexes')
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.ops: Counter = Counter()
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self.ops)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+
+# Driving the app
+async def websocket_session(app, stop: asyncio.Event, frames: Counter):
+    """One /ws connection through the ASGI interface until ``stop`` is set; counts frames and bytes by type"""
+    inbox: asyncio.Queue = asyncio.Queue()
+    inbox.put_nowait({"type": "websocket.connect"})
+
+    async def send(message):
+        if message['type'] == 'websocket.send':
+            data = message.get('text') or message.get('bytes') or b''
+            size = len(data.encode() if isinstance(data, str) else data)
+            kind = json.loads(data).get('type', '') if isinstance(data, str) else 'binary'
+            frames[f"{kind} frames"] += 1
+            frames[f"{kind} bytes"] += size
+
+    scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+             "path": "/ws", "raw_path": b"/ws", "root_path": "", "query_string": b"", "headers": [],
+             "client": ("127.0.0.1", 0), "server": ("bench", 80), "subprotocols": []}
+    session = asyncio.create_task(app(scope, inbox.get, send))
+    await stop.wait()
+    inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await session
+
+
+async def time_requests(client: httpx.AsyncClient, url: str, requests: int) -> Dict[str, float]:
+    timings, size = [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(url)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, f"{url}: {response.status_code} {response.text[:200]}"
+        size = len(response.content)
+    return {"p50_ms": statistics.median(timings) * 1000, "max_ms": max(timings) * 1000, "bytes": size}
+
+
+async def bench(server, count: int, clients: List[int], ticks: int, requests: int, stats_latency: float,
+                api_latency: float, workers: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    with FakeDockerDaemon(count, stats_latency, api_latency) as daemon:
+        client = docker.DockerClient(base_url=daemon.url, version=API_VERSION)
+        # max_pool_size only applies to the unix socket adapter; size the TCP one to match
+        client.api.mount('http://', HTTPAdapter(pool_maxsize=workers))
+        server.db = MemoryDatabase()
+        server.activity_writer.collection = server.db.activity_logs
+        await server.on_docker_connect(client)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as http:
+            per_page = max(count, 1)
+            await http.get(f"/api/containers?per_page={per_page}")  # warm connection pools and images
+            daemon.requests.clear()
+            result['containers'] = await time_requests(http, f"/api/containers?per_page={per_page}", requests)
+            result['containers']['docker_requests'] = sum(daemon.requests.values()) / requests
+            result['containers_fields'] = await time_requests(
+                http, f"/api/containers?per_page={per_page}&fields=name,status,image,ports", requests)
+
+        for k in clients:
+            server.instrumentation.reset()
+            server.db.ops.clear()
+            daemon.requests.clear()
+            frames: Counter = Counter()
+            stop = asyncio.Event()
+            sessions = [asyncio.create_task(websocket_session(server.app, stop, frames)) for _ in range(k)]
+            while server.instrumentation.snapshot('ws')['histograms'].get('ws', {}).get('tick', {}).get('count', 0) < ticks * k:
+                await asyncio.sleep(0.05)
+            stop.set()
+            await asyncio.gather(*sessions)
+            tick = server.instrumentation.snapshot('ws')['histograms']['ws']['tick']
+            result[f"ws_{k}"] = {
+                "tick_p50_ms": tick['p50_ms'],
+                "tick_mean_ms": tick['mean_ms'],
+                "docker_requests_per_tick": sum(daemon.requests.values()) / tick['count'],
+                "mongo_ops_per_tick": sum(server.db.ops.values()) / tick['count'],
+                "mongo_ops": dict(server.db.ops),
+                "frame_bytes": frames['container_stats bytes'] // max(frames['container_stats frames'], 1)
+            }
+        client.close()
+    return result
+
+
+# Reporting
+def flatten(result: Dict[str, Any]) -> Dict[str, float]:
+    return {f"{section}.{metric}": value for section, metrics in result.items()
+            for metric, value in metrics.items() if isinstance(value, (int, float))}
+
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None):
+    print(f"{'containers':>10} {'metric':<40} {'value':>12}" + (f" {'baseline':>12} {'change':>8}" if baseline else ''))
+    for count, result in results.items():
+        before = flatten(baseline['results'].get(count, {})) if baseline else {}
+        for metric, value in flatten(result).items():
+            line = f"{count:>10} {metric:<40} {value:>12.1f}"
+            if baseline and metric in before:
+                change = (value - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+                line += f" {before[metric]:>12.1f} {change:>+7.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 5], help="concurrent /ws connections")
+    parser.add_argument('--ticks', type=int, default=3, help="/ws ticks per connection")
+    parser.add_argument('--tick-interval', type=float, default=0.2, help="WS_TICK_INTERVAL for the run")
+    parser.add_argument('--requests', type=int, default=5, help="/api/containers requests per variant")
+    parser.add_argument('--stats-latency', type=float, default=0.0, help="seconds added to each fake stats call")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="seconds added to every other fake daemon call")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', help="results file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    import server
+    server.WS_TICK_INTERVAL = args.tick_interval
+
+    meta = {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "docker_io_workers": server.DOCKER_IO_WORKERS, **{k: v for k, v in vars(args).items() if k not in ('json', 'compare')}}
+    print(f"stats latency {args.stats_latency * 1000:.0f} ms, api latency {args.api_latency * 1000:.0f} ms, "
+          f"{server.DOCKER_IO_WORKERS} docker-io workers, {args.ticks} ticks every {args.tick_interval}s")
+
+    async def run_all():
+        # One event loop for every count: the app's locks and queues bind to the loop they're used on
+        return {str(count): await bench(server, count, args.clients, args.ticks, args.requests,
+                                        args.stats_latency, args.api_latency, server.DOCKER_IO_WORKERS)
+                for count in args.counts}
+
+    results = asyncio.run(run_all())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Compare the cgroup and Docker API stats backends.
+
+Builds fixture cgroup (v1 or v2) and /proc trees for N containers in a temp
+directory, and serves the matching stats JSON from a stand-in Docker Engine
+API on localhost. Each round reads stats for every container through both
+backends, the Docker one concurrently on a DockerExecutor the way server.py
+does, and checks that both report the same memory and network counters.
+
+    python backend/benchmarks/bench_stats_backends.py --counts 10 100 500
+    python backend/benchmarks/bench_stats_backends.py --cgroup-version 1 --daemon-latency 0.05
+
+``--daemon-latency`` adds a per-request delay to the fake daemon; a real
+``stats(stream=False)`` takes about a second because the daemon samples twice.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import docker  # noqa: E402
+
+from cgroup_stats import ContainerStatsSource  # noqa: E402
+from docker_async import DockerExecutor  # noqa: E402
+
+
+API_VERSION = '1.43'
+
+
+def fixture_container(index: int) -> dict:
+    """Deterministic counters for the index-th fixture container"""
+    return {
+        "id": f"{index:064x}",
+        "name": f"bench-{index}",
+        "pid": 10000 + index,
+        "usage_usec": 1_000_000 * (index + 1),
+        "memory": 50 * 1024 * 1024 + index * 4096,
+        "limit": 512 * 1024 * 1024,
+        "rx": 1_000 * index,
+        "tx": 2_000 * index,
+        "read": 4096 * index,
+        "write": 8192 * index
+    }
+
+
+def _write(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def write_cgroup_fixture(root: str, containers: list, version: int):
+    if version == 2:
+        _write(os.path.join(root, 'cgroup.controllers'), "cpuset cpu io memory pids\n")
+        for c in containers:
+            d = os.path.join(root, 'system.slice', f"docker-{c['id']}.scope")
+            _write(os.path.join(d, 'cpu.stat'), f"usage_usec {c['usage_usec']}\nuser_usec {c['usage_usec'] // 2}\nsystem_usec {c['usage_usec'] // 2}\n")
+            _write(os.path.join(d, 'memory.current'), f"{c['memory']}\n")
+            _write(os.path.join(d, 'memory.max'), f"{c['limit']}\n")
+            _write(os.path.join(d, 'memory.stat'), f"anon {c['memory'] // 2}\nfile {c['memory'] // 2}\ninactive_file 0\n")
+            _write(os.path.join(d, 'io.stat'), f"8:0 rbytes={c['read']} wbytes={c['write']} rios=1 wios=1 dbytes=0 dios=0\n")
+    else:
+        for c in containers:
+            cpu = os.path.join(root, 'cpu,cpuacct', 'docker', c['id'])
+            _write(os.path.join(cpu, 'cpuacct.usage'), f"{c['usage_usec'] * 1000}\n")
+            _write(os.path.join(cpu, 'cpuacct.usage_percpu'), f"{c['usage_usec'] * 500} {c['usage_usec'] * 500}\n")
+            memory = os.path.join(root, 'memory', 'docker', c['id'])
+            _write(os.path.join(memory, 'memory.usage_in_bytes'), f"{c['memory']}\n")
+            _write(os.path.join(memory, 'memory.limit_in_bytes'), f"{c['limit']}\n")
+            _write(os.path.join(memory, 'memory.stat'), f"cache {c['memory'] // 2}\nrss {c['memory'] // 2}\ninactive_file 0\n")
+            blkio = os.path.join(root, 'blkio', 'docker', c['id'])
+            _write(os.path.join(blkio, 'blkio.throttle.io_service_bytes_recursive'),
+                   f"8:0 Read {c['read']}\n8:0 Write {c['write']}\n8:0 Total {c['read'] + c['write']}\nTotal {c['read'] + c['write']}\n")
+
+
+def write_proc_fixture(root: str, containers: list):
+    header = (
+        "Inter-|   Receive                                                |  Transmit\n"
+        " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n"
+    )
+    for c in containers:
+        _write(os.path.join(root, str(c['pid']), 'net', 'dev'), header +
+               "    lo:       0       0    0    0    0     0          0         0        0       0    0    0    0     0       0          0\n"
+               f"  eth0: {c['rx']} 10 0 0 0 0 0 0 {c['tx']} 20 0 0 0 0 0 0\n")
+
+
+def docker_stats_payload(c: dict) -> dict:
+    cpu = {"cpu_usage": {"total_usage": c['usage_usec'] * 1000, "percpu_usage": [c['usage_usec'] * 500] * 2},
+           "system_cpu_usage": 10 ** 15, "online_cpus": 2}
+    return {
+        "read": "2024-01-01T00:00:00.000000000Z",
+        "name": f"/{c['name']}",
+        "id": c['id'],
+        "cpu_stats": cpu,
+        "precpu_stats": cpu,
+        "memory_stats": {"usage": c['memory'], "limit": c['limit'], "stats": {"inactive_file": 0}},
+        "networks": {"eth0": {"rx_bytes": c['rx'], "tx_bytes": c['tx'], "rx_packets": 10, "tx_packets": 20,
+                              "rx_errors": 0, "tx_errors": 0, "rx_dropped": 0, "tx_dropped": 0}},
+        "blkio_stats": {"io_service_bytes_recursive": [
+            {"major": 8, "minor": 0, "op": "read", "value": c['read']},
+            {"major": 8, "minor": 0, "op": "write", "value": c['write']}
+        ]},
+        "pids_stats": {"current": 3}
+    }
+
+
+class FakeStatsDaemon:
+    """Just enough of the Engine API to answer ``GET /containers/{id}/stats``"""
+
+    def __init__(self, containers: list, latency: float = 0.0):
+        payloads = {c['id']: json.dumps(docker_stats_payload(c)).encode() for c in containers}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = self.path.split('?')[0].strip('/').split('/')
+                body = payloads.get(parts[2]) if len(parts) == 4 and parts[3] == 'stats' else None
+                if latency:
+                    time.sleep(latency)
+                self.send_response(200 if body else 404)
+                body = body or b'{"message": "no such container"}'
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"tcp://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check_equivalent(cgroup_stats: dict, docker_stats: dict, name: str):
+    for path in (('memory_stats', 'usage'), ('memory_stats', 'limit'), ('networks', 'eth0', 'rx_bytes'), ('networks', 'eth0', 'tx_bytes')):
+        a, b = cgroup_stats, docker_stats
+        for key in path:
+            a, b = a[key], b[key]
+        assert a == b, f"{name}: {'.'.join(path)} differs: cgroup={a} docker={b}"
+
+    def ops(stats: dict) -> dict:
+        return {e['op'].lower(): e['value'] for e in stats['blkio_stats']['io_service_bytes_recursive']}
+
+    assert ops(cgroup_stats) == ops(docker_stats), f"{name}: blkio differs"
+
+
+async def bench(count: int, version: int, rounds: int, latency: float, workers: int) -> dict:
+    containers = [fixture_container(i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp, FakeStatsDaemon(containers, latency) as daemon:
+        cgroup_root, proc_root = os.path.join(tmp, 'cgroup'), os.path.join(tmp, 'proc')
+        write_cgroup_fixture(cgroup_root, containers, version)
+        write_proc_fixture(proc_root, containers)
+
+        client = docker.DockerClient(base_url=daemon.url, version=API_VERSION, max_pool_size=workers)
+        models = [
+            client.containers.prepare_model({"Id": c['id'], "Name": f"/{c['name']}", "State": {"Pid": c['pid']}})
+            for c in containers
+        ]
+        cgroup_source = ContainerStatsSource('cgroup', cgroup_root, proc_root)
+        cgroup_source.reader.host_memory = 1 << 40  # fixture limits are far below this
+        docker_source = ContainerStatsSource('docker')
+        executor = DockerExecutor(max_workers=workers)
+
+        timings = {"cgroup": [], "cgroup_pool": [], "docker_pool": []}
+        for _ in range(rounds):
+            started = time.perf_counter()
+            cgroup_results = [cgroup_source.read(m) for m in models]
+            timings['cgroup'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await executor.map(cgroup_source.read, models)
+            timings['cgroup_pool'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            docker_results = await executor.map(docker_source.read, models)
+            timings['docker_pool'].append(time.perf_counter() - started)
+
+        for model, a, b in zip(models, cgroup_results, docker_results):
+            check_equivalent(a, b, model.name)
+        assert cgroup_source.counts['fallbacks'] == 0, "cgroup reads fell back to the Docker API"
+        executor.shutdown()
+        client.close()
+
+    return {name: statistics.median(values) * 1000 for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--cgroup-version', type=int, choices=(1, 2), default=2)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--daemon-latency', type=float, default=0.0, help="seconds added to each fake stats call")
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"cgroup v{args.cgroup_version}, {args.rounds} rounds, daemon latency {args.daemon_latency * 1000:.0f} ms, {args.workers} workers")
+    print(f"{'containers':>10} {'cgroup ms':>10} {'cgroup/pool':>12} {'docker/pool':>12} {'speedup':>8}")
+    for count in args.counts:
+        result = asyncio.run(bench(count, args.cgroup_version, args.rounds, args.daemon_latency, args.workers))
+        speedup = result['docker_pool'] / result['cgroup'] if result['cgroup'] else float('inf')
+        print(f"{count:>10} {result['cgroup']:>10.1f} {result['cgroup_pool']:>12.1f} {result['docker_pool']:>12.1f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Container stats read straight from the cgroup filesystem.
+
+``container.stats(stream=False)`` is an HTTP round trip plus a JSON decode,
+and the daemon samples twice, about a second apart, to fill ``precpu_stats``.
+On Linux the same counters sit in ``/sys/fs/cgroup``. ``CgroupStatsReader``
+reads them for a container id (cgroup v1 or v2, systemd or cgroupfs driver)
+and returns a dict shaped like Docker's stats, so callers don't care which
+backend produced it. CPU deltas are taken against the previous read.
+
+Inside a container the host hierarchy has to be mounted, e.g.
+``/sys/fs/cgroup:/host/cgroup:ro`` with ``CGROUP_ROOT=/host/cgroup``. Network
+counters come from ``/proc/<pid>/net/dev``, which needs the host's /proc
+(``PROC_ROOT``). ``ContainerStatsSource`` falls back to the Docker API for
+any container whose files can't be read.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+
+NANOSECONDS = 1_000_000_000
+STATS_BACKENDS = ('docker', 'cgroup')
+
+
+class CgroupUnavailable(Exception):
+    pass
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _read_int(path: str) -> Optional[int]:
+    value = _read(path).strip()
+    return None if value == 'max' else int(value)
+
+
+def _read_kv(path: str) -> Dict[str, int]:
+    result = {}
+    for line in _read(path).splitlines():
+        key, _, value = line.partition(' ')
+        if value.strip().lstrip('-').isdigit():
+            result[key] = int(value)
+    return result
+
+
+def parse_net_dev(text: str) -> Dict[str, Dict[str, int]]:
+    """``/proc/<pid>/net/dev`` as Docker's ``networks`` section, loopback excluded"""
+    networks = {}
+    for line in text.splitlines()[2:]:
+        name, _, counters = line.partition(':')
+        name = name.strip()
+        fields = counters.split()
+        if not name or name == 'lo' or len(fields) < 16:
+            continue
+        networks[name] = {
+            "rx_bytes": int(fields[0]), "rx_packets": int(fields[1]),
+            "rx_errors": int(fields[2]), "rx_dropped": int(fields[3]),
+            "tx_bytes": int(fields[8]), "tx_packets": int(fields[9]),
+            "tx_errors": int(fields[10]), "tx_dropped": int(fields[11])
+        }
+    return networks
+
+
+class CgroupStatsReader:
+    def __init__(self, root: str = '/sys/fs/cgroup', proc_root: str = '/proc'):
+        self.root = root
+        self.proc_root = proc_root
+        self.version = 2 if os.path.exists(os.path.join(root, 'cgroup.controllers')) else 1
+        self._paths: Dict[str, Dict[str, str]] = {}  # container id -> controller -> directory
+        self._previous: Dict[str, Dict[str, Any]] = {}  # container id -> last cpu_stats
+        self._lock = threading.Lock()
+        self._system_cpu = (0.0, 0)  # (monotonic time, value) - shared by all reads in one tick
+        self.host_memory = psutil.virtual_memory().total
+
+    # Locating a container's cgroup
+    def _candidates(self, container_id: str, controller: str) -> List[str]:
+        base = self.root if self.version == 2 else os.path.join(self.root, controller)
+        return [
+            os.path.join(base, 'system.slice', f'docker-{container_id}.scope'),  # systemd driver
+            os.path.join(base, 'docker', container_id),  # cgroupfs driver
+        ]
+
+    def _directories(self, container_id: str) -> Dict[str, str]:
+        paths = self._paths.get(container_id)
+        if paths is not None:
+            return paths
+        controllers = ('unified',) if self.version == 2 else ('cpuacct', 'memory', 'blkio')
+        paths = {}
+        for controller in controllers:
+            candidates = self._candidates(container_id, controller)
+            if self.version == 1 and controller == 'cpuacct':
+                # Often co-mounted as cpu,cpuacct with cpuacct a symlink to it
+                candidates += self._candidates(container_id, 'cpu,cpuacct')
+            found = next((c for c in candidates if os.path.isdir(c)), None)
+            if found is None:
+                raise CgroupUnavailable(f"no {controller} cgroup for {container_id[:12]} under {self.root}")
+            paths[controller] = found
+        self._paths[container_id] = paths
+        return paths
+
+    # Reading
+    def _system_cpu_usage(self) -> int:
+        """Host CPU time in ns, the same quantity Docker reports as system_cpu_usage"""
+        now = time.monotonic()
+        read_at, value = self._system_cpu
+        if now - read_at > 0.05:
+            times = psutil.cpu_times()
+            # Guest time is already included in user/nice, and Docker leaves it out as well
+            busy = sum(times) - sum(getattr(times, f, 0) for f in ('guest', 'guest_nice'))
+            value = int(busy * NANOSECONDS)
+            self._system_cpu = (now, value)
+        return value
+
+    def _read_v2(self, paths: Dict[str, str]) -> Dict[str, Any]:
+        directory = paths['unified']
+        cpu = _read_kv(os.path.join(directory, 'cpu.stat'))
+        memory_stat = _read_kv(os.path.join(directory, 'memory.stat'))
+        limit = _read_int(os.path.join(directory, 'memory.max'))
+        io = []
+        try:
+            for line in _read(os.path.join(directory, 'io.stat')).splitlines():
+                device, _, fields = line.partition(' ')
+                major, _, minor = device.partition(':')
+                values = dict(f.split('=', 1) for f in fields.split() if '=' in f)
+                io.append({"major": int(major), "minor": int(minor), "op": "read", "value": int(values.get('rbytes', 0))})
+                io.append({"major": int(major), "minor": int(minor), "op": "write", "value": int(values.get('wbytes', 0))})
+        except FileNotFoundError:
+            pass  # io controller not enabled for this subtree
+        return {
+            "total_usage": cpu['usage_usec'] * 1000,
+            "percpu_usage": None,
+            "memory_usage": _read_int(os.path.join(directory, 'memory.current')),
+            "memory_limit": limit,
+            "memory_stat": memory_stat,
+            "io": io
+        }
+
+    def _read_v1(self, paths: Dict[str, str]) -> Dict[str, Any]:
+        memory_dir = paths['memory']
+        percpu = [int(v) for v in _read(os.path.join(paths['cpuacct'], 'cpuacct.usage_percpu')).split()]
+        io = []
+        blkio_file = os.path.join(paths['blkio'], 'blkio.throttle.io_service_bytes_recursive')
+        if os.path.exists(blkio_file):
+            for line in _read(blkio_file).splitlines():
+                fields = line.split()
+                if len(fields) == 3 and fields[1] in ('Read', 'Write'):
+                    major, _, minor = fields[0].partition(':')
+                    io.append({"major": int(major), "minor": int(minor), "op": fields[1], "value": int(fields[2])})
+        return {
+            "total_usage": _read_int(os.path.join(paths['cpuacct'], 'cpuacct.usage')),
+            "percpu_usage": percpu,
+            "memory_usage": _read_int(os.path.join(memory_dir, 'memory.usage_in_bytes')),
+            "memory_limit": _read_int(os.path.join(memory_dir, 'memory.limit_in_bytes')),
+            "memory_stat": _read_kv(os.path.join(memory_dir, 'memory.stat')),
+            "io": io
+        }
+
+    def read(self, container_id: str, pid: Optional[int] = None) -> Dict[str, Any]:
+        """Stats for one container in Docker's stats layout; raises CgroupUnavailable"""
+        try:
+            paths = self._directories(container_id)
+            raw = self._read_v2(paths) if self.version == 2 else self._read_v1(paths)
+            networks = parse_net_dev(_read(os.path.join(self.proc_root, str(pid), 'net', 'dev'))) if pid else None
+        except CgroupUnavailable:
+            raise
+        except (OSError, ValueError, KeyError) as e:
+            # The container may have stopped (its cgroup removed) - look the path up again next time
+            self._paths.pop(container_id, None)
+            raise CgroupUnavailable(str(e))
+        if networks is None:
+            raise CgroupUnavailable(f"no network counters for {container_id[:12]} (pid unknown)")
+
+        online_cpus = psutil.cpu_count() or 1
+        cpu_stats = {
+            "cpu_usage": {"total_usage": raw['total_usage']},
+            "system_cpu_usage": self._system_cpu_usage(),
+            "online_cpus": online_cpus
+        }
+        if raw['percpu_usage'] is not None:
+            cpu_stats['cpu_usage']['percpu_usage'] = raw['percpu_usage']
+        with self._lock:
+            precpu_stats = self._previous.get(container_id, cpu_stats)
+            self._previous[container_id] = cpu_stats
+
+        limit = raw['memory_limit']
+        return {
+            "cpu_stats": cpu_stats,
+            "precpu_stats": precpu_stats,
+            "memory_stats": {
+                "usage": raw['memory_usage'],
+                # Unlimited containers report the host's memory, as Docker does
+                "limit": min(limit, self.host_memory) if limit else self.host_memory,
+                "stats": raw['memory_stat']
+            },
+            "networks": networks,
+            "blkio_stats": {"io_service_bytes_recursive": raw['io']}
+        }
+
+    def forget(self, container_id: str):
+        self._paths.pop(container_id, None)
+        with self._lock:
+            self._previous.pop(container_id, None)
+
+
+class ContainerStatsSource:
+    """Stats for a container from the cgroup files when possible, otherwise from the Docker API"""
+
+    def __init__(self, backend: str = 'docker', cgroup_root: str = '/sys/fs/cgroup', proc_root: str = '/proc'):
+        if backend not in STATS_BACKENDS:
+            logging.error(f"Unknown stats backend '{backend}', using docker")
+            backend = 'docker'
+        self.backend = backend
+        self.reader = CgroupStatsReader(cgroup_root, proc_root) if backend == 'cgroup' else None
+        self.counts = {"cgroup": 0, "docker": 0, "fallbacks": 0}
+        self._warned = False
+
+    def read(self, container, local: bool = True) -> Dict[str, Any]:
+        """``local`` is False for containers on remote hosts, whose cgroups aren't ours to read"""
+        if self.reader is not None and local:
+            try:
+                stats = self.reader.read(container.id, (container.attrs.get('State') or {}).get('Pid'))
+                self.counts['cgroup'] += 1
+                return stats
+            except CgroupUnavailable as e:
+                self.counts['fallbacks'] += 1
+                if not self._warned:
+                    self._warned = True
+                    logging.warning(f"cgroup stats unavailable, falling back to the Docker API: {e}")
+        self.counts['docker'] += 1
+        return container.stats(stream=False)
+
+    def handle_event(self, event: Dict[str, Any]):
+        if self.reader is not None and event.get('Type') == 'container' and event.get('Action') == 'destroy':
+            self.reader.forget(event.get('Actor', {}).get('ID', ''))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "cgroup_version": self.reader.version if self.reader else None,
+            "cgroup_root": self.reader.root if self.reader else None,
+            **self.counts
+        }
@@ -0,0 +1,270 @@
+"""Service-level index of detected docker-compose projects.
+
+Compose files are parsed once and cached by mtime and content hash, then joined
+with live containers through the ``com.docker.compose.*`` labels.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+
+COMPOSE_FILENAMES = ('docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml')
+
+
+def normalize_project_name(name: str) -> str:
+    """Normalize a project name the same way docker compose does"""
+    return re.sub(r'[^a-z0-9_-]', '', name.lower())
+
+
+def _parse_ports(ports) -> List[Dict[str, Any]]:
+    parsed = []
+    for port in ports or []:
+        if isinstance(port, dict):
+            parsed.append({
+                "host_port": str(port['published']) if port.get('published') is not None else None,
+                "container_port": str(port.get('target', '')),
+                "protocol": port.get('protocol', 'tcp')
+            })
+            continue
+
+        spec = str(port)
+        protocol = 'tcp'
+        if '/' in spec:
+            spec, protocol = spec.rsplit('/', 1)
+        parts = spec.rsplit(':', 2)
+        if len(parts) == 1:
+            host_port, container_port = None, parts[0]
+        else:
+            host_port, container_port = parts[-2], parts[-1]
+        parsed.append({"host_port": host_port, "container_port": container_port, "protocol": protocol})
+    return parsed
+
+
+def _parse_labels(labels) -> Dict[str, str]:
+    if isinstance(labels, dict):
+        return {str(k): '' if v is None else str(v) for k, v in labels.items()}
+    parsed = {}
+    for label in labels or []:
+        key, _, value = str(label).partition('=')
+        parsed[key] = value
+    return parsed
+
+
+def _parse_depends_on(depends_on) -> List[str]:
+    if isinstance(depends_on, dict):
+        return list(depends_on.keys())
+    return [str(d) for d in depends_on or []]
+
+
+def parse_compose(raw: bytes, directory: str) -> Dict[str, Any]:
+    """Parse compose file contents into a project description; raises ValueError if it isn't one"""
+    data = yaml.safe_load(raw) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a mapping at the top level, got {type(data).__name__}")
+    project_name = normalize_project_name(str(data.get('name') or os.path.basename(directory)))
+
+    declared = data.get('services') or {}
+    if not isinstance(declared, dict):
+        raise ValueError(f"expected services to be a mapping, got {type(declared).__name__}")
+    services = {}
+    for service_name, service in declared.items():
+        service = service or {}
+        if not isinstance(service, dict):
+            raise ValueError(f"expected service {service_name} to be a mapping, got {type(service).__name__}")
+        service_name = str(service_name)
+        services[service_name] = {
+            "name": service_name,
+            "image": service.get('image'),
+            "build": service.get('build') is not None,
+            "container_name": service.get('container_name'),
+            "ports": _parse_ports(service.get('ports')),
+            "depends_on": _parse_depends_on(service.get('depends_on')),
+            "labels": _parse_labels(service.get('labels')),
+        }
+
+    return {"project_name": project_name, "services": services}
+
+
+class ComposeIndex:
+    """Cache of parsed compose files keyed by path"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # refresh runs on worker threads, from endpoints that pass different path sets
+        self._lock = threading.Lock()
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """Return the parsed project for a compose file, re-parsing only when it changed.
+
+        A file that can't be read or parsed still gets a project, with no services
+        and its ``parse_error``; None only when the file is gone."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return None
+
+        entry = self._entries.get(path)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['project']
+
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            logging.error(f"Error reading compose file {path}: {e}")
+            return {**self._unparsed(path, str(e)), "sha256": None}
+
+        digest = hashlib.sha256(raw).hexdigest()
+        if entry and entry['sha256'] == digest:
+            # Touched but unchanged - keep the parsed project
+            entry['mtime_ns'] = stat.st_mtime_ns
+            entry['size'] = stat.st_size
+            return entry['project']
+
+        try:
+            project = parse_compose(raw, os.path.dirname(path))
+            project['path'] = path
+            project['directory'] = os.path.dirname(path)
+        except (yaml.YAMLError, ValueError, AttributeError, TypeError) as e:
+            # Not a compose file we understand (a list, custom tags, odd field types) - still listed, without services
+            logging.error(f"Error parsing compose file {path}: {e}")
+            project = self._unparsed(path, str(e))
+        project['sha256'] = digest
+
+        self._entries[path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "project": project
+        }
+        return project
+
+    @staticmethod
+    def _unparsed(path: str, error: str) -> Dict[str, Any]:
+        directory = os.path.dirname(path)
+        return {
+            "project_name": normalize_project_name(os.path.basename(directory)),
+            "services": {},
+            "path": path,
+            "directory": directory,
+            "parse_error": error
+        }
+
+    def refresh(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Load every path and forget files that no longer exist.
+
+        Callers pass different path sets, so entries for files outside ``paths``
+        are kept as long as the file is there rather than evicted."""
+        with self._lock:
+            for stale in [p for p in self._entries if not os.path.exists(p)]:
+                del self._entries[stale]
+            return [p for p in (self.load(path) for path in paths) if p is not None]
+
+    def join(self, projects: List[Dict[str, Any]], containers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Join parsed projects with live containers.
+
+        ``containers`` are plain dicts with ``name``, ``status``, ``image`` and
+        ``labels``. Each service is reported as ``running``, ``down`` or
+        ``drifted``; containers of a known project whose service no longer
+        exists in the file, and projects with no detected file, are orphaned.
+        Files that failed to parse have no services to join and are left out.
+        """
+        by_project: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for container in containers:
+            labels = container.get('labels') or {}
+            project_name = labels.get('com.docker.compose.project')
+            if not project_name:
+                continue
+            service_name = labels.get('com.docker.compose.service', '')
+            by_project.setdefault(project_name, {}).setdefault(service_name, []).append(container)
+
+        result_projects = []
+        summary = {"running": 0, "down": 0, "drifted": 0, "orphaned": 0}
+
+        for project in projects:
+            if project.get('parse_error'):
+                continue
+            live = by_project.pop(project['project_name'], {})
+            services = []
+            for service_name, service in project['services'].items():
+                service_containers = live.pop(service_name, [])
+                status = self._service_status(service, service_containers)
+                summary[status] += 1
+                services.append({
+                    **service,
+                    "status": status,
+                    "containers": [
+                        {"name": c['name'], "status": c['status'], "image": c.get('image')}
+                        for c in service_containers
+                    ]
+                })
+
+            orphaned = [
+                {"name": c['name'], "service": service_name, "status": c['status']}
+                for service_name, orphans in live.items() for c in orphans
+            ]
+            summary['orphaned'] += len(orphaned)
+
+            result_projects.append({
+                "project_name": project['project_name'],
+                "path": project['path'],
+                "directory": project['directory'],
+                "services": services,
+                "orphaned_containers": orphaned
+            })
+
+        orphaned_projects = []
+        for project_name, services in by_project.items():
+            project_containers = [c for cs in services.values() for c in cs]
+            summary['orphaned'] += len(project_containers)
+            orphaned_projects.append({
+                "project_name": project_name,
+                "containers": [
+                    {
+                        "name": c['name'],
+                        "service": (c.get('labels') or {}).get('com.docker.compose.service', ''),
+                        "status": c['status']
+                    }
+                    for c in project_containers
+                ]
+            })
+
+        return {"projects": result_projects, "orphaned_projects": orphaned_projects, "summary": summary}
+
+    @staticmethod
+    def _service_status(service: Dict[str, Any], containers: List[Dict[str, Any]]) -> str:
+        running = [c for c in containers if c['status'] == 'running']
+        if not running:
+            return "down"
+        image = service.get('image')
+        if image and not service.get('build'):
+            expected = image if ':' in image.rsplit('/', 1)[-1] else f"{image}:latest"
+            if any(c.get('image') not in (image, expected) for c in running):
+                return "drifted"
+        return "running"
+
+
+def find_compose_files(base_dirs: List[str], max_depth: int = 3) -> List[str]:
+    """Walk base directories looking for compose files, at most ``max_depth`` levels deep"""
+    found = []
+    for base_dir in base_dirs:
+        try:
+            for root, dirs, files in os.walk(base_dir):
+                depth = root[len(base_dir):].count(os.sep)
+                if depth >= max_depth:
+                    dirs[:] = []
+                if depth > max_depth:
+                    continue
+                for filename in COMPOSE_FILENAMES:
+                    if filename in files:
+                        found.append(os.path.join(root, filename))
+                        break
+        except (PermissionError, OSError):
+            pass
+    return found
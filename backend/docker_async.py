@@ -0,0 +1,51 @@
+"""Non-blocking access to the docker-py client.
+
+docker-py is synchronous; every call is an HTTP round trip to the daemon, and
+some (stats, df, pulls) take seconds. Handlers await ``DockerExecutor.run``
+instead, which runs the call on a bounded thread pool sized to match the
+client's connection pool, so the event loop keeps serving WebSockets and
+other requests while the daemon is slow.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List
+
+
+class DockerExecutor:
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker-io")
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_listeners: List[Callable[[float], None]] = []  # seconds each call queued for a free worker
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the pool; exceptions (e.g. docker.errors.NotFound) propagate unchanged"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        if self.wait_listeners:
+            call = functools.partial(self._timed_call, call, time.perf_counter())
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self.executor, call)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _timed_call(self, call: Callable[[], Any], submitted: float) -> Any:
+        waited = time.perf_counter() - submitted
+        for listener in self.wait_listeners:
+            listener(waited)
+        return call()
+
+    async def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Apply a blocking function to every item concurrently, preserving order"""
+        return list(await asyncio.gather(*(self.run(fn, item) for item in items)))
+
+    def status(self) -> dict:
+        return {"max_workers": self.max_workers, "in_flight": self.in_flight, "completed": self.completed}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
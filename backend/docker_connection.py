@@ -0,0 +1,105 @@
+"""Docker client that connects in the background and reconnects with backoff.
+
+``docker.from_env()`` at import time blocks startup on the daemon and, if the
+daemon isn't up yet, leaves the process without Docker until it's restarted.
+``DockerConnector`` creates the client in a worker thread after startup,
+retries with exponential backoff until the daemon answers, then pings it
+every ``check_interval`` seconds. ``on_connect`` and ``on_disconnect`` run on
+the loop whenever availability changes, so the rest of the app can switch
+its Docker-backed features on and off without a restart. If ``on_connect``
+raises, it runs again after the next successful health check until it
+completes.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class DockerConnector:
+    def __init__(self, create_client: Callable[[], Any],
+                 on_connect: Callable[[Any], Awaitable[None]], on_disconnect: Callable[[], Awaitable[None]],
+                 min_backoff: float = 1.0, max_backoff: float = 60.0, check_interval: float = 10.0):
+        self._create_client = create_client
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.client = None
+        self.available = False
+        self.last_error: Optional[str] = None
+        self.since: Optional[float] = None  # wall time of the last availability change
+        self.stats = {"connects": 0, "disconnects": 0, "failed_attempts": 0}
+        self._backoff = min_backoff
+        self._connect_pending = False  # on_connect failed and has to run again
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def check(self) -> bool:
+        """One connection attempt or health check; True when the daemon answered"""
+        try:
+            if self.client is None:
+                # from_env asks the daemon for its API version, so this fails while it's down
+                self.client = await asyncio.to_thread(self._create_client)
+            else:
+                await asyncio.to_thread(self.client.ping)
+        except Exception as e:
+            self.last_error = str(e)
+            self.stats['failed_attempts'] += 1
+            if self.available:
+                self.available = False
+                self.since = time.time()
+                self.stats['disconnects'] += 1
+                logging.error(f"Docker daemon unreachable, reconnecting: {e}")
+                await self._notify(self.on_disconnect())
+            return False
+        if not self.available:
+            self.available = True
+            self.last_error = None
+            self.since = time.time()
+            self.stats['connects'] += 1
+            logging.info("Connected to Docker daemon")
+            self._connect_pending = True
+        if self._connect_pending:
+            self._connect_pending = not await self._notify(self.on_connect(self.client))
+        return True
+
+    async def _notify(self, callback: Awaitable[None]) -> bool:
+        try:
+            await callback
+            return True
+        except Exception as e:
+            logging.error(f"Error handling Docker connection change: {e}")
+            return False
+
+    async def _run(self):
+        while True:
+            if await self.check():
+                self._backoff = self.min_backoff
+                await asyncio.sleep(self.check_interval)
+            else:
+                await asyncio.sleep(self._backoff)
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "since": self.since,
+            "last_error": self.last_error,
+            "backoff": None if self.available else self._backoff,
+            "resync_pending": self._connect_pending,
+            **self.stats
+        }
@@ -0,0 +1,84 @@
+"""Shared Docker event stream.
+
+One background thread reads ``/events`` from the daemon and hands each event
+to subscribers on the asyncio loop, so features that react to daemon events
+don't each hold their own streaming connection.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+class DockerEventStream:
+    def __init__(self, get_docker_client: Callable[[], Any], retry_delay: float = 2.0):
+        self._get_docker_client = get_docker_client
+        self.retry_delay = retry_delay
+        self._subscribers: List[EventCallback] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stream = None
+        self._running = False
+        # Events can be missed while disconnected; anything caching on events keys off these
+        self.connected = False
+        self.generation = 0
+
+    def subscribe(self, callback: EventCallback) -> Callable[[], None]:
+        """Register a callback invoked on the loop for every event; returns an unsubscribe function"""
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._running:
+            return
+        self._loop = loop
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        while self._running:
+            client = self._get_docker_client()
+            if client is None:
+                time.sleep(self.retry_delay)
+                continue
+            try:
+                self._stream = client.events(decode=True)
+                self.generation += 1
+                self.connected = True
+                for event in self._stream:
+                    if not self._running:
+                        break
+                    self._loop.call_soon_threadsafe(self._dispatch, event)
+            except Exception as e:
+                if self._running:
+                    logging.error(f"Docker event stream error: {e}")
+            finally:
+                self.connected = False
+                self._stream = None
+            if self._running:
+                time.sleep(self.retry_delay)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"Error handling Docker event: {e}")
@@ -0,0 +1,184 @@
+"""Registry of Docker hosts with one pooled client per endpoint.
+
+Endpoints can be ``unix://``, ``tcp://`` or ``ssh://`` URLs. Reads that make
+sense fleet-wide fan out to every host concurrently, each with its own
+timeout, and return whatever hosts answered alongside per-host errors.
+
+A timed-out call keeps its worker thread until the client's own socket
+timeout, so fan-out runs on a pool of its own, and a host that still has an
+abandoned call in flight fails fast instead of tying up another thread.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import docker
+
+
+LOCAL_HOST = 'local'
+
+
+class DockerHost:
+    def __init__(self, name: str, url: Optional[str], client=None, pool_size: int = 10, timeout: int = 60,
+                 on_client: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.url = url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.client = client
+        self.on_client = on_client  # called with each client this host creates, e.g. to instrument it
+        self.last_error: Optional[str] = None
+        self.last_ok: Optional[float] = None
+        self.stuck = 0  # fan-out calls that timed out but are still blocking a worker
+
+    def connect(self):
+        if self.client is None:
+            if self.url:
+                self.client = docker.DockerClient(
+                    base_url=self.url,
+                    max_pool_size=self.pool_size,
+                    timeout=self.timeout,
+                    use_ssh_client=self.url.startswith('ssh://')
+                )
+            else:
+                self.client = docker.from_env(max_pool_size=self.pool_size, timeout=self.timeout)
+            if self.on_client is not None:
+                self.on_client(self.client)
+        return self.client
+
+    def close(self):
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": self.url or "local",
+            "connected": self.client is not None,
+            "last_ok": self.last_ok,
+            "last_error": self.last_error,
+            "stuck_calls": self.stuck
+        }
+
+
+class DockerHostRegistry:
+    def __init__(self, timeout: float = 5.0, max_workers: int = 32, executor: Optional[ThreadPoolExecutor] = None,
+                 on_client: Optional[Callable[[Any], None]] = None):
+        self.timeout = timeout
+        self.on_client = on_client
+        self.hosts: Dict[str, DockerHost] = {}
+        # Don't pass the shared Docker I/O pool: calls abandoned on timeout would starve it
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker-fanout")
+
+    def add(self, name: str, url: Optional[str], client=None) -> DockerHost:
+        if name in self.hosts:
+            self.hosts[name].close()
+        host = DockerHost(name, url, client=client, on_client=self.on_client)
+        self.hosts[name] = host
+        return host
+
+    def remove(self, name: str) -> bool:
+        host = self.hosts.pop(name, None)
+        if host is None:
+            return False
+        host.close()
+        return True
+
+    def get(self, name: str) -> DockerHost:
+        if name not in self.hosts:
+            raise KeyError(name)
+        return self.hosts[name]
+
+    @staticmethod
+    def parse_env(value: str) -> Dict[str, str]:
+        """Parse DOCKER_HOSTS, e.g. ``nas=ssh://admin@nas,media=tcp://10.0.0.5:2375``"""
+        hosts = {}
+        for entry in (value or '').split(','):
+            name, sep, url = entry.strip().partition('=')
+            if sep and name and url:
+                hosts[name.strip()] = url.strip()
+        return hosts
+
+    async def call(self, name: str, fn: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``fn(client)`` on one host on the fan-out pool.
+
+        Raises ``asyncio.TimeoutError`` after ``timeout`` and ``ConnectionError``
+        straight away while an earlier call to the host is still pending.
+        """
+        host = self.get(name)
+        timeout = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+
+        def released():
+            host.stuck -= 1
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(released)
+            except RuntimeError:
+                host.stuck -= 1  # loop already closed, nothing else touches the counter now
+
+        if host.stuck:
+            raise ConnectionError("not responding, an earlier call is still pending")
+        future = self._executor.submit(lambda: fn(host.connect()))
+        try:
+            value = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            host.last_error = f"timed out after {timeout}s"
+            if not future.done():
+                host.stuck += 1
+                future.add_done_callback(release)
+            raise
+        except Exception as e:
+            host.last_error = str(e)
+            raise
+        host.last_ok = time.time()
+        host.last_error = None
+        return value
+
+    async def fan_out(self, fn: Callable[[Any], Any], hosts: Optional[List[str]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run ``fn(client)`` on every host at once.
+
+        Returns ``{"results": {host: value}, "errors": {host: message}}``; a
+        slow or unreachable host only costs its own timeout.
+        """
+        names = hosts if hosts is not None else list(self.hosts)
+        timeout = timeout if timeout is not None else self.timeout
+
+        async def run(name: str):
+            started = time.monotonic()
+            try:
+                value = await self.call(name, fn, timeout=timeout)
+                return name, value, None, time.monotonic() - started
+            except asyncio.TimeoutError:
+                error = f"timed out after {timeout}s"
+            except Exception as e:
+                error = str(e)
+            logging.error(f"Docker host {name}: {error}")
+            return name, None, error, time.monotonic() - started
+
+        unknown = [n for n in names if n not in self.hosts]
+        outcomes = await asyncio.gather(*(run(n) for n in names if n in self.hosts))
+
+        results, errors, timings = {}, {n: "unknown host" for n in unknown}, {}
+        for name, value, error, elapsed in outcomes:
+            timings[name] = round(elapsed * 1000, 1)
+            if error is None:
+                results[name] = value
+            else:
+                errors[name] = error
+        return {"results": results, "errors": errors, "timings_ms": timings}
+
+    def close(self):
+        for host in self.hosts.values():
+            host.close()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,121 @@
+"""Background sampler for host metrics.
+
+psutil's ``cpu_percent(interval=...)`` sleeps for the interval, and each
+caller used to pay for it on the event loop. Instead a task samples the
+kernel counters at a fixed interval and derives CPU (total and per core),
+network and disk I/O rates from the deltas between consecutive samples.
+Readers get the latest sample without touching psutil at all.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+
+def _busy_percent(before, after) -> float:
+    """CPU busy share between two ``cpu_times`` readings"""
+    idle_fields = ('idle', 'iowait')
+    # On Linux guest time is already included in user/nice
+    guest_fields = ('guest', 'guest_nice')
+    total = (sum(after) - sum(before)) - sum(getattr(after, f, 0) - getattr(before, f, 0) for f in guest_fields)
+    if total <= 0:
+        return 0.0
+    idle = sum(getattr(after, f, 0) - getattr(before, f, 0) for f in idle_fields)
+    return max(0.0, min(100.0, (1 - idle / total) * 100))
+
+
+class HostMetricsSampler:
+    def __init__(self, interval: float = 2.0, disk_path: str = '/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._previous: Optional[Dict[str, Any]] = None
+        self._latest: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+
+    def _counters(self) -> Dict[str, Any]:
+        return {
+            "time": time.monotonic(),
+            "cpu": psutil.cpu_times(),
+            "per_cpu": psutil.cpu_times(percpu=True),
+            "net": psutil.net_io_counters(),
+            "disk": psutil.disk_io_counters()
+        }
+
+    def sample(self) -> Dict[str, Any]:
+        """Read the counters once and compute rates against the previous reading"""
+        counters = self._counters()
+        previous = self._previous or counters
+        elapsed = counters['time'] - previous['time']
+
+        def rate(section: str, field: str) -> float:
+            if elapsed <= 0 or counters[section] is None or previous[section] is None:
+                return 0.0
+            # Counters can wrap or reset (e.g. an interface going away); report 0 rather than a negative rate
+            return round(max(getattr(counters[section], field) - getattr(previous[section], field), 0) / elapsed, 1)
+
+        per_core: List[float] = [
+            round(_busy_percent(before, after), 2)
+            for before, after in zip(previous['per_cpu'], counters['per_cpu'])
+        ]
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        load_1, load_5, load_15 = psutil.getloadavg()
+
+        self._previous = counters
+        self.samples += 1
+        return {
+            "cpu_percent": round(_busy_percent(previous['cpu'], counters['cpu']), 2),
+            "cpu_per_core": per_core,
+            "load_avg": [round(load_1, 2), round(load_5, 2), round(load_15, 2)],
+            "memory_percent": round(memory.percent, 2),
+            "memory_used_mb": round(memory.used / (1024 * 1024), 2),
+            "memory_total_mb": round(memory.total / (1024 * 1024), 2),
+            "swap_percent": round(swap.percent, 2),
+            "swap_used_mb": round(swap.used / (1024 * 1024), 2),
+            "swap_total_mb": round(swap.total / (1024 * 1024), 2),
+            "disk_percent": round(disk.percent, 2),
+            "disk_used_gb": round(disk.used / (1024 * 1024 * 1024), 2),
+            "disk_total_gb": round(disk.total / (1024 * 1024 * 1024), 2),
+            "net_rx_bytes_per_sec": rate('net', 'bytes_recv'),
+            "net_tx_bytes_per_sec": rate('net', 'bytes_sent'),
+            "disk_read_bytes_per_sec": rate('disk', 'read_bytes'),
+            "disk_write_bytes_per_sec": rate('disk', 'write_bytes'),
+            "sample_interval": round(elapsed, 3),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    def latest(self) -> Dict[str, Any]:
+        """The most recent sample, as a copy callers may modify (e.g. Mongo adds ``_id``)"""
+        if self._latest is None:
+            # Before the first tick: a baseline reading, rates are zero until the next one
+            self._latest = self.sample()
+        return dict(self._latest)
+
+    def start(self):
+        if self._task is None:
+            if self._previous is None:
+                self._previous = self._counters()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # disk_usage can stall on network filesystems; keep even that off the loop
+                self._latest = await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logging.error(f"Error sampling host metrics: {e}")
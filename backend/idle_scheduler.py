@@ -0,0 +1,266 @@
+"""Idle shutdown scheduler.
+
+Containers with a ``dockerwakeup.idle_timeout`` label (or a
+``dockerwakeup.route`` label, which falls back to the default idle timeout)
+are put to sleep once they have gone that many seconds without traffic. Last-access
+times live in memory and are fed by the wake proxy and by network counters
+from container stats. Deadlines sit in a min-heap, so the scheduler sleeps
+until the next container is due instead of sweeping on a fixed interval.
+
+All bookkeeping happens on the event loop. ``touch``, ``observe_network`` and
+``sync`` are also called from Docker I/O threads, so once the timer loop is
+running they hand their updates to the loop with ``call_soon_threadsafe``.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+IDLE_TIMEOUT_LABEL = 'dockerwakeup.idle_timeout'
+ROUTE_LABEL = 'dockerwakeup.route'
+
+
+def _parse_started_at(value: str) -> Optional[float]:
+    if not value or value.startswith('0001-'):
+        return None
+    # Docker reports nanoseconds, which fromisoformat can't parse
+    value = value.replace('Z', '+00:00')
+    if '.' in value:
+        head, _, rest = value.partition('.')
+        digits = ''.join(c for c in rest if c.isdigit())
+        value = f"{head}.{digits[:6]}{rest[len(digits):]}"
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class IdleScheduler:
+    def __init__(self, get_docker_client: Callable[[], Any], default_timeout: int = 3600,
+                 network_threshold: int = 4096):
+        self._get_docker_client = get_docker_client
+        self.default_timeout = default_timeout
+        self.network_threshold = network_threshold
+        self.last_access: Dict[str, float] = {}
+        self._timeouts: Dict[str, Optional[int]] = {}  # None means "use default_timeout"
+        self._deadlines: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._network_bytes: Dict[str, int] = {}
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self.is_busy: Callable[[str], bool] = lambda name: False
+        self.put_to_sleep: Callable[[str], str] = self._stop
+        self.on_sleep: Optional[Callable[[str, float, str], Awaitable[None]]] = None
+        self.stopped_count = 0
+
+    # Tracking
+    @staticmethod
+    def timeout_from_labels(labels: Dict[str, str]) -> Tuple[bool, Optional[int]]:
+        """Whether labels opt a container in, and its explicit timeout if any"""
+        value = (labels or {}).get(IDLE_TIMEOUT_LABEL, '')
+        if value:
+            try:
+                return int(value) > 0, int(value)
+            except ValueError:
+                logging.error(f"Invalid {IDLE_TIMEOUT_LABEL} label: {value}")
+        return bool((labels or {}).get(ROUTE_LABEL)), None
+
+    def timeout_for(self, name: str) -> int:
+        timeout = self._timeouts.get(name)
+        return timeout if timeout is not None else self.default_timeout
+
+    def track(self, name: str, labels: Dict[str, str], last_access: Optional[float] = None):
+        managed, timeout = self.timeout_from_labels(labels)
+        if not managed:
+            self.untrack(name)
+            return
+        self._timeouts[name] = timeout
+        self.last_access[name] = last_access if last_access is not None else time.time()
+        self._schedule(name)
+
+    def untrack(self, name: str):
+        self._timeouts.pop(name, None)
+        self._deadlines.pop(name, None)
+        self.last_access.pop(name, None)
+        self._network_bytes.pop(name, None)
+
+    def _on_loop(self, fn: Callable[..., None], *args):
+        """Run ``fn`` now if this is the loop's thread, otherwise queue it onto the loop"""
+        if self._loop is None or threading.get_ident() == self._loop_thread:
+            fn(*args)
+            return
+        try:
+            self._loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass  # loop already closed during shutdown
+
+    def touch(self, name: str):
+        """Record traffic for a container, pushing its deadline back"""
+        self._on_loop(self._touch, name)
+
+    def _touch(self, name: str):
+        if name not in self._timeouts:
+            return
+        self.last_access[name] = time.time()
+        self._schedule(name)
+
+    def observe_network(self, name: str, total_bytes: int):
+        """Treat growth of a container's rx+tx byte counters as activity"""
+        self._on_loop(self._observe_network, name, total_bytes)
+
+    def _observe_network(self, name: str, total_bytes: int):
+        if name not in self._timeouts:
+            return  # fed for every container; only tracked ones keep counters, and untrack drops them
+        previous = self._network_bytes.get(name)
+        self._network_bytes[name] = total_bytes
+        if previous is not None and total_bytes - previous >= self.network_threshold:
+            self._touch(name)
+
+    def set_default_timeout(self, seconds: int):
+        self.default_timeout = seconds
+        for name, timeout in self._timeouts.items():
+            if timeout is None:
+                self._schedule(name)
+
+    def _schedule(self, name: str):
+        deadline = self.last_access[name] + self.timeout_for(name)
+        previous = self._deadlines.get(name)
+        self._deadlines[name] = deadline
+        # Traffic only pushes deadlines later, so the existing heap entry is re-armed
+        # when it comes due instead of pushing one entry per request
+        if previous is None or deadline < previous:
+            heapq.heappush(self._heap, (deadline, name))
+            self._changed.set()
+
+    # Docker integration
+    def sync(self):
+        """Track every running container that opts in to idle shutdown (blocking)"""
+        client = self._get_docker_client()
+        if client is None:
+            return
+        running = [
+            (c.name, c.labels, _parse_started_at(c.attrs['State'].get('StartedAt', '')))
+            for c in client.containers.list(filters={"status": "running"})
+        ]
+        self._on_loop(self._apply_sync, running)
+
+    def _apply_sync(self, running: List[Tuple[str, Dict[str, str], Optional[float]]]):
+        for name, labels, started_at in running:
+            if name not in self._timeouts:
+                self.track(name, labels, started_at)
+        names = {name for name, _, _ in running}
+        for name in [n for n in self._timeouts if n not in names]:
+            self.untrack(name)
+
+    def handle_event(self, event: Dict[str, Any]):
+        if event.get('Type') != 'container':
+            return
+        attributes = event.get('Actor', {}).get('Attributes', {})
+        name = attributes.get('name')
+        if not name:
+            return
+        action = event.get('Action')
+        if action in ('start', 'unpause'):
+            self.track(name, attributes)
+        elif action in ('die', 'stop', 'pause', 'destroy'):
+            self.untrack(name)
+
+    # Timer loop
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+    def next_deadline(self) -> Optional[Tuple[float, str]]:
+        while self._heap:
+            deadline, name = self._heap[0]
+            current = self._deadlines.get(name)
+            if current == deadline:
+                return deadline, name
+            heapq.heappop(self._heap)
+            if current is not None and current > deadline:
+                heapq.heappush(self._heap, (current, name))
+        return None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Idle scheduler error: {e}")
+                await asyncio.sleep(1)
+
+    async def _run_once(self):
+        self._changed.clear()
+        upcoming = self.next_deadline()
+        delay = None if upcoming is None else upcoming[0] - time.time()
+        if delay is None or delay > 0:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        deadline, name = heapq.heappop(self._heap)
+        self._deadlines.pop(name, None)
+        if self.is_busy(name):
+            self._touch(name)
+            return
+        await self._put_to_sleep(name)
+
+    def _stop(self, name: str) -> str:
+        self._get_docker_client().containers.get(name).stop()
+        return 'stop'
+
+    async def _put_to_sleep(self, name: str):
+        idle_for = time.time() - self.last_access.get(name, time.time())
+        try:
+            strategy = await asyncio.to_thread(self.put_to_sleep, name)
+            # Only forget the container once it's actually asleep; on failure it stays
+            # tracked and is retried after another idle period
+            self.untrack(name)
+            self.stopped_count += 1
+            logging.info(f"Put idle container {name} to sleep ({strategy}) after {idle_for:.0f}s")
+            if self.on_sleep:
+                await self.on_sleep(name, idle_for, strategy)
+        except Exception as e:
+            logging.error(f"Error putting idle container {name} to sleep: {e}")
+            if name in self._timeouts and name not in self._deadlines:
+                deadline = time.time() + self.timeout_for(name)
+                self._deadlines[name] = deadline
+                heapq.heappush(self._heap, (deadline, name))
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "default_timeout": self.default_timeout,
+            "stopped_count": self.stopped_count,
+            "containers": [
+                {
+                    "name": name,
+                    "idle_timeout": self.timeout_for(name),
+                    "idle_seconds": round(now - self.last_access[name], 1),
+                    "stops_in": round(deadline - now, 1)
+                }
+                for name, deadline in sorted(self._deadlines.items(), key=lambda item: item[1])
+            ]
+        }
@@ -0,0 +1,413 @@
+"""Event-maintained index of local images, their layers and the containers using them.
+
+``images.list()`` inspects every image on every call, and ``attrs['Size']``
+counts a layer shared by several images once per image. The index is built
+once (one listing plus an inspect and a history call per image) and then kept
+current from Docker events. It tracks which images reference each layer and
+which containers use each image. From that it maintains, incrementally:
+
+* each image's unique bytes (layers no other image has) and shared bytes;
+* which images no container uses;
+* how much pruning every unused image would free (bytes in layers referenced
+  only by unused images), so the estimate is O(1) to read.
+
+Pruning removes the images the index has as unused, by id, rather than
+asking the daemon to prune, so a prune removes what its dry run reported.
+
+Layers are keyed by chain (a layer plus everything under it), which is how
+the daemon shares them. Per-layer sizes come from the image history. History
+doesn't mark which zero-size entries are layers, so for images with
+zero-byte layers bytes may be attributed to a neighbouring layer; an image's
+total is always right.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import docker
+
+from docker_events import DockerEventStream
+
+
+IMAGE_REFRESH_ACTIONS = ('pull', 'tag', 'untag', 'import', 'load', 'create', 'commit')
+MB = 1024 * 1024
+
+
+def chain_keys(diff_ids: List[str]) -> List[str]:
+    """Chain id of each layer: the layer identified together with all layers below it"""
+    keys, chain = [], ''
+    for diff_id in diff_ids:
+        chain = diff_id if not chain else 'sha256:' + hashlib.sha256(f"{chain} {diff_id}".encode()).hexdigest()
+        keys.append(chain)
+    return keys
+
+
+def layer_sizes(history: List[Dict[str, Any]], layer_count: int) -> List[int]:
+    """Size of each layer (bottom first) from an image's history (newest first)"""
+    entries = [entry.get('Size', 0) for entry in reversed(history)]
+    sizes = []
+    surplus = layer_count - sum(1 for size in entries if size > 0)  # zero-byte layers to place
+    for size in entries:
+        if len(sizes) == layer_count:
+            break
+        if size > 0:
+            sizes.append(size)
+        elif surplus > 0:
+            sizes.append(0)
+            surplus -= 1
+    return sizes + [0] * (layer_count - len(sizes))
+
+
+def fetch_image(client, ref: str) -> Optional[Dict[str, Any]]:
+    """Index record for an image id or reference; None if it no longer exists"""
+    try:
+        attrs = client.api.inspect_image(ref)
+        history = client.api.history(attrs['Id'])
+    except docker.errors.NotFound:
+        return None
+    diff_ids = (attrs.get('RootFS') or {}).get('Layers') or []
+    return {
+        "id": attrs['Id'],
+        "tags": [t for t in attrs.get('RepoTags') or [] if t != '<none>:<none>'],
+        "size": attrs.get('Size', 0),
+        "created": attrs.get('Created', ''),
+        "layers": chain_keys(diff_ids),
+        "layer_sizes": layer_sizes(history, len(diff_ids))
+    }
+
+
+def fetch_container(client, container_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        attrs = client.api.inspect_container(container_id)
+    except docker.errors.NotFound:
+        return None
+    return {"id": attrs['Id'], "name": attrs['Name'].lstrip('/'), "image": attrs['Image']}
+
+
+class ImageIndex:
+    def __init__(self, get_docker_client: Callable[[], Any], events: DockerEventStream,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self._get_docker_client = get_docker_client
+        self.events = events
+        self.executor = executor
+        self.images: Dict[str, Dict[str, Any]] = {}
+        self.layers: Dict[str, Dict[str, Any]] = {}  # chain -> {"size", "images", "used"}
+        self.unique: Dict[str, int] = {}  # image id -> bytes in layers no other image has
+        self.containers: Dict[str, Dict[str, Any]] = {}  # container id -> {"name", "image"}
+        self.usage: Dict[str, Set[str]] = {}  # image id -> ids of containers created from it
+        self.reclaimable = 0  # bytes in layers referenced only by unused images
+        self.generation: Optional[int] = None  # event stream generation the index was built under
+        self.listeners: List[Callable[[], None]] = []  # called after the index changes
+        self.stats = {"rebuilds": 0, "refreshes": 0, "last_build_ms": None}
+        self._lock = threading.Lock()
+        self._sync_lock = asyncio.Lock()
+        self._seq = 0  # event counter, to spot removals that race a fetch
+        self._removed: Dict[str, int] = {}  # id -> seq of its destroy/delete event
+        self._pending_images: Set[str] = set()
+        self._pending_containers: Set[str] = set()
+        self._flush_scheduled = False
+
+    # Layer accounting (callers hold self._lock)
+    def _link(self, image_id: str, chain: str, size: int, in_use: bool):
+        layer = self.layers.get(chain)
+        if layer is None:
+            layer = self.layers[chain] = {"size": size, "images": set(), "used": 0}
+        elif len(layer['images']) == 1:
+            (other,) = layer['images']
+            self.unique[other] -= layer['size']
+        was_free = bool(layer['images']) and layer['used'] == 0
+        layer['images'].add(image_id)
+        layer['used'] += in_use
+        if len(layer['images']) == 1:
+            self.unique[image_id] += layer['size']
+        self.reclaimable += layer['size'] * ((layer['used'] == 0) - was_free)
+
+    def _unlink(self, image_id: str, chain: str, in_use: bool):
+        layer = self.layers[chain]
+        was_free = layer['used'] == 0
+        if len(layer['images']) == 1:
+            self.unique[image_id] -= layer['size']
+        layer['images'].discard(image_id)
+        layer['used'] -= in_use
+        if len(layer['images']) == 1:
+            (other,) = layer['images']
+            self.unique[other] += layer['size']
+        self.reclaimable += layer['size'] * ((bool(layer['images']) and layer['used'] == 0) - was_free)
+        if not layer['images']:
+            del self.layers[chain]
+
+    def _set_in_use(self, image_id: str, in_use: bool):
+        image = self.images.get(image_id)
+        if image is None:
+            return
+        for chain in image['layers']:
+            layer = self.layers[chain]
+            was_free = layer['used'] == 0
+            layer['used'] += 1 if in_use else -1
+            self.reclaimable += layer['size'] * ((layer['used'] == 0) - was_free)
+
+    def _in_use(self, image_id: str) -> bool:
+        return bool(self.usage.get(image_id))
+
+    def _add_image(self, record: Dict[str, Any]):
+        self._remove_image(record['id'])
+        self.images[record['id']] = record
+        self.unique[record['id']] = 0
+        in_use = self._in_use(record['id'])
+        for chain, size in zip(record['layers'], record['layer_sizes']):
+            self._link(record['id'], chain, size, in_use)
+
+    def _remove_image(self, image_id: str):
+        record = self.images.pop(image_id, None)
+        if record is None:
+            return
+        in_use = self._in_use(image_id)
+        for chain in record['layers']:
+            self._unlink(image_id, chain, in_use)
+        del self.unique[image_id]
+
+    def _add_container(self, record: Dict[str, Any]):
+        self._remove_container(record['id'])
+        self.containers[record['id']] = {"name": record['name'], "image": record['image']}
+        users = self.usage.setdefault(record['image'], set())
+        users.add(record['id'])
+        if len(users) == 1:
+            self._set_in_use(record['image'], True)
+
+    def _remove_container(self, container_id: str):
+        container = self.containers.pop(container_id, None)
+        if container is None:
+            return
+        users = self.usage.get(container['image'], set())
+        users.discard(container_id)
+        if not users:
+            self.usage.pop(container['image'], None)
+            self._set_in_use(container['image'], False)
+
+    # Building and refreshing
+    def _map(self, fn, items):
+        if self.executor is not None:
+            return list(self.executor.map(fn, items))
+        return [fn(item) for item in items]
+
+    def _build(self, client):
+        summaries = client.api.images()
+        images = [r for r in self._map(lambda s: fetch_image(client, s['Id']), summaries) if r is not None]
+        containers = [
+            {"id": c['Id'], "name": (c.get('Names') or ['/'])[0].lstrip('/'), "image": c['ImageID']}
+            for c in client.api.containers(all=True)
+        ]
+        with self._lock:
+            self.images, self.layers, self.unique = {}, {}, {}
+            self.containers, self.usage, self.reclaimable = {}, {}, 0
+            for container in containers:
+                self.containers[container['id']] = {"name": container['name'], "image": container['image']}
+                self.usage.setdefault(container['image'], set()).add(container['id'])
+            for record in images:
+                self._add_image(record)
+
+    def _fetch_pending(self, client, image_refs: Set[str], container_ids: Set[str]):
+        images = self._map(lambda ref: (ref, fetch_image(client, ref)), image_refs)
+        containers = self._map(lambda cid: (cid, fetch_container(client, cid)), container_ids)
+        return images, containers
+
+    def _apply(self, images, containers, since: int):
+        with self._lock:
+            for ref, record in images:
+                if record is None:
+                    self._remove_image(ref)
+                elif self._removed.get(record['id'], -1) <= since:
+                    self._add_image(record)
+            for container_id, record in containers:
+                if record is not None and self._removed.get(container_id, -1) <= since:
+                    self._add_container(record)
+
+    def _forget_removed(self, since: int):
+        """Replay removals that happened while a fetch was in flight, then drop the older ones"""
+        with self._lock:
+            for object_id, seq in list(self._removed.items()):
+                if seq > since:
+                    self._remove_image(object_id)
+                    self._remove_container(object_id)
+                else:
+                    del self._removed[object_id]
+
+    async def rebuild(self):
+        client = self._get_docker_client()
+        if client is None:
+            return
+        async with self._sync_lock:
+            since, generation = self._seq, self.events.generation
+            started = time.monotonic()
+            await asyncio.to_thread(self._build, client)
+            self._forget_removed(since)
+            self.generation = generation
+            self.stats['rebuilds'] += 1
+            self.stats['last_build_ms'] = round((time.monotonic() - started) * 1000, 1)
+        self._changed()
+        # Events that arrived during the build are applied on top of it
+        if self._pending_images or self._pending_containers:
+            self._schedule_flush()
+
+    async def ensure_current(self) -> bool:
+        """Build or rebuild if needed; False when the index can't be trusted (event stream down)"""
+        if not self.events.connected:
+            return False
+        if self.generation != self.events.generation:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logging.error(f"Error building image index: {e}")
+                return False
+        return self.generation == self.events.generation
+
+    def _schedule_flush(self):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        async with self._sync_lock:
+            self._flush_scheduled = False
+            client = self._get_docker_client()
+            image_refs, self._pending_images = self._pending_images, set()
+            container_ids, self._pending_containers = self._pending_containers, set()
+            if client is None or self.generation is None:
+                return  # not built yet; the build will see these
+            since = self._seq
+            try:
+                images, containers = await asyncio.to_thread(self._fetch_pending, client, image_refs, container_ids)
+            except Exception as e:
+                logging.error(f"Error refreshing image index: {e}")
+                self.generation = None  # rebuild on next use rather than drift
+                return
+            self._apply(images, containers, since)
+            self._forget_removed(since)
+            self.stats['refreshes'] += 1
+        self._changed()
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener()
+
+    def handle_event(self, event: Dict[str, Any]):
+        kind, action = event.get('Type'), event.get('Action', '')
+        actor_id = event.get('Actor', {}).get('ID', '')
+        if kind == 'image':
+            self._seq += 1
+            if action == 'delete':
+                self._removed[actor_id] = self._seq
+                with self._lock:
+                    self._remove_image(actor_id)
+                self._changed()
+            elif action in IMAGE_REFRESH_ACTIONS:
+                self._pending_images.add(actor_id)
+                self._schedule_flush()
+        elif kind == 'container':
+            self._seq += 1
+            if action == 'destroy':
+                self._removed[actor_id] = self._seq
+                with self._lock:
+                    self._remove_container(actor_id)
+                self._changed()
+            elif action == 'create':
+                self._pending_containers.add(actor_id)
+                self._schedule_flush()
+            elif action == 'rename':
+                with self._lock:
+                    container = self.containers.get(actor_id)
+                    if container is not None:
+                        container['name'] = event.get('Actor', {}).get('Attributes', {}).get('name', container['name'])
+                self._changed()
+
+    def start(self):
+        asyncio.ensure_future(self.ensure_current())
+
+    # Reading
+    def describe(self, image_id: str) -> Dict[str, Any]:
+        with self._lock:
+            image = self.images[image_id]
+            unique = self.unique[image_id]
+            users = sorted(self.containers[c]['name'] for c in self.usage.get(image_id, ()) if c in self.containers)
+        return {
+            "id": image_id,
+            "tags": list(image['tags']),
+            "size": image['size'],
+            "unique_size": unique,
+            "shared_size": image['size'] - unique,
+            "created": image['created'],
+            "containers": users,
+            "in_use": bool(users),
+            # Removing an unused image frees exactly its unique layers
+            "reclaimable_size": 0 if users else unique
+        }
+
+    def describe_all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = list(self.images)
+        return [self.describe(image_id) for image_id in ids if image_id in self.images]
+
+    def prune_estimate(self) -> Dict[str, Any]:
+        """What pruning every unused image would remove and free"""
+        with self._lock:
+            unused = [self.images[i] for i in self.images if not self._in_use(i)]
+            return {
+                "images": [{"id": image['id'], "tags": list(image['tags'])} for image in unused],
+                "count": len(unused),
+                "space_reclaimable_mb": round(self.reclaimable / MB, 2)
+            }
+
+    def remove_unused(self, client, image_ids: List[str]) -> Dict[str, Any]:
+        """Remove exactly these images, each only while the index still has it unused.
+
+        Runs on a worker thread. Nothing is forced: an image's tags go first, then
+        its id, and the daemon still refuses to remove an image a container uses.
+        An image with dependent children is retried once they are gone."""
+        with self._lock:
+            refs = {i: list(self.images[i]['tags']) + [i] for i in image_ids if i in self.images}
+            freeable = [(layer['size'], set(layer['images'])) for layer in self.layers.values()
+                        if layer['images'] <= refs.keys()]
+        removed: List[str] = []
+        failed: Dict[str, str] = {}
+        progress = True
+        while refs and progress:
+            progress = False
+            for image_id in list(refs):
+                with self._lock:
+                    in_use = self._in_use(image_id)
+                if in_use:
+                    failed[image_id] = "in use by a container"
+                    del refs[image_id]
+                    continue
+                try:
+                    for ref in list(refs[image_id]):
+                        try:
+                            client.api.remove_image(ref)
+                        except docker.errors.NotFound:
+                            pass  # already gone
+                        refs[image_id].remove(ref)
+                except docker.errors.APIError as e:
+                    failed[image_id] = e.explanation or str(e)
+                    continue
+                del refs[image_id]
+                failed.pop(image_id, None)
+                removed.append(image_id)
+                progress = True
+        freed = sum(size for size, images in freeable if images <= set(removed))
+        return {"removed": removed, "failed": failed, "space_reclaimed_mb": round(freed / MB, 2)}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.generation is not None and self.generation == self.events.generation,
+                "images": len(self.images),
+                "layers": len(self.layers),
+                "containers": len(self.containers),
+                "reclaimable_mb": round(self.reclaimable / MB, 2),
+                "pending": len(self._pending_images) + len(self._pending_containers),
+                **self.stats
+            }
@@ -0,0 +1,277 @@
+"""Latency histograms, event-loop lag and an on-demand sampling profiler.
+
+``Instrumentation`` keeps one histogram per (kind, name), e.g.
+``("route", "GET /api/containers")``, ``("docker", "GET /containers/{id}/stats")``
+or ``("mongo", "insert activity_logs")``. Recording is a bisect and a few
+additions under a lock, cheap enough to leave on. Docker calls are timed at
+the HTTP layer (a requests response hook on the client), so every call is
+seen whichever module or thread makes it; MongoDB operations through a
+pymongo command listener.
+
+``SamplingProfiler`` samples every thread's stack at a fixed interval for a
+limited time and aggregates them into folded stacks (the input format of
+flamegraph tools) and per-function counts.
+"""
+import asyncio
+import bisect
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+
+# Upper bounds in seconds; the last bucket catches everything slower
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+# Docker API path segments that are actions on a collection rather than object names
+COLLECTION_ACTIONS = {'json', 'create', 'prune', 'load', 'search', 'get', 'build', 'events', 'df', 'info', 'version', '_ping'}
+API_VERSION = re.compile(r'^/v\d+\.\d+')
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = min(BUCKETS[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(seconds: float) -> float:
+            return round(seconds * 1000, 2)
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count) if self.count else 0.0,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p90_ms": ms(self.quantile(0.9)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max),
+            "total_ms": ms(self.total),
+            "buckets": {('+Inf' if b == float('inf') else f"{b * 1000:g}ms"): n for b, n in zip(BUCKETS, self.counts) if n}
+        }
+
+
+def docker_call_name(method: str, url: str) -> str:
+    """``GET /containers/{id}/stats`` from a Docker API request URL"""
+    path = url.split('://', 1)[-1]
+    path = '/' + path.split('/', 1)[1] if '/' in path else '/'
+    path = API_VERSION.sub('', path.split('?', 1)[0])
+    parts = [p for p in path.split('/') if p]
+    if len(parts) >= 2 and not (len(parts) == 2 and parts[1] in COLLECTION_ACTIONS):
+        # Object names (image references in particular) may contain slashes
+        action = parts[-1] if len(parts) > 2 else None
+        parts = [parts[0], '{id}'] + ([action] if action else [])
+    return f"{method} /{'/'.join(parts)}"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, instrumentation: 'Instrumentation'):
+        self.instrumentation = instrumentation
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ''
+
+    def _finished(self, event):
+        collection = self._collections.pop(event.request_id, '')
+        name = f"{event.command_name} {collection}".strip()
+        self.instrumentation.observe('mongo', name, event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+        self.instrumentation.errors['mongo'] += 1
+
+
+class Instrumentation:
+    def __init__(self, loop_lag_interval: float = 0.5):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.errors: Counter = Counter()
+        self.loop_lag_interval = loop_lag_interval
+        self.loop_lag_max = 0.0  # worst lag since start
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def observe(self, kind: str, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[(kind, name)] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, kind: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, time.perf_counter() - started)
+
+    def timed(self, kind: str, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args, **kwargs):
+            with self.timer(kind, name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    # Sources
+    def mongo_listener(self) -> MongoCommandListener:
+        return MongoCommandListener(self)
+
+    def instrument_docker_client(self, client):
+        """Time every HTTP request the docker-py client makes (to response headers)"""
+        def on_response(response, *args, **kwargs):
+            self.observe('docker', docker_call_name(response.request.method, response.request.url),
+                         response.elapsed.total_seconds())
+            if response.status_code >= 500:
+                self.errors['docker'] += 1
+        client.api.hooks['response'].append(on_response)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch_loop_lag())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch_loop_lag(self):
+        """How late a sleep wakes up is how long something else held the loop"""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.loop_lag_interval)
+            lag = max(0.0, time.perf_counter() - started - self.loop_lag_interval)
+            self.loop_lag_max = max(self.loop_lag_max, lag)
+            self.observe('loop', 'lag', lag)
+
+    def snapshot(self, kind: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            items = [(k, n, h.snapshot()) for (k, n), h in self.histograms.items() if kind is None or k == kind]
+        result: Dict[str, Dict[str, Any]] = {}
+        # Slowest in total first: that's where the time goes
+        for k, name, snap in sorted(items, key=lambda item: -item[2]['total_ms']):
+            result.setdefault(k, {})[name] = snap
+        return {
+            "since": self.started_at,
+            "loop_lag_max_ms": round(self.loop_lag_max * 1000, 2),
+            "errors": dict(self.errors),
+            "histograms": result
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.loop_lag_max = 0.0
+            self.started_at = time.time()
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()  # folded stack -> samples
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.ends_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float):
+        """Sample for ``seconds``; any previous results are discarded"""
+        if self.running:
+            raise RuntimeError("profiler already running")
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.ends_at = self.started_at + seconds
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, seconds: float):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join([names.get(ident, str(ident))] + stack[::-1])] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        self.ends_at = time.time()
+
+    def _selected(self, thread: Optional[str]) -> List[Tuple[str, int]]:
+        """Stacks of threads whose name starts with ``thread`` (all threads if None)"""
+        return [(stack, count) for stack, count in self.stacks.most_common()
+                if thread is None or stack.split(';', 1)[0].startswith(thread)]
+
+    def folded(self, thread: Optional[str] = None) -> str:
+        """One ``thread;outer;...;inner count`` line per distinct stack"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self._selected(thread))
+
+    def report(self, top: int = 30, thread: Optional[str] = None) -> Dict[str, Any]:
+        inclusive: Counter = Counter()
+        leaf: Counter = Counter()
+        for stack, count in self._selected(thread):
+            frames = stack.split(';')[1:]
+            for frame in set(frames):
+                inclusive[frame] += count
+            if frames:
+                leaf[frames[-1]] += count
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "top_inclusive": inclusive.most_common(top),
+            "top_self": leaf.most_common(top)
+        }
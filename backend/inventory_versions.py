@@ -0,0 +1,62 @@
+"""Content versions for inventory listings, for ETag / If-None-Match.
+
+Each kind of object (containers, images, volumes, networks) has a counter that
+Docker events bump. An ETag built from the counter identifies a listing's
+content without asking the daemon, so a matching ``If-None-Match`` can be
+answered with 304 straight away. ETags are only issued while the event stream
+is connected: events missed during a disconnect would otherwise leave a
+stale listing looking current, and each reconnect starts a new generation.
+"""
+import hashlib
+import uuid
+from typing import Any, Dict, Optional
+
+from docker_events import DockerEventStream
+
+
+# 'topology' has no events of its own; the topology graph bumps it when it changes
+KINDS = ('container', 'image', 'volume', 'network', 'topology')
+
+# Listings that show data owned by another kind: networks list their containers' names,
+# containers list their networks and their image's tag
+DEPENDENCIES = {
+    'container': {'network': ('rename', 'destroy')},
+    'network': {'container': ('connect', 'disconnect')},
+    'image': {'container': ('tag', 'untag', 'delete')}
+}
+
+
+class InventoryVersions:
+    def __init__(self, events: DockerEventStream):
+        self.events = events
+        self.epoch = uuid.uuid4().hex[:8]  # a restart invalidates every ETag handed out before it
+        self.versions: Dict[str, int] = dict.fromkeys(KINDS, 0)
+
+    def bump(self, kind: str):
+        self.versions[kind] += 1
+
+    def handle_event(self, event: Dict[str, Any]):
+        kind = event.get('Type')
+        if kind not in self.versions:
+            return
+        self.versions[kind] += 1
+        for dependent, actions in DEPENDENCIES.get(kind, {}).items():
+            if event.get('Action') in actions:
+                self.versions[dependent] += 1
+
+    def etag(self, kind: str, *parts: Any) -> Optional[str]:
+        """Weak ETag for a listing of ``kind``; ``parts`` are whatever else shapes the response (query params)"""
+        if not self.events.connected:
+            return None
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+        return f'W/"{kind}-{self.epoch}-{self.events.generation}-{self.versions[kind]}-{digest}"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+        if not if_none_match or not etag:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        # Weak comparison: W/ prefixes don't matter for If-None-Match
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return etag.removeprefix('W/') in candidates
@@ -0,0 +1,184 @@
+"""OpenMetrics exposition of container, host and backend metrics.
+
+A scrape renders whatever is already in memory: the latest full container
+sweep (kept in ``ContainerSnapshot`` by the /ws tick, or by the snapshot's
+own background refresh when nothing else is sweeping), the latest host
+sample and the internal status of the backend's caches and pools. Scraping
+never calls the Docker daemon, so the scrape interval doesn't change the
+daemon's load.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+MB = 1024 * 1024
+GB = 1024 * MB
+CONTAINER_STATES = ('created', 'running', 'paused', 'restarting', 'removing', 'exited', 'dead')
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: Any) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+
+
+class MetricFamily:
+    SUFFIXES = {'counter': '_total', 'info': '_info'}
+
+    def __init__(self, name: str, kind: str, help_text: str, unit: Optional[str] = None):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.unit = unit
+        self.samples: List[Tuple[Dict[str, Any], Any]] = []
+
+    def add(self, value: Any, **labels: Any) -> 'MetricFamily':
+        if value is not None:
+            self.samples.append((labels, value))
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# TYPE {self.name} {self.kind}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {_escape(self.help)}")
+        sample_name = self.name + self.SUFFIXES.get(self.kind, '')
+        for labels, value in self.samples:
+            label_text = ','.join(f'{key}="{_escape(v)}"' for key, v in labels.items() if v is not None)
+            lines.append(f"{sample_name}{{{label_text}}} {_number(value)}" if label_text else f"{sample_name} {_number(value)}")
+        return lines
+
+
+class OpenMetricsWriter:
+    def __init__(self, prefix: str = 'dockerdash'):
+        self.prefix = prefix
+        self.families: Dict[str, MetricFamily] = {}
+
+    def _family(self, name: str, kind: str, help_text: str, unit: Optional[str]) -> MetricFamily:
+        name = f"{self.prefix}_{name}"
+        if name not in self.families:
+            self.families[name] = MetricFamily(name, kind, help_text, unit)
+        return self.families[name]
+
+    def gauge(self, name: str, help_text: str, unit: Optional[str] = None) -> MetricFamily:
+        return self._family(name, 'gauge', help_text, unit)
+
+    def counter(self, name: str, help_text: str, unit: Optional[str] = None) -> MetricFamily:
+        return self._family(name, 'counter', help_text, unit)
+
+    def stateset(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'stateset', help_text, None)
+
+    def info(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'info', help_text, None)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families.values():
+            lines.extend(family.render())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class ContainerSnapshot:
+    """The latest full container sweep (container info dicts with ``stats``), refreshed in the
+    background only when nothing else has swept within ``max_age`` seconds"""
+
+    def __init__(self, max_age: float = 15.0):
+        self.max_age = max_age
+        self.containers: List[Dict[str, Any]] = []
+        self.updated_at: Optional[float] = None  # monotonic
+        self.stats = {"updates": 0, "background_sweeps": 0, "errors": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, containers: List[Dict[str, Any]]):
+        self.containers = containers
+        self.updated_at = time.monotonic()
+        self.stats['updates'] += 1
+
+    def age(self) -> Optional[float]:
+        return None if self.updated_at is None else time.monotonic() - self.updated_at
+
+    def start(self, sweep: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        if self._task is None and self.max_age > 0:
+            self._task = asyncio.create_task(self._run(sweep))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, sweep: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        while True:
+            age = self.age()
+            if age is not None and age < self.max_age:
+                await asyncio.sleep(self.max_age - age)
+                continue
+            try:
+                self.update(await sweep())
+                self.stats['background_sweeps'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                logging.error(f"Error refreshing container metrics snapshot: {e}")
+            await asyncio.sleep(self.max_age)
+
+
+def write_container_metrics(writer: OpenMetricsWriter, containers: List[Dict[str, Any]]):
+    info = writer.info('container', "Container metadata")
+    state = writer.stateset('container_state', "Container state")
+    cpu = writer.gauge('container_cpu_percent', "CPU usage as a percentage of one core times the number of cores")
+    memory = writer.gauge('container_memory_usage_bytes', "Memory usage", 'bytes')
+    memory_limit = writer.gauge('container_memory_limit_bytes', "Memory limit", 'bytes')
+    rates = {
+        'net_rx_bytes_per_sec': writer.gauge('container_network_receive_bytes_per_second', "Network receive rate"),
+        'net_tx_bytes_per_sec': writer.gauge('container_network_transmit_bytes_per_second', "Network transmit rate"),
+        'block_read_bytes_per_sec': writer.gauge('container_block_read_bytes_per_second', "Block device read rate"),
+        'block_write_bytes_per_sec': writer.gauge('container_block_write_bytes_per_second', "Block device write rate")
+    }
+    for c in containers:
+        labels = {"name": c['name'], "host": c.get('host')}
+        info.add(1, **labels, id=c['id'], image=c.get('image'), compose_project=c.get('compose_project') or None)
+        for value in CONTAINER_STATES:
+            state.add(int(c.get('state') == value), **labels, **{state.name: value})
+        stats = c.get('stats')
+        if not stats or c.get('state') != 'running':
+            continue
+        cpu.add(stats.get('cpu_percent'), **labels)
+        memory.add(round(stats.get('memory_mb', 0) * MB), **labels)
+        memory_limit.add(round(stats.get('memory_limit_mb', 0) * MB), **labels)
+        for field, family in rates.items():
+            family.add(stats.get(field), **labels)
+
+
+def write_host_metrics(writer: OpenMetricsWriter, sample: Dict[str, Any]):
+    writer.gauge('host_cpu_percent', "Host CPU busy percentage").add(sample['cpu_percent'])
+    per_core = writer.gauge('host_cpu_core_percent', "Per-core CPU busy percentage")
+    for core, value in enumerate(sample.get('cpu_per_core') or []):
+        per_core.add(value, core=core)
+    load = writer.gauge('host_load_average', "Load average")
+    for period, value in zip(('1m', '5m', '15m'), sample.get('load_avg') or []):
+        load.add(value, period=period)
+    writer.gauge('host_memory_used_bytes', "Memory in use", 'bytes').add(round(sample['memory_used_mb'] * MB))
+    writer.gauge('host_memory_total_bytes', "Total memory", 'bytes').add(round(sample['memory_total_mb'] * MB))
+    writer.gauge('host_swap_used_bytes', "Swap in use", 'bytes').add(round(sample['swap_used_mb'] * MB))
+    writer.gauge('host_disk_used_bytes', "Disk space in use", 'bytes').add(round(sample['disk_used_gb'] * GB))
+    writer.gauge('host_disk_total_bytes', "Total disk space", 'bytes').add(round(sample['disk_total_gb'] * GB))
+    writer.gauge('host_network_receive_bytes_per_second', "Network receive rate").add(sample['net_rx_bytes_per_sec'])
+    writer.gauge('host_network_transmit_bytes_per_second', "Network transmit rate").add(sample['net_tx_bytes_per_sec'])
+    writer.gauge('host_disk_read_bytes_per_second', "Disk read rate").add(sample['disk_read_bytes_per_sec'])
+    writer.gauge('host_disk_write_bytes_per_second', "Disk write rate").add(sample['disk_write_bytes_per_sec'])
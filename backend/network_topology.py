@@ -0,0 +1,282 @@
+"""In-memory graph of networks, containers, their addresses and published ports.
+
+``networks.list()`` inspects every network, and the UI then joined networks
+to containers itself. The graph is built from two list calls (networks and
+containers; the container listing already carries each container's network
+endpoints and ports) and then patched from events: network
+connect/disconnect edits a single edge, container events re-read a single
+container, so serving the topology never touches the daemon.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import docker
+
+from docker_events import DockerEventStream
+
+
+# Container actions that can change its state, name, ports or endpoints
+CONTAINER_REFRESH_ACTIONS = ('create', 'start', 'restart', 'stop', 'die', 'kill', 'pause', 'unpause', 'rename', 'update')
+# An endpoint (and so an address) only exists while the container runs
+ATTACHED_STATES = ('running', 'paused', 'restarting')
+
+
+def network_record(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    ipam = (attrs.get('IPAM') or {}).get('Config') or []
+    return {
+        "id": attrs['Id'],
+        "name": attrs['Name'],
+        "driver": attrs.get('Driver', ''),
+        "scope": attrs.get('Scope', 'local'),
+        "internal": attrs.get('Internal', False),
+        "subnet": ipam[0].get('Subnet', 'N/A') if ipam else 'N/A',
+        "gateway": ipam[0].get('Gateway', 'N/A') if ipam else 'N/A'
+    }
+
+
+def _endpoints(networks: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {
+        endpoint['NetworkID']: {
+            "ip_address": endpoint.get('IPAddress') or None,
+            "mac_address": endpoint.get('MacAddress') or None,
+            "aliases": endpoint.get('Aliases') or []
+        }
+        for endpoint in (networks or {}).values()
+        if endpoint.get('NetworkID')
+    }
+
+
+def container_record(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    """Graph node for a container, from either a container listing entry or an inspect"""
+    if 'State' in attrs and isinstance(attrs['State'], dict):
+        # Inspect: Ports is {"80/tcp": [{"HostIp", "HostPort"}]}
+        ports = []
+        for container_port, bindings in ((attrs.get('NetworkSettings') or {}).get('Ports') or {}).items():
+            port, _, protocol = container_port.partition('/')
+            for binding in bindings or []:
+                ports.append({"host_ip": binding.get('HostIp') or '0.0.0.0', "host_port": int(binding['HostPort']),
+                              "container_port": int(port), "protocol": protocol})
+        return {
+            "id": attrs['Id'],
+            "name": attrs['Name'].lstrip('/'),
+            "image": attrs['Config'].get('Image', ''),
+            "state": attrs['State'].get('Status', ''),
+            "ports": ports,
+            "networks": _endpoints((attrs.get('NetworkSettings') or {}).get('Networks'))
+        }
+    # Listing: Ports is [{"IP", "PrivatePort", "PublicPort", "Type"}]
+    return {
+        "id": attrs['Id'],
+        "name": (attrs.get('Names') or ['/'])[0].lstrip('/'),
+        "image": attrs.get('Image', ''),
+        "state": attrs.get('State', ''),
+        "ports": [
+            {"host_ip": p.get('IP') or '0.0.0.0', "host_port": p['PublicPort'],
+             "container_port": p['PrivatePort'], "protocol": p.get('Type', 'tcp')}
+            for p in attrs.get('Ports') or [] if p.get('PublicPort')
+        ],
+        "networks": _endpoints((attrs.get('NetworkSettings') or {}).get('Networks'))
+    }
+
+
+class NetworkTopology:
+    def __init__(self, get_docker_client: Callable[[], Any], events: DockerEventStream):
+        self._get_docker_client = get_docker_client
+        self.events = events
+        self.networks: Dict[str, Dict[str, Any]] = {}
+        self.containers: Dict[str, Dict[str, Any]] = {}
+        self.generation: Optional[int] = None  # event stream generation the graph was built under
+        self.listeners: List[Callable[[], None]] = []  # called after the graph changes
+        self.stats = {"rebuilds": 0, "refreshes": 0, "patches": 0, "last_build_ms": None}
+        self._lock = threading.Lock()
+        self._sync_lock = asyncio.Lock()
+        self._seq = 0  # event counter, to spot removals that race a fetch
+        self._removed: Dict[str, int] = {}  # id -> seq of its destroy event
+        self._pending_networks: Set[str] = set()
+        self._pending_containers: Set[str] = set()
+        self._flush_scheduled = False
+
+    # Building and refreshing
+    def _build(self, client):
+        networks = [network_record(n) for n in client.api.networks()]
+        containers = [container_record(c) for c in client.api.containers(all=True)]
+        with self._lock:
+            self.networks = {n['id']: n for n in networks}
+            self.containers = {c['id']: c for c in containers}
+
+    def _fetch_pending(self, client, network_ids: Set[str], container_ids: Set[str]):
+        def fetch(inspect, record, object_id):
+            try:
+                return object_id, record(inspect(object_id))
+            except docker.errors.NotFound:
+                return object_id, None
+        networks = [fetch(client.api.inspect_network, network_record, n) for n in network_ids]
+        containers = [fetch(client.api.inspect_container, container_record, c) for c in container_ids]
+        return networks, containers
+
+    def _apply(self, networks, containers, since: int):
+        with self._lock:
+            for table, fetched in ((self.networks, networks), (self.containers, containers)):
+                for object_id, record in fetched:
+                    if record is None:
+                        table.pop(object_id, None)
+                    elif self._removed.get(object_id, -1) <= since:
+                        table[object_id] = record
+
+    def _forget_removed(self, since: int):
+        """Replay removals that happened while a fetch was in flight, then drop the older ones"""
+        with self._lock:
+            for object_id, seq in list(self._removed.items()):
+                if seq > since:
+                    self.networks.pop(object_id, None)
+                    self.containers.pop(object_id, None)
+                else:
+                    del self._removed[object_id]
+
+    async def rebuild(self):
+        client = self._get_docker_client()
+        if client is None:
+            return
+        async with self._sync_lock:
+            since, generation = self._seq, self.events.generation
+            started = time.monotonic()
+            await asyncio.to_thread(self._build, client)
+            self._forget_removed(since)
+            self.generation = generation
+            self.stats['rebuilds'] += 1
+            self.stats['last_build_ms'] = round((time.monotonic() - started) * 1000, 1)
+        self._changed()
+        if self._pending_networks or self._pending_containers:
+            self._schedule_flush()
+
+    async def ensure_current(self) -> bool:
+        """Build or rebuild if needed; False when the graph can't be trusted (event stream down)"""
+        if not self.events.connected:
+            return False
+        if self.generation != self.events.generation:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logging.error(f"Error building network topology: {e}")
+                return False
+        return self.generation == self.events.generation
+
+    def _schedule_flush(self):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        async with self._sync_lock:
+            self._flush_scheduled = False
+            client = self._get_docker_client()
+            network_ids, self._pending_networks = self._pending_networks, set()
+            container_ids, self._pending_containers = self._pending_containers, set()
+            if client is None or self.generation is None:
+                return  # not built yet; the build will see these
+            since = self._seq
+            try:
+                networks, containers = await asyncio.to_thread(self._fetch_pending, client, network_ids, container_ids)
+            except Exception as e:
+                logging.error(f"Error refreshing network topology: {e}")
+                self.generation = None  # rebuild on next use rather than drift
+                return
+            self._apply(networks, containers, since)
+            self._forget_removed(since)
+            self.stats['refreshes'] += 1
+        self._changed()
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener()
+
+    def handle_event(self, event: Dict[str, Any]):
+        kind, action = event.get('Type'), event.get('Action', '')
+        actor = event.get('Actor', {})
+        actor_id = actor.get('ID', '')
+        if kind == 'network':
+            self._seq += 1
+            if action == 'destroy':
+                self._removed[actor_id] = self._seq
+                with self._lock:
+                    self.networks.pop(actor_id, None)
+                self._changed()
+            elif action == 'create':
+                self._pending_networks.add(actor_id)
+                self._schedule_flush()
+            elif action == 'disconnect':
+                with self._lock:
+                    container = self.containers.get(actor.get('Attributes', {}).get('container', ''))
+                    if container is not None:
+                        container['networks'].pop(actor_id, None)
+                self.stats['patches'] += 1
+                self._changed()
+                if self._sync_lock.locked():
+                    # A fetch in flight may have read the container before it disconnected
+                    self._pending_containers.add(actor.get('Attributes', {}).get('container', ''))
+                    self._schedule_flush()
+            elif action == 'connect':
+                # The event doesn't carry the address; re-read just that container
+                self._pending_containers.add(actor.get('Attributes', {}).get('container', ''))
+                self._schedule_flush()
+        elif kind == 'container':
+            self._seq += 1
+            if action == 'destroy':
+                self._removed[actor_id] = self._seq
+                with self._lock:
+                    self.containers.pop(actor_id, None)
+                self._changed()
+            elif action in CONTAINER_REFRESH_ACTIONS:
+                self._pending_containers.add(actor_id)
+                self._schedule_flush()
+
+    def start(self):
+        asyncio.ensure_future(self.ensure_current())
+
+    # Reading
+    def graph(self) -> Dict[str, Any]:
+        """Network and container nodes plus one edge per endpoint"""
+        with self._lock:
+            networks = [dict(n) for n in self.networks.values()]
+            containers = list(self.containers.values())
+            edges = [
+                {"network": network_id, "container": c['id'], **endpoint,
+                 "attached": c['state'] in ATTACHED_STATES}
+                for c in containers
+                for network_id, endpoint in c['networks'].items()
+                if network_id in self.networks
+            ]
+            nodes = [
+                {key: c[key] for key in ('id', 'name', 'image', 'state', 'ports')}
+                for c in containers
+            ]
+        return {
+            "networks": networks,
+            "containers": nodes,
+            "edges": edges,
+            "counts": {"networks": len(networks), "containers": len(nodes), "edges": len(edges)}
+        }
+
+    def network_members(self) -> List[Dict[str, Any]]:
+        """Each network with the names of the containers currently attached to it"""
+        with self._lock:
+            members = {network_id: [] for network_id in self.networks}
+            for c in self.containers.values():
+                if c['state'] in ATTACHED_STATES:
+                    for network_id in c['networks']:
+                        if network_id in members:
+                            members[network_id].append(c['name'])
+            return [{**n, "containers": members[n['id']]} for n in self.networks.values()]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.generation is not None and self.generation == self.events.generation,
+                "networks": len(self.networks),
+                "containers": len(self.containers),
+                "pending": len(self._pending_networks) + len(self._pending_containers),
+                **self.stats
+            }
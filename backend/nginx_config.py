@@ -0,0 +1,339 @@
+"""nginx config rendered from the live container inventory.
+
+Every container with a ``dockerwakeup.route`` label gets an upstream whose
+primary server is its published host port, with the wake proxy behind it:
+while the container runs nginx talks to it directly, and once it is asleep
+the connection failure falls through to the proxy, which wakes it.
+
+That fallback only works for containers put to sleep by stopping them. A
+paused container keeps its published port bound, so the connection is
+accepted and nginx waits out ``proxy_read_timeout`` without ever counting a
+failure; routes whose ``dockerwakeup.sleep_strategy`` is ``pause`` or
+``checkpoint`` therefore use the wake proxy as their only server, and all
+their traffic goes through it.
+
+Domain routes get a full ``server`` block. Path routes get a ``location``
+snippet under ``locations/`` for inclusion in an existing server block; the
+container sees the path with its prefix stripped, and when it can't be
+reached the request falls through to a named location that hands the wake
+proxy the original URI, so the proxy finds the route by its prefix:
+
+    include /etc/nginx/dockerwakeup/*.conf;               # http context
+    include /etc/nginx/dockerwakeup/locations/*.conf;     # server context
+
+Only files whose content hash changed are rewritten, and all changes from one
+burst of container events share a single debounced reload.
+
+Route labels end up inside nginx directives, so anything that isn't a plain
+host name or path is skipped, as are root routes (``location /`` would clash
+with the including server block) and routes that collide with another
+container's route or file name. One bad label must not fail ``nginx -t`` and
+block every later reload.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sleep_strategy import SleepManager
+from wake_proxy import ROUTE_HEADER
+
+
+ROUTE_LABEL = 'dockerwakeup.route'
+# Strategies whose sleeping containers nginx can't detect, so their routes always go through the wake proxy
+PROXIED_STRATEGIES = ('pause', 'checkpoint')
+HEADER = "# Generated by DockerWakeUp - changes are overwritten\n"
+_LABEL = r'[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?'
+_SEGMENT = r'[A-Za-z0-9_~-][A-Za-z0-9._~-]*'
+ROUTE_PATTERN = re.compile(
+    rf'(?:{_LABEL}(?:\.{_LABEL})+|/{_SEGMENT}|[A-Za-z0-9_~-]+|)(?:/{_SEGMENT})*/?'
+)
+
+
+def valid_route(route: str) -> bool:
+    """A host name ("media.example.com") or a path ("/jellyfin"), and nothing nginx could misread"""
+    return bool(route) and len(route) <= 255 and ROUTE_PATTERN.fullmatch(route) is not None
+
+
+def route_key(route: str) -> str:
+    """What a route claims: the lowercased host of a domain route, the prefix of a path route"""
+    value = route.strip()
+    if value and not value.startswith('/') and '.' in value:
+        return value.split('/', 1)[0].lower()
+    return '/' + value.strip('/') if value.strip('/') else ''
+
+
+def route_slug(route: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9]+', '_', route.strip('/')).strip('_').lower() or 'root'
+
+
+def published_port(attrs: Dict[str, Any]) -> Optional[int]:
+    """First published TCP host port of a container, running or not"""
+    ports = (attrs.get('NetworkSettings') or {}).get('Ports') or {}
+    if not any(ports.values()):
+        ports = (attrs.get('HostConfig') or {}).get('PortBindings') or {}
+    for key, bindings in ports.items():
+        if not key.endswith('/tcp') or not bindings:
+            continue
+        for binding in bindings:
+            if binding.get('HostPort'):
+                return int(binding['HostPort'])
+    return None
+
+
+def render_route(route: str, container_name: str, host_port: Optional[int], wake_proxy_addr: str,
+                 listen: str = '80', strategy: str = 'stop') -> Dict[str, str]:
+    """Render the files for one route, keyed by path relative to the config directory"""
+    slug = route_slug(route)
+    upstream = f"dockerwakeup_{slug}"
+    direct = bool(host_port) and strategy not in PROXIED_STRATEGIES
+    value = route.strip()
+    domain = bool(value) and not value.startswith('/') and '.' in value
+
+    servers = []
+    if direct:
+        servers.append(f"    server 127.0.0.1:{host_port} max_fails=1 fail_timeout=5s;")
+        if domain:
+            servers.append(f"    server {wake_proxy_addr} backup;")
+    else:
+        servers.append(f"    server {wake_proxy_addr};")
+
+    proxy_settings = (
+        "        proxy_set_header Host $host;\n"
+        "        proxy_set_header X-Real-IP $remote_addr;\n"
+        "        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;\n"
+        "        proxy_set_header X-Forwarded-Proto $scheme;\n"
+        "        proxy_set_header Upgrade $http_upgrade;\n"
+        "        proxy_set_header Connection $connection_upgrade;\n"
+        "        proxy_http_version 1.1;\n"
+        "        proxy_buffering off;\n"
+        "        proxy_request_buffering off;\n"
+        "        proxy_next_upstream error timeout;\n"
+    )
+
+    upstream_block = (
+        f"{HEADER}# route {route} -> container {container_name}\n"
+        f"upstream {upstream} {{\n" + "\n".join(servers) + "\n}\n"
+    )
+
+    if domain:
+        server_block = (
+            f"\nserver {{\n"
+            f"    listen {listen};\n"
+            f"    server_name {value.split('/', 1)[0]};\n\n"
+            f"    location / {{\n"
+            f"        proxy_pass http://{upstream};\n"
+            f"        proxy_set_header {ROUTE_HEADER} \"{route}\";\n"
+            f"{proxy_settings}"
+            f"    }}\n"
+            f"}}\n"
+        )
+        return {f"{slug}.conf": upstream_block + server_block}
+
+    # The container is served with the prefix stripped, but the wake proxy gets the original
+    # URI and matches the route by its prefix: it can't rely on ROUTE_HEADER, which it only
+    # accepts from trusted peers. An upstream server can't have a URI of its own, so instead
+    # of a backup server a failed connection falls through to a named location.
+    prefix = '/' + value.strip('/') if value.strip('/') else ''
+    settings = proxy_settings.replace("        ", "    ")
+    if direct:
+        location = (
+            f"location {prefix}/ {{\n"
+            f"    proxy_pass http://{upstream}/;\n"
+            f"{settings}"
+            f"    error_page 502 504 = @{upstream}_wake;\n"
+            f"}}\n\n"
+            f"location @{upstream}_wake {{\n"
+            f"    proxy_pass http://{wake_proxy_addr};\n"
+            f"{settings}"
+            f"}}\n"
+        )
+    else:
+        location = (
+            f"location {prefix}/ {{\n"
+            f"    proxy_pass http://{upstream};\n"
+            f"{settings}"
+            f"}}\n"
+        )
+    location = f"{HEADER}# route {route} -> container {container_name}\n" + location
+    return {f"{slug}.conf": upstream_block, os.path.join('locations', f"{slug}.conf"): location}
+
+
+MAP_FILE = (
+    f"{HEADER}"
+    "map $http_upgrade $connection_upgrade {\n"
+    "    default upgrade;\n"
+    "    ''      close;\n"
+    "}\n"
+)
+
+
+class NginxConfigManager:
+    def __init__(self, get_docker_client: Callable[[], Any], conf_dir: str, wake_proxy_addr: str,
+                 reload_command: str = 'nginx -t && nginx -s reload', debounce: float = 2.0, listen: str = '80'):
+        self._get_docker_client = get_docker_client
+        self.conf_dir = conf_dir
+        self.wake_proxy_addr = wake_proxy_addr
+        self.reload_command = reload_command
+        self.debounce = debounce
+        self.listen = listen
+        self._hashes: Dict[str, str] = {}  # relative path -> sha256 of what is on disk
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._sync_lock = asyncio.Lock()
+        self.stats = {"syncs": 0, "files_written": 0, "files_removed": 0, "reloads": 0, "reload_failures": 0}
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self.skipped: Dict[str, Dict[str, str]] = {}  # container -> route and why it isn't in the config
+
+    # Rendering
+    def _inventory(self) -> List[Tuple[str, str, Optional[int], str]]:
+        client = self._get_docker_client()
+        if client is None:
+            return []
+        return [
+            (c.labels[ROUTE_LABEL], c.name, published_port(c.attrs), SleepManager.strategy_for(c.labels))
+            for c in client.containers.list(all=True, filters={"label": ROUTE_LABEL})
+        ]
+
+    def render(self, inventory: List[Tuple[str, str, Optional[int], str]]) -> Dict[str, str]:
+        files = {"00-dockerwakeup-map.conf": MAP_FILE}
+        keys: Dict[str, str] = {}  # route key -> container that claimed it
+        slugs: Dict[str, str] = {}
+        skipped: Dict[str, Dict[str, str]] = {}
+        # Sorted, so the same container wins a collision on every render
+        for route, container_name, host_port, strategy in sorted(inventory):
+            key, slug = route_key(route), route_slug(route)
+            if not valid_route(route):
+                reason = "invalid route"
+            elif not key:
+                reason = "root route would clash with the including server block"
+            elif key in keys:
+                reason = f"route already used by {keys[key]}"
+            elif slug in slugs:
+                reason = f"config file name {slug}.conf already used by {slugs[slug]}"
+            else:
+                keys[key] = slugs[slug] = container_name
+                files.update(render_route(route, container_name, host_port, self.wake_proxy_addr, self.listen, strategy))
+                continue
+            skipped[container_name] = {"route": route, "reason": reason}
+
+        for container_name, entry in skipped.items():
+            if self.skipped.get(container_name) != entry:
+                logging.warning(f"Skipping nginx route {entry['route']!r} of {container_name}: {entry['reason']}")
+        self.skipped = skipped
+        return files
+
+    # Writing
+    def _load_existing(self):
+        """Seed hashes from generated files already on disk so a restart doesn't rewrite them"""
+        for sub in ('', 'locations'):
+            directory = os.path.join(self.conf_dir, sub)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                path = os.path.join(directory, filename)
+                if not filename.endswith('.conf') or not os.path.isfile(path):
+                    continue
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                if raw.startswith(HEADER.encode()):
+                    self._hashes[os.path.join(sub, filename) if sub else filename] = hashlib.sha256(raw).hexdigest()
+
+    def apply(self, files: Dict[str, str]) -> List[str]:
+        """Write changed files and delete generated files that are no longer rendered; returns changed paths"""
+        if not self._hashes:
+            self._load_existing()
+        changed = []
+        for rel_path, content in files.items():
+            raw = content.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            if self._hashes.get(rel_path) == digest:
+                continue
+            path = os.path.join(self.conf_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+            self._hashes[rel_path] = digest
+            self.stats['files_written'] += 1
+            changed.append(rel_path)
+
+        for rel_path in [p for p in self._hashes if p not in files]:
+            try:
+                os.remove(os.path.join(self.conf_dir, rel_path))
+            except FileNotFoundError:
+                pass
+            del self._hashes[rel_path]
+            self.stats['files_removed'] += 1
+            changed.append(rel_path)
+        return changed
+
+    # Sync and reload
+    async def sync(self) -> List[str]:
+        async with self._sync_lock:
+            self.stats['syncs'] += 1
+            inventory = await asyncio.to_thread(self._inventory)
+            changed = await asyncio.to_thread(self.apply, self.render(inventory))
+            if changed:
+                logging.info(f"nginx config changed: {', '.join(changed)}")
+                await self.reload()
+            return changed
+
+    async def reload(self):
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_shell(
+            self.reload_command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        output, _ = await process.communicate()
+        self.last_reload = {
+            "exit_code": process.returncode,
+            "output": output.decode('utf-8', errors='replace')[-2000:],
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            "timestamp": time.time()
+        }
+        if process.returncode == 0:
+            self.stats['reloads'] += 1
+        else:
+            self.stats['reload_failures'] += 1
+            logging.error(f"nginx reload failed: {self.last_reload['output']}")
+
+    def request_sync(self):
+        """Debounce: a burst of events results in one render and at most one reload"""
+        loop = asyncio.get_running_loop()
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = loop.call_later(self.debounce, self._fire)
+
+    def _fire(self):
+        self._pending = None
+        asyncio.ensure_future(self._safe_sync())
+
+    async def _safe_sync(self):
+        try:
+            await self.sync()
+        except Exception as e:
+            logging.error(f"Error syncing nginx config: {e}")
+
+    def handle_event(self, event: Dict[str, Any]):
+        if event.get('Type') != 'container':
+            return
+        if event.get('Action') not in ('create', 'destroy', 'start', 'rename', 'update'):
+            return
+        attributes = event.get('Actor', {}).get('Attributes', {})
+        if ROUTE_LABEL in attributes or event.get('Action') in ('destroy', 'rename'):
+            self.request_sync()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "conf_dir": self.conf_dir,
+            "files": dict(self._hashes),
+            "pending": self._pending is not None,
+            "last_reload": self.last_reload,
+            "skipped": dict(self.skipped),
+            "stats": dict(self.stats)
+        }
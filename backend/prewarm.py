@@ -0,0 +1,189 @@
+"""Predictive pre-warming of sleeping containers.
+
+Proxy accesses are recorded per route and folded into a time-of-week profile
+of 15 minute slots. A slot is predicted active when the route was used in it
+in at least ``min_fraction`` of the observed weeks. Shortly before such a slot
+the route's container is started so the first request doesn't pay for a cold
+start; the idle scheduler puts it back to sleep if nobody comes. Containers
+are woken through the proxy's wake-up (``wake``), so a request arriving
+mid-warm-up joins that start and its readiness wait instead of racing it.
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from docker_async import DockerExecutor
+from sleep_strategy import SleepManager
+
+
+SLOT_SECONDS = 15 * 60
+WEEK_SECONDS = 7 * 24 * 3600
+WEEK_ANCHOR = date(1970, 1, 5)  # a Monday
+
+
+def week_slot(ts: float) -> Tuple[int, int]:
+    """(week number, slot of the week) for a timestamp, in local time"""
+    local = datetime.fromtimestamp(ts)
+    seconds_into_week = local.weekday() * 86400 + local.hour * 3600 + local.minute * 60 + local.second
+    # Counted in calendar days from a fixed Monday, so DST shifts can't move a week boundary
+    monday = local.date() - timedelta(days=local.weekday())
+    return (monday - WEEK_ANCHOR).days // 7, seconds_into_week // SLOT_SECONDS
+
+
+class Prewarmer:
+    def __init__(self, get_docker_client: Callable[[], Any], sleep_manager: Optional[SleepManager] = None,
+                 lead_time: float = 300.0, history_weeks: int = 4, min_fraction: float = 0.5,
+                 check_interval: float = 60.0, wake: Optional[Callable[[str], Awaitable[bool]]] = None,
+                 executor: Optional[DockerExecutor] = None):
+        self._get_docker_client = get_docker_client
+        self._run = executor.run if executor is not None else asyncio.to_thread
+        # Wakes a container by name and says whether it had to start it
+        self.wake = wake or (lambda container_name: self._run(self._start, container_name))
+        self.sleep_manager = sleep_manager or SleepManager(get_docker_client)
+        self.lead_time = lead_time
+        self.history_weeks = history_weeks
+        self.min_fraction = min_fraction
+        self.check_interval = check_interval
+        self.routes: Dict[str, str] = {}  # route -> container name
+        self._slots: Dict[str, Dict[int, Set[int]]] = {}  # route -> slot -> weeks seen
+        self._first_seen: Dict[str, float] = {}
+        self._last_recorded: Dict[str, int] = {}  # route -> minute of the last stored access
+        self._warmed_slots: Set[Tuple[str, int, int]] = set()
+        self.prewarmed: Dict[str, float] = {}  # container -> when we started it
+        self._used: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.persist: Optional[Callable[[str, str, float], None]] = None
+        self.stats = {"requests": 0, "cold_starts": 0, "prewarms": 0, "prewarms_used": 0, "prewarm_hits": 0}
+
+    # Recording
+    def load(self, route: str, container_name: str, ts: float):
+        """Add a historical access without persisting it again"""
+        self.routes[route] = container_name
+        week, slot = week_slot(ts)
+        self._slots.setdefault(route, {}).setdefault(slot, set()).add(week)
+        self._first_seen[route] = min(self._first_seen.get(route, ts), ts)
+        self._last_recorded[route] = max(self._last_recorded.get(route, 0), int(ts // 60))
+
+    def on_request(self, route: str, container_name: str, cold_start: bool):
+        """Proxy hook: count the request and fold it into the profile"""
+        now = time.time()
+        self.stats['requests'] += 1
+        if cold_start:
+            self.stats['cold_starts'] += 1
+        elif container_name in self.prewarmed:
+            self.stats['prewarm_hits'] += 1
+            if container_name not in self._used:
+                self._used.add(container_name)
+                self.stats['prewarms_used'] += 1
+
+        # One stored access per route per minute is plenty for a 15 minute profile
+        if self._last_recorded.get(route) == int(now // 60):
+            return
+        self.load(route, container_name, now)
+        if self.persist:
+            self.persist(route, container_name, now)
+
+    def on_container_stopped(self, container_name: str):
+        self.prewarmed.pop(container_name, None)
+        self._used.discard(container_name)
+
+    def handle_event(self, event: Dict[str, Any]):
+        if event.get('Type') == 'container' and event.get('Action') == 'die':
+            self.on_container_stopped(event.get('Actor', {}).get('Attributes', {}).get('name', ''))
+
+    # Prediction
+    def _observed_weeks(self, route: str, now: float) -> int:
+        span = now - self._first_seen.get(route, now)
+        return max(1, min(self.history_weeks, math.ceil(span / WEEK_SECONDS)))
+
+    def is_predicted(self, route: str, ts: float) -> bool:
+        week, slot = week_slot(ts)
+        weeks_seen = {w for w in self._slots.get(route, {}).get(slot, ()) if week - self.history_weeks <= w < week}
+        return len(weeks_seen) >= self.min_fraction * self._observed_weeks(route, ts)
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, str, int, int]]:
+        """Routes whose predicted use starts within the lead time and haven't been warmed for it"""
+        now = now if now is not None else time.time()
+        week, slot = week_slot(now + self.lead_time)
+        return [
+            (route, container_name, week, slot)
+            for route, container_name in self.routes.items()
+            if (route, week, slot) not in self._warmed_slots and self.is_predicted(route, now + self.lead_time)
+        ]
+
+    def profile(self, route: str) -> List[Dict[str, Any]]:
+        """Predicted active slots for a route as weekday/time ranges"""
+        now = time.time()
+        observed = self._observed_weeks(route, now)
+        result = []
+        for slot, weeks in sorted(self._slots.get(route, {}).items()):
+            if len(weeks) >= self.min_fraction * observed:
+                minutes = slot * SLOT_SECONDS // 60
+                result.append({
+                    "weekday": minutes // 1440,
+                    "time": f"{minutes % 1440 // 60:02d}:{minutes % 60:02d}",
+                    "weeks_seen": len(weeks)
+                })
+        return result
+
+    # Warming
+    def _start(self, container_name: str) -> bool:
+        container = self._get_docker_client().containers.get(container_name)
+        return self.sleep_manager.wake(container)
+
+    async def check(self, now: Optional[float] = None):
+        if self._get_docker_client() is None:
+            return
+        due = self.due(now)
+        for route, _, week, slot in due:
+            self._warmed_slots.add((route, week, slot))
+        await asyncio.gather(*(self._warm(route, container_name) for route, container_name, _, _ in due))
+        # Slots of past weeks can't come due again
+        current_week = week_slot(now if now is not None else time.time())[0]
+        self._warmed_slots = {key for key in self._warmed_slots if key[1] >= current_week}
+
+    async def _warm(self, route: str, container_name: str):
+        try:
+            if await self.wake(container_name):
+                self.prewarmed[container_name] = time.time()
+                self._used.discard(container_name)
+                self.stats['prewarms'] += 1
+                logging.info(f"Pre-warmed {container_name} ahead of predicted use of route {route}")
+        except Exception as e:
+            logging.error(f"Error pre-warming {container_name}: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logging.error(f"Pre-warm check failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> Dict[str, Any]:
+        requests = self.stats['requests']
+        return {
+            **self.stats,
+            "hit_rate": round((requests - self.stats['cold_starts']) / requests, 4) if requests else None,
+            "prewarmed": list(self.prewarmed),
+            "routes": {
+                route: {"container": container_name, "predicted_slots": self.profile(route)}
+                for route, container_name in self.routes.items()
+            }
+        }
@@ -0,0 +1,226 @@
+"""Readiness detection for containers started by the backend.
+
+A container with a healthcheck is ready once Docker reports it healthy (a
+``health_status: healthy`` event, or its inspected state when no event stream
+is available); an open port says nothing about what its healthcheck is
+waiting for. Any other container counts as ready on the first of:
+
+* a TCP connect to its first TCP port, retried with exponential backoff that
+  starts at a few milliseconds
+* when the ``dockerwakeup.health_path`` label is set, an HTTP GET of that path
+  answering with a status below 500, retried on the same schedule instead of
+  the bare TCP connect
+
+Wake-to-ready latency is recorded per container. The tracker also remembers
+which containers it has seen become ready since they last stopped, and shares
+an in-flight wait with anyone else asking about the same container, so a
+request for a container some other path just started waits for that start
+instead of reaching a process that is still booting.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from docker_events import DockerEventStream
+
+
+HEALTH_PATH_LABEL = 'dockerwakeup.health_path'
+PROBE_INITIAL_DELAY = 0.005
+PROBE_MAX_DELAY = 0.5
+PROBE_CONNECT_TIMEOUT = 1.0
+HEALTH_POLL_INTERVAL = 0.5
+# Container events after which a container has to prove it's ready again
+NOT_READY_ACTIONS = ('die', 'stop', 'kill', 'pause', 'restart', 'destroy', 'health_status: unhealthy')
+
+
+def container_address(attrs: Dict[str, Any], name: str) -> Optional[Tuple[str, int]]:
+    """Address of a running container's first TCP port, or None when it exposes none"""
+    settings = attrs.get('NetworkSettings') or {}
+    ports = settings.get('Ports') or {}
+    container_port = None
+    for key in ports or (attrs.get('Config') or {}).get('ExposedPorts') or {}:
+        port, _, protocol = key.partition('/')
+        if protocol in ('', 'tcp'):
+            container_port = int(port)
+            break
+    if container_port is None:
+        return None
+
+    for network in (settings.get('Networks') or {}).values():
+        if network.get('IPAddress'):
+            return network['IPAddress'], container_port
+
+    bindings = ports.get(f"{container_port}/tcp") or []
+    if bindings:
+        return '127.0.0.1', int(bindings[0]['HostPort'])
+    return name, container_port
+
+
+async def tcp_probe(host: str, port: int) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=PROBE_CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def http_probe(host: str, port: int, path: str) -> bool:
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=PROBE_CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=PROBE_CONNECT_TIMEOUT)
+        parts = status_line.split()
+        return len(parts) >= 2 and parts[1].isdigit() and int(parts[1]) < 500
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+
+class ReadinessTracker:
+    """Waits for started containers to become ready and records how long it took"""
+
+    def __init__(self, events: Optional[DockerEventStream] = None, history: int = 50):
+        self._events = events
+        self._history = history
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._waits: Dict[str, asyncio.Future] = {}  # container name -> wait in flight
+        self._ready: Set[str] = set()
+        self.listeners: List[Callable[[str, float], None]] = []
+
+    def is_ready(self, container_name: str) -> bool:
+        """Seen ready since it last stopped; False while a wait for it is in flight"""
+        return container_name in self._ready and container_name not in self._waits
+
+    def handle_event(self, event: Dict[str, Any]):
+        if event.get('Type') == 'container' and event.get('Action') in NOT_READY_ACTIONS:
+            self._ready.discard(event.get('Actor', {}).get('Attributes', {}).get('name', ''))
+
+    async def _wait_probe(self, host: str, port: int, http_path: Optional[str]):
+        delay = PROBE_INITIAL_DELAY
+        while True:
+            ready = await http_probe(host, port, http_path) if http_path else await tcp_probe(host, port)
+            if ready:
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PROBE_MAX_DELAY)
+
+    def _watch_health(self, container_id: str) -> Tuple[asyncio.Future, Callable[[], None]]:
+        healthy = asyncio.get_running_loop().create_future()
+
+        def on_event(event):
+            if healthy.done() or event.get('Type') != 'container':
+                return
+            if event.get('Action') == 'health_status: healthy' and event.get('Actor', {}).get('ID', '').startswith(container_id):
+                healthy.set_result(True)
+
+        return healthy, self._events.subscribe(on_event)
+
+    async def _poll_health(self, container):
+        while True:
+            await asyncio.sleep(HEALTH_POLL_INTERVAL)
+            await asyncio.to_thread(container.reload)
+            if ((container.attrs.get('State') or {}).get('Health') or {}).get('Status') == 'healthy':
+                return
+
+    async def wait_ready(self, container, started_at: Optional[float] = None, timeout: float = 60.0,
+                         address: Optional[Tuple[str, int]] = None, record: bool = True) -> float:
+        """Block until ``container`` is ready; returns the wake-to-ready latency in seconds.
+
+        ``started_at`` is the ``time.monotonic()`` value taken just before the
+        container was started. Raises ``TimeoutError`` if no signal arrives in time.
+        A wait already in flight for the container is joined rather than repeated;
+        ``record=False`` checks a container nobody just started without logging a latency.
+        """
+        pending = self._waits.get(container.name)
+        if pending is None:
+            pending = asyncio.ensure_future(self._wait_ready(container, started_at, timeout, address, record))
+            self._waits[container.name] = pending
+            pending.add_done_callback(lambda _: self._waits.pop(container.name, None))
+            # Joiners may all time out first; don't leave the error unretrieved
+            pending.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Container {container.name} did not become ready within {timeout}s")
+
+    async def _wait_ready(self, container, started_at: Optional[float], timeout: float,
+                          address: Optional[Tuple[str, int]], record: bool) -> float:
+        started_at = started_at if started_at is not None else time.monotonic()
+
+        unsubscribe = None
+        waiters = []
+        try:
+            has_healthcheck = bool((container.attrs.get('Config') or {}).get('Healthcheck'))
+            if has_healthcheck and self._events is not None:
+                # Subscribe before reloading so a healthy event can't slip in between
+                healthy, unsubscribe = self._watch_health(container.id)
+                waiters.append(healthy)
+
+            await asyncio.to_thread(container.reload)
+            state = container.attrs.get('State') or {}
+
+            if (state.get('Health') or {}).get('Status') == 'healthy':
+                waiters = []
+            elif has_healthcheck:
+                if not waiters:
+                    waiters.append(asyncio.ensure_future(self._poll_health(container)))
+            else:
+                address = address or container_address(container.attrs, container.name)
+                if address:
+                    http_path = (container.labels or {}).get(HEALTH_PATH_LABEL) or None
+                    waiters.append(asyncio.ensure_future(self._wait_probe(address[0], address[1], http_path)))
+
+            if waiters:
+                remaining = started_at + timeout - time.monotonic()
+                done, _ = await asyncio.wait(waiters, timeout=max(remaining, 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"Container {container.name} did not become ready within {timeout}s")
+                done.pop().result()  # a health poll that failed to inspect the container raises here
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            if unsubscribe:
+                unsubscribe()
+
+        latency = time.monotonic() - started_at
+        self._ready.add(container.name)
+        if record:
+            self.record(container.name, latency)
+        return latency
+
+    def record(self, container_name: str, seconds: float):
+        samples = self._samples.setdefault(container_name, deque(maxlen=self._history))
+        samples.append(seconds)
+        self._counts[container_name] = self._counts.get(container_name, 0) + 1
+        logging.info(f"Container {container_name} ready after {seconds * 1000:.0f} ms")
+        for listener in self.listeners:
+            try:
+                listener(container_name, seconds)
+            except Exception as e:
+                logging.error(f"Error in readiness listener: {e}")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "count": self._counts[name],
+                "last_ms": round(samples[-1] * 1000, 1),
+                "avg_ms": round(sum(samples) / len(samples) * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1)
+            }
+        return result
@@ -0,0 +1,70 @@
+"""Response and WebSocket encoding.
+
+API responses go through orjson instead of the stdlib encoder. ``/ws``
+clients can negotiate MessagePack frames (the ``msgpack`` subprotocol or
+``?format=msgpack``) when the optional ``msgpack`` package is installed, and
+both the API and ``/ws`` accept a ``fields`` projection so clients only pay
+for the keys they use.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+FORMATS = ('json', 'msgpack')
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """``"name,status,stats.cpu_percent"`` -> list of keys; None or empty means everything"""
+    if not fields:
+        return None
+    parsed = [f.strip() for f in fields.split(',') if f.strip()]
+    return parsed or None
+
+
+def project(item: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Keep only the requested keys; ``a.b`` keeps ``b`` inside ``a``"""
+    if not fields:
+        return item
+    result: Dict[str, Any] = {}
+    for field in fields:
+        key, _, sub = field.partition('.')
+        if key not in item:
+            continue
+        if sub and isinstance(item[key], dict):
+            if sub in item[key]:
+                result.setdefault(key, {})[sub] = item[key][sub]
+        else:
+            result[key] = item[key]
+    return result
+
+
+def project_all(items: List[Dict[str, Any]], fields: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+    if not fields:
+        return items
+    return [project(item, fields) for item in items]
+
+
+def encode_frame(message: Any, fmt: str = 'json'):
+    """A /ws frame: ``bytes`` to send as binary for msgpack, ``str`` to send as text for JSON"""
+    if fmt == 'msgpack':
+        return msgpack.packb(message, use_bin_type=True)
+    return dumps(message).decode('utf-8')
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,41 +7,145 @@ import os
 import logging
 import json
 import asyncio
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Dict, Any, Optional
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 import docker
-import psutil
+import numpy as np
 import subprocess
 import yaml
 
+from activity_log import ActivityLogWriter
+from cgroup_stats import ContainerStatsSource
+from compose_index import ComposeIndex, find_compose_files
+from docker_async import DockerExecutor
+from docker_connection import DockerConnector
+from docker_events import DockerEventStream
+from docker_hosts import LOCAL_HOST, DockerHostRegistry
+from host_metrics import HostMetricsSampler
+from idle_scheduler import IdleScheduler
+from image_index import ImageIndex
+from instrumentation import Instrumentation, SamplingProfiler
+from inventory_versions import InventoryVersions
+from metrics_exporter import CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE, ContainerSnapshot, OpenMetricsWriter, write_container_metrics, write_host_metrics
+from network_topology import NetworkTopology
+from nginx_config import NginxConfigManager, valid_route
+from prewarm import Prewarmer
+from readiness import ReadinessTracker
+from serialization import MSGPACK_AVAILABLE, FastJSONResponse, encode_frame, parse_fields, project_all
+from sleep_strategy import SleepManager
+from stats_frame import StatsFrame, StatsPipeline, raw_counters
+from system_info_cache import SystemInfoCache
+from volume_scanner import VolumeSizeScanner
+from wake_proxy import WakeProxy
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Latency histograms per route, Docker API call and MongoDB command (see /api/debug/perf)
+instrumentation = Instrumentation(loop_lag_interval=float(os.environ.get('LOOP_LAG_INTERVAL', '0.5')))
+profiler = SamplingProfiler()
+
+# MongoDB connection - opened on first use, so a slow or unreachable server doesn't hold up startup
 mongo_url = os.environ['MONGO_URL']
-client_mongo = AsyncIOMotorClient(mongo_url)
+client_mongo = AsyncIOMotorClient(mongo_url, connect=False, event_listeners=[instrumentation.mongo_listener()])
 db = client_mongo[os.environ['DB_NAME']]
+# Created in the background at startup; stats and metrics history are pruned by timestamp every tick
+MONGO_INDEXES = {
+    "container_stats": [[("container_name", 1), ("timestamp", 1)], [("timestamp", 1)]],
+    "system_metrics": [[("timestamp", 1)]],
+    "alerts": [[("timestamp", -1)]],
+    "route_access": [[("timestamp", 1)]]
+}
+
+# Activity log entries are buffered and written in batches
+activity_writer = ActivityLogWriter(db.activity_logs)
+# Proxied route accesses for the pre-warm profile go through the same kind of buffered writer
+route_access_writer = ActivityLogWriter(db.route_access, flush_interval=5.0)
+
+# Docker client - blocking docker-py calls run on a pool sized to its connection pool. The client is
+# created after startup by docker_connector, which also flips DOCKER_AVAILABLE as the daemon comes and goes
+DOCKER_IO_WORKERS = int(os.environ.get('DOCKER_IO_WORKERS', '16'))
+docker_io = DockerExecutor(max_workers=DOCKER_IO_WORKERS)
+docker_io.wait_listeners.append(lambda seconds: instrumentation.observe('docker_io', 'queue_wait', seconds))
+docker_client = None
+DOCKER_AVAILABLE = False
+
+
+def create_docker_client():
+    """Blocking: from_env asks the daemon for its API version"""
+    client = docker.from_env(max_pool_size=DOCKER_IO_WORKERS)
+    instrumentation.instrument_docker_client(client)
+    return client
+
+# Docker hosts - the local daemon plus any listed in DOCKER_HOSTS (name=url,...)
+host_registry = DockerHostRegistry(
+    timeout=float(os.environ.get('DOCKER_HOST_TIMEOUT', '5')),
+    on_client=instrumentation.instrument_docker_client
+)
+for _name, _url in DockerHostRegistry.parse_env(os.environ.get('DOCKER_HOSTS', '')).items():
+    host_registry.add(_name, _url)
+
+# info/version/df per host, each cached with its own TTL (df is by far the slowest)
+system_info_cache = SystemInfoCache(
+    host_registry,
+    docker_io,
+    ttls={
+        "version": float(os.environ.get('SYSTEM_VERSION_TTL', '3600')),
+        "info": float(os.environ.get('SYSTEM_INFO_TTL', '10')),
+        "df": float(os.environ.get('SYSTEM_DF_TTL', '300'))
+    }
+)
+
+# Container stats from cgroup files (STATS_BACKEND=cgroup) or the Docker API
+container_stats_source = ContainerStatsSource(
+    backend=os.environ.get('STATS_BACKEND', 'docker'),
+    cgroup_root=os.environ.get('CGROUP_ROOT', '/sys/fs/cgroup'),
+    proc_root=os.environ.get('PROC_ROOT', '/proc')
+)
+
+# Derived container stats (CPU/memory percentages, I/O rates) computed per tick in one vectorized pass
+stats_pipeline = StatsPipeline()
+
+# Host CPU/memory/IO sampled in the background; readers take the latest sample
+host_metrics = HostMetricsSampler(interval=float(os.environ.get('HOST_METRICS_INTERVAL', '2')))
+host_metrics.sample = instrumentation.timed('psutil', 'host_sample', host_metrics.sample)
+
+# Latest full container sweep, for /metrics; swept in the background only when /ws isn't sweeping
+container_snapshot = ContainerSnapshot(max_age=float(os.environ.get('METRICS_SNAPSHOT_MAX_AGE', '15')))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Both are defined at the end of this module; startup returns without waiting on Docker or MongoDB
+    await start_background_services()
+    yield
+    await stop_background_services()
 
-# Docker client
-try:
-    docker_client = docker.from_env()
-    DOCKER_AVAILABLE = True
-except Exception as e:
-    logging.error(f"Docker not available: {e}")
-    docker_client = None
-    DOCKER_AVAILABLE = False
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Record each request's latency under its route template, so /containers/{id} is one histogram"""
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        instrumentation.observe('route', f"{request.method} {path}", time.perf_counter() - started)
+
+
 # Models
 class ContainerAction(BaseModel):
     action: str
@@ -150,6 +254,8 @@ class Settings(BaseModel):
     cpu_alert_threshold: int = 80
     memory_alert_threshold: int = 80
     disk_alert_threshold: int = 85
+    container_net_io_alert_threshold: int = 0  # MB/s rx+tx, 0 disables
+    container_disk_io_alert_threshold: int = 0  # MB/s read+write, 0 disables
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ActivityLog(BaseModel):
@@ -167,8 +273,16 @@ class ContainerStats(BaseModel):
     cpu_percent: float
     memory_mb: float
     memory_percent: float
+    net_rx_bytes_per_sec: float = 0
+    net_tx_bytes_per_sec: float = 0
+    block_read_bytes_per_sec: float = 0
+    block_write_bytes_per_sec: float = 0
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class DockerHostConfig(BaseModel):
+    name: str
+    url: str
+
 class ExecCommand(BaseModel):
     command: str
     workdir: Optional[str] = None
@@ -177,36 +291,146 @@ class ExecCommand(BaseModel):
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+        self.options: Dict[WebSocket, Dict[str, Any]] = {}  # per connection: format and fields projection
+
+    async def connect(self, websocket: WebSocket, fmt: str = 'json', fields: Optional[List[str]] = None):
+        # MessagePack is negotiated with the "msgpack" subprotocol or ?format=msgpack
+        offered = 'msgpack' in websocket.scope.get('subprotocols', [])
+        if offered:
+            fmt = 'msgpack'
+        if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+            fmt = 'json'
+        await websocket.accept(subprotocol='msgpack' if offered and fmt == 'msgpack' else None)
         self.active_connections.append(websocket)
+        self.options[websocket] = {"format": fmt, "fields": fields}
 
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
+        self.options.pop(websocket, None)
+
+    def subscribe(self, websocket: WebSocket, fields: Optional[List[str]]):
+        self.options[websocket]['fields'] = fields
+
+    @staticmethod
+    def _frame(message: dict, fmt: str, fields: Optional[List[str]]):
+        if fields and message.get('type') == 'container_stats':
+            message = {**message, "data": project_all(message['data'], fields)}
+        return encode_frame(message, fmt)
+
+    @staticmethod
+    async def _send_frame(websocket: WebSocket, frame):
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+    async def send(self, websocket: WebSocket, message: dict):
+        options = self.options.get(websocket, {"format": "json", "fields": None})
+        await self._send_frame(websocket, self._frame(message, options['format'], options['fields']))
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Encode once per distinct format/projection rather than once per client
+        frames = {}
+        for connection in list(self.active_connections):
+            options = self.options.get(connection, {"format": "json", "fields": None})
+            key = (options['format'], tuple(options['fields'] or ()))
             try:
-                await connection.send_json(message)
+                if key not in frames:
+                    frames[key] = self._frame(message, options['format'], options['fields'])
+                await self._send_frame(connection, frames[key])
             except:
                 pass
 
 manager = ConnectionManager()
+# Seconds a /ws connection waits for a client message before it sends the next round of stats
+WS_TICK_INTERVAL = float(os.environ.get('WS_TICK_INTERVAL', '3'))
+
+# Compose discovery
+COMPOSE_SEARCH_DIRS = ['/opt', '/home', '/root', '/var/lib/docker']
+compose_index = ComposeIndex()
+
+# Docker event stream and readiness tracking for containers we start
+docker_events = DockerEventStream(lambda: docker_client if DOCKER_AVAILABLE else None)
+readiness = ReadinessTracker(docker_events)
+READY_TIMEOUT = float(os.environ.get('READY_TIMEOUT', '60'))
+
+# Content versions behind the ETags on inventory listings
+inventory_versions = InventoryVersions(docker_events)
+
+# Images, their layers and the containers using them, kept current from events
+image_index = ImageIndex(lambda: docker_client if DOCKER_AVAILABLE else None, docker_events, executor=docker_io.executor)
+image_index.listeners.append(lambda: inventory_versions.bump('image'))
+
+# Networks, container endpoints and published ports as one graph, patched from events
+network_topology = NetworkTopology(lambda: docker_client if DOCKER_AVAILABLE else None, docker_events)
+network_topology.listeners.append(lambda: inventory_versions.bump('network'))
+network_topology.listeners.append(lambda: inventory_versions.bump('topology'))
+
+# Volume disk usage, measured in the background (VOLUME_ROOT: where the host's volumes dir is mounted)
+volume_scanner = VolumeSizeScanner(
+    lambda: docker_client if DOCKER_AVAILABLE else None,
+    interval=float(os.environ.get('VOLUME_SCAN_INTERVAL', '300')),
+    full_rescan_interval=float(os.environ.get('VOLUME_FULL_RESCAN_INTERVAL', '3600')),
+    max_ops_per_sec=int(os.environ.get('VOLUME_SCAN_MAX_OPS', '2000')),
+    root=os.environ.get('VOLUME_ROOT') or None
+)
+volume_scanner.listeners.append(lambda: inventory_versions.bump('volume'))
+
+# Sleep strategies (stop / pause / checkpoint) shared by the idle scheduler and every wake path
+sleep_manager = SleepManager(lambda: docker_client if DOCKER_AVAILABLE else None)
+readiness.listeners.append(sleep_manager.on_ready)
+
+# Wake-on-request proxy (set WAKE_PROXY_PORT=0 to disable)
+WAKE_PROXY_PORT = int(os.environ.get('WAKE_PROXY_PORT', '8080'))
+wake_proxy = WakeProxy(
+    lambda: docker_client if DOCKER_AVAILABLE else None,
+    readiness,
+    sleep_manager,
+    ready_timeout=READY_TIMEOUT,
+    executor=docker_io,
+    # Peers allowed to pick the route with X-DockerWakeUp-Route, i.e. the nginx in front of the proxy
+    trusted_proxies=[h.strip() for h in os.environ.get('WAKE_PROXY_TRUSTED', '127.0.0.1,::1').split(',') if h.strip()]
+)
+
+# Idle shutdown, fed by proxy traffic and container network counters
+idle_scheduler = IdleScheduler(lambda: docker_client if DOCKER_AVAILABLE else None, Settings().default_idle_timeout)
+idle_scheduler.is_busy = lambda name: wake_proxy.active.get(name, 0) > 0
+idle_scheduler.put_to_sleep = sleep_manager.sleep
+wake_proxy.access_listeners.append(idle_scheduler.touch)
+
+# Pre-warming from the per-route time-of-week access profile
+prewarmer = Prewarmer(
+    lambda: docker_client if DOCKER_AVAILABLE else None,
+    sleep_manager,
+    lead_time=float(os.environ.get('PREWARM_LEAD_SECONDS', '300')),
+    wake=wake_proxy.wake_container,
+    executor=docker_io
+)
+wake_proxy.request_listeners.append(prewarmer.on_request)
+
+# nginx config generation, enabled by pointing NGINX_CONF_DIR at a directory nginx includes
+NGINX_CONF_DIR = os.environ.get('NGINX_CONF_DIR')
+nginx_config = NginxConfigManager(
+    lambda: docker_client if DOCKER_AVAILABLE else None,
+    NGINX_CONF_DIR,
+    os.environ.get('NGINX_WAKE_PROXY_ADDR', f"127.0.0.1:{WAKE_PROXY_PORT}"),
+    reload_command=os.environ.get('NGINX_RELOAD_CMD', 'nginx -t && nginx -s reload'),
+    debounce=float(os.environ.get('NGINX_RELOAD_DEBOUNCE', '2'))
+) if NGINX_CONF_DIR else None
 
 
 # Helper functions
-def get_container_info(container):
-    """Extract container information"""
+def collect_container_info(container, with_stats: bool = True):
+    """Extract container information plus the raw stats counters (None if stats couldn't be read or weren't wanted)"""
     try:
-        stats = container.stats(stream=False)
-        
-        cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats']['cpu_usage']['total_usage']
-        system_delta = stats['cpu_stats']['system_cpu_usage'] - stats['precpu_stats']['system_cpu_usage']
-        cpu_percent = (cpu_delta / system_delta) * len(stats['cpu_stats']['cpu_usage'].get('percpu_usage', [0])) * 100 if system_delta > 0 else 0
-        
-        mem_usage = stats['memory_stats'].get('usage', 0) / (1024 * 1024)
-        mem_limit = stats['memory_stats'].get('limit', 1) / (1024 * 1024)
+        raw = None
+        if with_stats:
+            stats = container_stats_source.read(container, local=container.client is docker_client)
+            raw = raw_counters(stats)
+            
+            if container.client is docker_client:
+                # Idle shutdown only manages containers on the local daemon
+                idle_scheduler.observe_network(container.name, raw[7] + raw[8])
         
         network_settings = container.attrs['NetworkSettings']
         networks_detailed = {}
@@ -285,14 +509,8 @@ def get_container_info(container):
             "docker_path": docker_path,
             "deployment_type": deployment_type,
             "run_command": run_command,
-            "idle_timeout": idle_timeout,
-            "stats": {
-                "cpu_percent": round(cpu_percent, 2),
-                "memory_mb": round(mem_usage, 2),
-                "memory_limit_mb": round(mem_limit, 2),
-                "memory_percent": round((mem_usage / mem_limit * 100) if mem_limit > 0 else 0, 2)
-            }
-        }
+            "idle_timeout": idle_timeout
+        }, raw
     except Exception as e:
         logging.error(f"Error getting container info for {container.name}: {e}")
         return {
@@ -316,31 +534,31 @@ def get_container_info(container):
             "gateway": "N/A",
             "mac_address": "N/A",
             "network_mode": "unknown",
-            "labels": {},
-            "stats": {"cpu_percent": 0, "memory_mb": 0, "memory_limit_mb": 0, "memory_percent": 0}
-        }
+            "labels": {}
+        }, None
+
+
+async def get_container_infos(containers: list, with_stats: bool = True):
+    """Container info for a batch; stats for all of them are derived together in one vectorized pass.
+    With ``with_stats=False`` no stats are read at all and the frame is None."""
+    if not with_stats:
+        collected = await docker_io.map(lambda c: collect_container_info(c, with_stats=False), containers)
+        return [info for info, _ in collected], None
+    collected = await docker_io.map(collect_container_info, containers)
+    infos = [info for info, _ in collected]
+    frame = stats_pipeline.compute([c.id for c in containers], [info['name'] for info in infos], [raw for _, raw in collected])
+    for info, stats in zip(infos, frame.rows()):
+        info['stats'] = stats
+    return infos, frame
 
 
 def get_system_metrics():
-    """Get system-level metrics"""
-    cpu_percent = psutil.cpu_percent(interval=0.1)
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
-    
-    return {
-        "cpu_percent": round(cpu_percent, 2),
-        "memory_percent": round(memory.percent, 2),
-        "memory_used_mb": round(memory.used / (1024 * 1024), 2),
-        "memory_total_mb": round(memory.total / (1024 * 1024), 2),
-        "disk_percent": round(disk.percent, 2),
-        "disk_used_gb": round(disk.used / (1024 * 1024 * 1024), 2),
-        "disk_total_gb": round(disk.total / (1024 * 1024 * 1024), 2),
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
+    """Get system-level metrics - the latest background sample, never blocks"""
+    return host_metrics.latest()
 
 
 async def log_activity(event_type: str, container_name: str = None, status: str = "success", message: str = ""):
-    """Log activity to MongoDB"""
+    """Queue an activity entry for the buffered writer; doesn't wait on MongoDB"""
     try:
         activity = ActivityLog(
             event_type=event_type,
@@ -350,23 +568,65 @@ async def log_activity(event_type: str, container_name: str = None, status: str
         )
         doc = activity.model_dump()
         doc['timestamp'] = doc['timestamp'].isoformat()
-        await db.activity_logs.insert_one(doc)
+        activity_writer.log(doc)
     except Exception as e:
         logging.error(f"Error logging activity: {e}")
 
 
-async def save_container_stats(container_name: str, stats: dict):
-    """Save container stats for historical data"""
+async def track_readiness(container, started_at: float):
+    """Wait for a started container to become ready and broadcast the wake-to-ready latency"""
     try:
-        stat_entry = ContainerStats(
-            container_name=container_name,
-            cpu_percent=stats['cpu_percent'],
-            memory_mb=stats['memory_mb'],
-            memory_percent=stats['memory_percent']
-        )
-        doc = stat_entry.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
-        await db.container_stats.insert_one(doc)
+        latency = await readiness.wait_ready(container, started_at, timeout=READY_TIMEOUT)
+        await manager.broadcast({
+            "type": "container_ready",
+            "container": container.name,
+            "latency_ms": round(latency * 1000, 1)
+        })
+    except TimeoutError as e:
+        logging.warning(str(e))
+    except Exception as e:
+        logging.error(f"Error tracking readiness for {container.name}: {e}")
+
+
+async def on_idle_sleep(container_name: str, idle_seconds: float, strategy: str):
+    """Record containers put to sleep by the idle scheduler"""
+    message = f"Container {container_name} put to sleep ({strategy}) after {idle_seconds:.0f}s idle"
+    await log_activity("idle_sleep", container_name, "success", message)
+    await manager.broadcast({"type": "container_event", "action": "idle_sleep", "strategy": strategy, "container": container_name, "status": "success"})
+
+idle_scheduler.on_sleep = on_idle_sleep
+
+
+def persist_route_access(route: str, container_name: str, ts: float):
+    """Store a proxied access for the pre-warm profile without holding up the request"""
+    route_access_writer.log({
+        "route": route,
+        "container_name": container_name,
+        "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat()
+    })
+
+prewarmer.persist = persist_route_access
+
+
+async def load_route_access_history():
+    """Rebuild the pre-warm profile from stored accesses"""
+    cutoff = datetime.now(timezone.utc) - timedelta(weeks=prewarmer.history_weeks)
+    await db.route_access.delete_many({"timestamp": {"$lt": cutoff.isoformat()}})
+    async for doc in db.route_access.find({"timestamp": {"$gte": cutoff.isoformat()}}, {"_id": 0}):
+        prewarmer.load(doc['route'], doc['container_name'], datetime.fromisoformat(doc['timestamp']).timestamp())
+
+
+async def save_container_stats(containers: list):
+    """Save one tick of container stats for historical data in a single write"""
+    try:
+        timestamp = datetime.now(timezone.utc).isoformat()
+        docs = []
+        for container in containers:
+            doc = ContainerStats(container_name=container['name'], **container['stats']).model_dump()
+            doc['timestamp'] = timestamp
+            docs.append(doc)
+        if docs:
+            await db.container_stats.insert_many(docs)
         
         cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
         await db.container_stats.delete_many({"timestamp": {"$lt": cutoff.isoformat()}})
@@ -374,7 +634,7 @@ async def save_container_stats(container_name: str, stats: dict):
         logging.error(f"Error saving stats: {e}")
 
 
-async def check_and_create_alerts(containers: list, system_metrics: dict, settings: dict):
+async def check_and_create_alerts(containers: list, system_metrics: dict, settings: dict, frame: Optional[StatsFrame] = None):
     """Check for alert conditions and create alerts"""
     if not settings.get('enable_alerts', True):
         return
@@ -405,19 +665,42 @@ async def check_and_create_alerts(containers: list, system_metrics: dict, settin
             doc['timestamp'] = doc['timestamp'].isoformat()
             await db.alerts.insert_one(doc)
         
-        # Container alerts
-        for container in containers:
-            if container['stats']['cpu_percent'] > 90:
+        # Container alerts - thresholds are checked for every container at once
+        if frame is None:
+            frame = StatsFrame.from_rows(containers)
+        over = frame.over_thresholds(
+            cpu_percent=90,
+            # I/O thresholds are in MB/s; noisy neighbours show up here long before CPU does
+            net_mb_per_sec=settings.get('container_net_io_alert_threshold', 0),
+            disk_mb_per_sec=settings.get('container_disk_io_alert_threshold', 0)
+        )
+        messages = {
+            "container_cpu": lambda name, value: f"Container {name} high CPU: {value}%",
+            "container_network_io": lambda name, value: f"Container {name} high network I/O: {value:.1f} MB/s",
+            "container_disk_io": lambda name, value: f"Container {name} high disk I/O: {value:.1f} MB/s"
+        }
+        thresholds = {
+            "container_cpu": None,
+            "container_network_io": settings.get('container_net_io_alert_threshold', 0),
+            "container_disk_io": settings.get('container_disk_io_alert_threshold', 0)
+        }
+        docs = []
+        for alert_type, hits in over.items():
+            for index, value in hits:
+                name = frame.names[index]
                 alert = Alert(
-                    alert_type="container_cpu",
+                    alert_type=alert_type,
                     severity="warning",
-                    message=f"Container {container['name']} high CPU: {container['stats']['cpu_percent']}%",
-                    container_name=container['name'],
-                    current_value=container['stats']['cpu_percent']
+                    message=messages[alert_type](name, value),
+                    container_name=name,
+                    threshold=thresholds[alert_type],
+                    current_value=value
                 )
                 doc = alert.model_dump()
                 doc['timestamp'] = doc['timestamp'].isoformat()
-                await db.alerts.insert_one(doc)
+                docs.append(doc)
+        if docs:
+            await db.alerts.insert_many(docs)
     except Exception as e:
         logging.error(f"Error checking alerts: {e}")
 
@@ -428,6 +711,52 @@ async def root():
     return {"message": "DockerWakeUp WebUI API", "version": "3.0.0", "docker_available": DOCKER_AVAILABLE}
 
 
+def describe_detected_container(container) -> dict:
+    """Blocking: resolving the image tags is an extra API call per container"""
+    # Check if already has DockerWakeUp metadata
+    has_metadata = any(label.startswith('dockerwakeup.') for label in container.labels.keys())
+    
+    container_info = {
+        "name": container.name,
+        "id": container.short_id,
+        "image": container.image.tags[0] if container.image.tags else container.image.short_id,
+        "status": container.status,
+        "has_metadata": has_metadata,
+        "type": "compose" if container.labels.get('com.docker.compose.project') else "docker_run",
+        "compose_project": container.labels.get('com.docker.compose.project', ''),
+        "ports": [],
+        "volumes": [],
+        "environment": container.attrs['Config'].get('Env', []),
+        "network_mode": container.attrs['HostConfig'].get('NetworkMode', 'bridge'),
+        "restart_policy": container.attrs['HostConfig']['RestartPolicy']['Name'] or 'no'
+    }
+    
+    # Extract ports
+    if container.ports:
+        for container_port, host_bindings in container.ports.items():
+            if host_bindings:
+                for binding in host_bindings:
+                    port_num, protocol = container_port.split('/')
+                    container_info["ports"].append({
+                        "host_port": binding['HostPort'],
+                        "container_port": port_num,
+                        "protocol": protocol
+                    })
+    
+    # Extract volumes
+    if container.attrs['HostConfig'].get('Binds'):
+        for bind in container.attrs['HostConfig']['Binds']:
+            parts = bind.split(':')
+            if len(parts) >= 2:
+                container_info["volumes"].append({
+                    "host_path": parts[0],
+                    "container_path": parts[1],
+                    "mode": parts[2] if len(parts) > 2 else "rw"
+                })
+    
+    return container_info
+
+
 @api_router.get("/containers/detect")
 async def auto_detect_containers():
     """Auto-detect containers and docker-compose projects"""
@@ -441,70 +770,20 @@ async def auto_detect_containers():
         }
         
         # Get all containers
-        containers = docker_client.containers.list(all=True)
-        
-        for container in containers:
-            # Check if already has DockerWakeUp metadata
-            has_metadata = any(label.startswith('dockerwakeup.') for label in container.labels.keys())
-            
-            container_info = {
-                "name": container.name,
-                "id": container.short_id,
-                "image": container.image.tags[0] if container.image.tags else container.image.short_id,
-                "status": container.status,
-                "has_metadata": has_metadata,
-                "type": "compose" if container.labels.get('com.docker.compose.project') else "docker_run",
-                "compose_project": container.labels.get('com.docker.compose.project', ''),
-                "ports": [],
-                "volumes": [],
-                "environment": container.attrs['Config'].get('Env', []),
-                "network_mode": container.attrs['HostConfig'].get('NetworkMode', 'bridge'),
-                "restart_policy": container.attrs['HostConfig']['RestartPolicy']['Name'] or 'no'
-            }
-            
-            # Extract ports
-            if container.ports:
-                for container_port, host_bindings in container.ports.items():
-                    if host_bindings:
-                        for binding in host_bindings:
-                            port_num, protocol = container_port.split('/')
-                            container_info["ports"].append({
-                                "host_port": binding['HostPort'],
-                                "container_port": port_num,
-                                "protocol": protocol
-                            })
-            
-            # Extract volumes
-            if container.attrs['HostConfig'].get('Binds'):
-                for bind in container.attrs['HostConfig']['Binds']:
-                    parts = bind.split(':')
-                    if len(parts) >= 2:
-                        container_info["volumes"].append({
-                            "host_path": parts[0],
-                            "container_path": parts[1],
-                            "mode": parts[2] if len(parts) > 2 else "rw"
-                        })
-            
-            detected["running_containers"].append(container_info)
+        containers = await docker_io.run(docker_client.containers.list, all=True)
+        detected["running_containers"] = await docker_io.map(describe_detected_container, containers)
         
         # Scan for docker-compose projects in common directories
-        compose_dirs = ['/opt', '/home', '/root', '/var/lib/docker']
-        for base_dir in compose_dirs:
-            try:
-                for root, dirs, files in os.walk(base_dir):
-                    if 'docker-compose.yml' in files or 'docker-compose.yaml' in files:
-                        compose_file = os.path.join(root, 'docker-compose.yml' if 'docker-compose.yml' in files else 'docker-compose.yaml')
-                        
-                        # Check if not too deep (max 3 levels)
-                        depth = root[len(base_dir):].count(os.sep)
-                        if depth <= 3:
-                            detected["compose_projects"].append({
-                                "path": compose_file,
-                                "directory": root,
-                                "project_name": os.path.basename(root)
-                            })
-            except (PermissionError, OSError):
-                pass
+        compose_files = await asyncio.to_thread(find_compose_files, COMPOSE_SEARCH_DIRS)
+        for project in await asyncio.to_thread(compose_index.refresh, compose_files):
+            detected["compose_projects"].append({
+                "path": project['path'],
+                "directory": project['directory'],
+                "project_name": os.path.basename(project['directory']),
+                "compose_project": project['project_name'],
+                "services": list(project['services'].values()),
+                "parse_error": project.get('parse_error')
+            })
         
         return detected
     except Exception as e:
@@ -512,6 +791,37 @@ async def auto_detect_containers():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/compose/index")
+async def get_compose_index():
+    """Join detected compose services with live containers"""
+    if not DOCKER_AVAILABLE:
+        return JSONResponse({"error": "Docker not available"}, status_code=503)
+    
+    try:
+        containers = [
+            {
+                "name": c.name,
+                "status": c.status,
+                "image": c.attrs['Config'].get('Image'),
+                "labels": c.labels
+            }
+            for c in await docker_io.run(docker_client.containers.list, all=True)
+        ]
+        
+        # Compose records the files it was started from; include them even outside the search dirs
+        paths = await asyncio.to_thread(find_compose_files, COMPOSE_SEARCH_DIRS)
+        for c in containers:
+            for config_file in c['labels'].get('com.docker.compose.project.config_files', '').split(','):
+                if config_file and config_file not in paths:
+                    paths.append(config_file)
+        
+        projects = await asyncio.to_thread(compose_index.refresh, paths)
+        return compose_index.join(projects, containers)
+    except Exception as e:
+        logging.error(f"Error building compose index: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @api_router.post("/containers/import")
 async def import_container(container_data: dict):
     """Import a detected container with its configuration"""
@@ -532,7 +842,7 @@ async def import_container(container_data: dict):
         # Update container with metadata
         if DOCKER_AVAILABLE:
             try:
-                container = docker_client.containers.get(container_data['name'])
+                container = await docker_io.run(docker_client.containers.get, container_data['name'])
                 # Note: Docker API doesn't allow updating labels on running containers
                 # Labels can only be set during creation
                 # So we'll log the import in MongoDB instead
@@ -554,15 +864,142 @@ async def import_container(container_data: dict):
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+CONTAINER_SORT_KEYS = ('name', 'created', 'cpu', 'memory')
+
+
+def sparse_name(container) -> str:
+    """Name of a container from a sparse listing, which has Names instead of Name"""
+    names = container.attrs.get('Names') or ['']
+    return names[0].lstrip('/')
+
+
+def inventory_etag(kind: str, host: Optional[str], *parts) -> Optional[str]:
+    """ETag for a listing, or None when it includes hosts whose events we don't follow"""
+    if host not in (None, LOCAL_HOST) or (host is None and list(host_registry.hosts) != [LOCAL_HOST]):
+        return None
+    return inventory_versions.etag(kind, *parts)
+
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    if inventory_versions.matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def tagged(content: Dict[str, Any], etag: Optional[str]) -> FastJSONResponse:
+    return FastJSONResponse(content, headers={"ETag": etag} if etag else None)
+
+
 @api_router.get("/containers")
-async def list_containers(all: bool = True):
-    if not DOCKER_AVAILABLE:
+async def list_containers(
+    request: Request,
+    all: Optional[bool] = None,
+    host: Optional[str] = None,
+    page: Optional[int] = None,
+    per_page: Optional[int] = None,
+    status: Optional[str] = None,
+    compose_project: Optional[str] = None,
+    label: Optional[List[str]] = Query(None),
+    network: Optional[str] = None,
+    name: Optional[str] = None,
+    sort: str = 'name',
+    order: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Containers, filtered and sorted; ``all`` defaults to the show_stopped_containers setting. Without
+    ``page`` or ``per_page`` every match is returned; with either, one page of ``per_page`` (default: the
+    containers_per_page setting) is. Sorting by cpu/memory uses each container's most recent stats sample;
+    ``fields`` (e.g. ``name,status,stats``) limits the keys returned for each container. Pages without
+    stats carry an ETag and answer a matching If-None-Match with 304 without calling the daemon."""
+    if not host_registry.hosts:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
+    if sort not in CONTAINER_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(CONTAINER_SORT_KEYS)}")
+    if order not in (None, 'asc', 'desc'):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
     
     try:
-        containers = docker_client.containers.list(all=all)
-        container_list = [get_container_info(c) for c in containers]
-        return {"containers": container_list, "count": len(container_list)}
+        settings = await get_settings()
+        if all is None:
+            all = settings.get('show_stopped_containers', True)
+        paginated = page is not None or per_page is not None
+        page = max(1, page or 1)
+        if paginated:
+            per_page = per_page if per_page is not None else settings.get('containers_per_page', 50)
+            per_page = max(1, min(per_page, 1000))
+        
+        # Live stats change every tick, so only metadata-only pages can be versioned
+        projection = parse_fields(fields)
+        wants_stats = not projection or any(f.split('.')[0] == 'stats' for f in projection)
+        etag = None
+        if projection and sort not in ('cpu', 'memory') and not wants_stats:
+            etag = inventory_etag('container', host, all, page, per_page, status, compose_project, label, network,
+                                  name, sort, order, projection)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        # Everything the daemon can filter on is filtered there
+        filters = {}
+        if status:
+            filters['status'] = status.split(',')
+            all = True
+        labels = list(label or [])
+        if compose_project:
+            labels.append(f"com.docker.compose.project={compose_project}")
+        if labels:
+            filters['label'] = labels
+        if network:
+            filters['network'] = network
+        
+        # A sparse listing is one API call; a full one inspects every container
+        fanned = await host_registry.fan_out(
+            lambda client: client.containers.list(all=all, filters=filters, sparse=True),
+            hosts=[host] if host else None
+        )
+        candidates = [
+            (host_name, container)
+            for host_name, containers in fanned['results'].items()
+            for container in containers
+            if not name or sparse_name(container).startswith(name)
+        ]
+        
+        descending = order == 'desc' if order else sort != 'name'
+        if sort in ('cpu', 'memory'):
+            values = stats_pipeline.latest([c.id for _, c in candidates], 'cpu_percent' if sort == 'cpu' else 'memory_mb')
+            ordering = np.argsort(-values if descending else values, kind='stable').tolist()
+            candidates = [candidates[i] for i in ordering]
+        else:
+            key = (lambda hc: sparse_name(hc[1])) if sort == 'name' else (lambda hc: hc[1].attrs.get('Created', 0))
+            candidates.sort(key=key, reverse=descending)
+        
+        total = len(candidates)
+        page_items = candidates[(page - 1) * per_page:page * per_page] if paginated else candidates
+        
+        # Full inspect and stats only for the page being returned
+        def inspect(item):
+            try:
+                return item[0], item[1].client.containers.get(item[1].id)
+            except docker.errors.NotFound:
+                return None  # removed since the listing
+        
+        full = [item for item in await docker_io.map(inspect, page_items) if item is not None]
+        # A projection without stats skips the per-container stats call entirely
+        container_list, _ = await get_container_infos([container for _, container in full], with_stats=wants_stats)
+        for (host_name, _), container in zip(full, container_list):
+            container['host'] = host_name
+        
+        return tagged({
+            "containers": project_all(container_list, projection),
+            "count": len(container_list),
+            "total": total,
+            "page": page,
+            "per_page": per_page if paginated else total,
+            "pages": (total + per_page - 1) // per_page if paginated else 1,
+            "errors": fanned['errors']
+        }, None if fanned['errors'] else etag)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error listing containers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -574,7 +1011,7 @@ async def inspect_container(container_name: str):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        container = docker_client.containers.get(container_name)
+        container = await docker_io.run(docker_client.containers.get, container_name)
         return {"inspect": container.attrs}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail="Container not found")
@@ -589,8 +1026,9 @@ async def exec_container(container_name: str, command: ExecCommand):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        container = docker_client.containers.get(container_name)
-        exec_result = container.exec_run(
+        container = await docker_io.run(docker_client.containers.get, container_name)
+        exec_result = await docker_io.run(
+            container.exec_run,
             command.command,
             workdir=command.workdir,
             demux=True
@@ -619,25 +1057,27 @@ async def container_action(container_name: str, action: str):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        container = docker_client.containers.get(container_name)
+        container = await docker_io.run(docker_client.containers.get, container_name)
         
         if action == "start":
-            container.start()
+            started_at = time.monotonic()
+            await docker_io.run(sleep_manager.wake, container)
+            asyncio.create_task(track_readiness(container, started_at))
             message = f"Container {container_name} started"
         elif action == "stop":
-            container.stop()
+            await docker_io.run(container.stop)
             message = f"Container {container_name} stopped"
         elif action == "pause":
-            container.pause()
+            await docker_io.run(container.pause)
             message = f"Container {container_name} paused"
         elif action == "unpause":
-            container.unpause()
+            await docker_io.run(container.unpause)
             message = f"Container {container_name} unpaused"
         elif action == "restart":
-            container.restart()
+            await docker_io.run(container.restart)
             message = f"Container {container_name} restarted"
         elif action == "remove":
-            container.remove(force=True)
+            await docker_io.run(container.remove, force=True)
             message = f"Container {container_name} removed"
         else:
             raise HTTPException(status_code=400, detail="Invalid action")
@@ -662,16 +1102,18 @@ async def bulk_action(bulk: BulkAction):
     results = []
     for container_name in bulk.container_names:
         try:
-            container = docker_client.containers.get(container_name)
+            container = await docker_io.run(docker_client.containers.get, container_name)
             
             if bulk.action == "start":
-                container.start()
+                started_at = time.monotonic()
+                await docker_io.run(sleep_manager.wake, container)
+                asyncio.create_task(track_readiness(container, started_at))
             elif bulk.action == "stop":
-                container.stop()
+                await docker_io.run(container.stop)
             elif bulk.action == "restart":
-                container.restart()
+                await docker_io.run(container.restart)
             elif bulk.action == "remove":
-                container.remove(force=True)
+                await docker_io.run(container.remove, force=True)
             
             results.append({"container": container_name, "success": True})
             await log_activity(bulk.action, container_name, "success", f"Bulk {bulk.action} successful")
@@ -688,9 +1130,14 @@ async def create_container(request: CreateContainerRequest):
     if not DOCKER_AVAILABLE:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
+    # The route ends up in generated nginx config, so only plain host names and paths are accepted
+    route = request.route or request.labels.get('dockerwakeup.route')
+    if route is not None and not valid_route(route):
+        raise HTTPException(status_code=400, detail=f"Invalid route '{route}': use a host name or a path like /app")
+    
     try:
         try:
-            existing = docker_client.containers.get(request.name)
+            existing = await docker_io.run(docker_client.containers.get, request.name)
             raise HTTPException(status_code=400, detail=f"Container with name '{request.name}' already exists")
         except docker.errors.NotFound:
             pass
@@ -698,10 +1145,15 @@ async def create_container(request: CreateContainerRequest):
         if request.depends_on:
             for dep_name in request.depends_on:
                 try:
-                    dep_container = docker_client.containers.get(dep_name)
+                    dep_container = await docker_io.run(docker_client.containers.get, dep_name)
                     if dep_container.status != 'running':
-                        dep_container.start()
-                        await log_activity("start_dependency", dep_name, "success", f"Started dependency for {request.name}")
+                        started_at = time.monotonic()
+                        await docker_io.run(sleep_manager.wake, dep_container)
+                        try:
+                            latency = await readiness.wait_ready(dep_container, started_at, timeout=READY_TIMEOUT)
+                            await log_activity("start_dependency", dep_name, "success", f"Started dependency for {request.name}, ready after {latency * 1000:.0f} ms")
+                        except TimeoutError as e:
+                            await log_activity("start_dependency", dep_name, "error", f"Started dependency for {request.name} but it is not ready: {e}")
                 except docker.errors.NotFound:
                     raise HTTPException(status_code=400, detail=f"Dependency container '{dep_name}' not found")
         
@@ -740,7 +1192,8 @@ async def create_container(request: CreateContainerRequest):
         if request.run_command:
             labels['dockerwakeup.run_command'] = request.run_command
         
-        container = docker_client.containers.create(
+        container = await docker_io.run(
+            docker_client.containers.create,
             image=request.image,
             name=request.name,
             command=request.command,
@@ -754,7 +1207,7 @@ async def create_container(request: CreateContainerRequest):
             labels=labels
         )
         
-        container.start()
+        await docker_io.run(container.start)
         
         await log_activity("create_container", request.name, "success", f"Container {request.name} created and started")
         await manager.broadcast({"type": "container_event", "action": "create", "container": request.name, "status": "success"})
@@ -784,7 +1237,7 @@ async def export_container_config(container_name: str):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        container = docker_client.containers.get(container_name)
+        container = await docker_io.run(docker_client.containers.get, container_name)
         attrs = container.attrs
         
         config = {
@@ -813,8 +1266,8 @@ async def get_logs(container_name: str, tail: int = 100):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        container = docker_client.containers.get(container_name)
-        logs = container.logs(tail=tail).decode('utf-8', errors='replace')
+        container = await docker_io.run(docker_client.containers.get, container_name)
+        logs = (await docker_io.run(container.logs, tail=tail)).decode('utf-8', errors='replace')
         return {"container": container_name, "logs": logs}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail="Container not found")
@@ -839,28 +1292,66 @@ async def get_stats_history(container_name: str, hours: int = 1):
 
 
 # Images
+def build_image_list(client) -> list:
+    image_list = []
+    for img in client.images.list():
+        tags = img.tags if img.tags else ["<none>"]
+        for tag in tags:
+            repo_tag = tag.split(":")
+            image_list.append({
+                "id": img.short_id.replace("sha256:", ""),
+                "repository": repo_tag[0] if len(repo_tag) > 0 else "<none>",
+                "tag": repo_tag[1] if len(repo_tag) > 1 else "<none>",
+                "size_mb": round(img.attrs['Size'] / (1024 * 1024), 2),
+                "created": img.attrs['Created']
+            })
+    return image_list
+
+
+def index_image_list() -> list:
+    """The local daemon's images from the image index, with usage and shared-layer accounting"""
+    image_list = []
+    for image in image_index.describe_all():
+        for tag in image['tags'] or ["<none>"]:
+            repo_tag = tag.split(":")
+            image_list.append({
+                "id": image['id'].replace("sha256:", "")[:10],
+                "repository": repo_tag[0] if len(repo_tag) > 0 else "<none>",
+                "tag": repo_tag[1] if len(repo_tag) > 1 else "<none>",
+                "size_mb": round(image['size'] / (1024 * 1024), 2),
+                "unique_size_mb": round(image['unique_size'] / (1024 * 1024), 2),
+                "shared_size_mb": round(image['shared_size'] / (1024 * 1024), 2),
+                "reclaimable_size_mb": round(image['reclaimable_size'] / (1024 * 1024), 2),
+                "containers": image['containers'],
+                "in_use": image['in_use'],
+                "created": image['created']
+            })
+    return image_list
+
+
 @api_router.get("/images")
-async def list_images():
-    if not DOCKER_AVAILABLE:
+async def list_images(request: Request, host: Optional[str] = None):
+    if not host_registry.hosts:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
+    etag = inventory_etag('image', host)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     try:
-        images = docker_client.images.list()
+        hosts = [host] if host else list(host_registry.hosts)
+        use_index = LOCAL_HOST in hosts and await image_index.ensure_current()
+        fanned = await host_registry.fan_out(build_image_list, hosts=[h for h in hosts if not use_index or h != LOCAL_HOST])
+        results = {LOCAL_HOST: index_image_list(), **fanned['results']} if use_index else fanned['results']
         image_list = []
+        for host_name, images in results.items():
+            for image in images:
+                image['host'] = host_name
+                image_list.append(image)
         
-        for img in images:
-            tags = img.tags if img.tags else ["<none>"]
-            for tag in tags:
-                repo_tag = tag.split(":")
-                image_list.append({
-                    "id": img.short_id.replace("sha256:", ""),
-                    "repository": repo_tag[0] if len(repo_tag) > 0 else "<none>",
-                    "tag": repo_tag[1] if len(repo_tag) > 1 else "<none>",
-                    "size_mb": round(img.attrs['Size'] / (1024 * 1024), 2),
-                    "created": img.attrs['Created']
-                })
-        
-        return {"images": image_list, "count": len(image_list)}
+        return tagged({"images": image_list, "count": len(image_list), "errors": fanned['errors']},
+                      None if fanned['errors'] else etag)
     except Exception as e:
         logging.error(f"Error listing images: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -873,7 +1364,7 @@ async def pull_image(request: PullImageRequest):
     
     try:
         full_image = f"{request.image}:{request.tag}"
-        image = docker_client.images.pull(request.image, tag=request.tag)
+        image = await docker_io.run(docker_client.images.pull, request.image, tag=request.tag)
         
         await log_activity("pull_image", None, "success", f"Pulled image {full_image}")
         await manager.broadcast({"type": "image_event", "action": "pull", "image": full_image})
@@ -886,18 +1377,39 @@ async def pull_image(request: PullImageRequest):
 
 
 @api_router.post("/images/prune")
-async def prune_images():
+async def prune_images(dry_run: bool = False):
+    """Remove every image no container uses. ``dry_run`` only reports what would be removed and freed."""
     if not DOCKER_AVAILABLE:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        result = docker_client.images.prune(filters={'dangling': False})
-        space_reclaimed = result.get('SpaceReclaimed', 0) / (1024 * 1024)
+        # The index decides what goes, so a prune removes exactly what its dry run reported
+        if not await image_index.ensure_current():
+            raise HTTPException(status_code=503, detail="Image index not available")
+        estimate = image_index.prune_estimate()
+        if dry_run:
+            return {"dry_run": True, **estimate}
+        
+        result = await docker_io.run(image_index.remove_unused, docker_client, [i['id'] for i in estimate['images']])
+        space_reclaimed = result['space_reclaimed_mb']
         
-        await log_activity("prune_images", None, "success", f"Reclaimed {space_reclaimed:.2f} MB")
+        status = "success" if not result['failed'] else "error"
+        details = f"Removed {len(result['removed'])} images, reclaimed {space_reclaimed:.2f} MB"
+        if result['failed']:
+            details += f"; {len(result['failed'])} could not be removed"
+        await log_activity("prune_images", None, status, details)
         await manager.broadcast({"type": "image_event", "action": "prune", "space_reclaimed_mb": space_reclaimed})
         
-        return {"success": True, "space_reclaimed_mb": round(space_reclaimed, 2), "images_deleted": len(result.get('ImagesDeleted', []))}
+        return {
+            "success": True,
+            "space_reclaimed_mb": space_reclaimed,
+            "images_deleted": len(result['removed']),
+            "removed": result['removed'],
+            "failed": result['failed'],
+            "estimated_mb": estimate['space_reclaimable_mb']
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error pruning images: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -905,12 +1417,17 @@ async def prune_images():
 
 # Volumes
 @api_router.get("/volumes")
-async def list_volumes():
+async def list_volumes(request: Request):
     if not DOCKER_AVAILABLE:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
+    etag = inventory_versions.etag('volume')
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     try:
-        volumes = docker_client.volumes.list()
+        volumes = await docker_io.run(docker_client.volumes.list)
         volume_list = []
         
         for vol in volumes:
@@ -920,21 +1437,30 @@ async def list_volumes():
                 "mountpoint": vol.attrs['Mountpoint'],
                 "created": vol.attrs.get('CreatedAt', ''),
                 "labels": vol.attrs.get('Labels', {}),
-                "scope": vol.attrs.get('Scope', 'local')
+                "scope": vol.attrs.get('Scope', 'local'),
+                # Measured in the background; None until the first scan (and for non-local drivers)
+                **volume_scanner.get(vol.name)
             })
         
-        return {"volumes": volume_list, "count": len(volume_list)}
+        return tagged({"volumes": volume_list, "count": len(volume_list)}, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/volumes/scanner")
+async def volume_scanner_status():
+    """Per-volume scan results and how much of each walk the mtime cache saved"""
+    return volume_scanner.status()
+
+
 @api_router.post("/volumes/create")
 async def create_volume(request: CreateVolumeRequest):
     if not DOCKER_AVAILABLE:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        volume = docker_client.volumes.create(
+        volume = await docker_io.run(
+            docker_client.volumes.create,
             name=request.name,
             driver=request.driver,
             labels=request.labels
@@ -954,8 +1480,8 @@ async def delete_volume(volume_name: str):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        volume = docker_client.volumes.get(volume_name)
-        volume.remove()
+        volume = await docker_io.run(docker_client.volumes.get, volume_name)
+        await docker_io.run(volume.remove)
         
         await log_activity("delete_volume", volume_name, "success", f"Volume {volume_name} deleted")
         return {"success": True, "message": f"Volume {volume_name} deleted"}
@@ -969,12 +1495,34 @@ async def delete_volume(volume_name: str):
 
 # Networks
 @api_router.get("/networks")
-async def list_networks():
+async def list_networks(request: Request):
     if not DOCKER_AVAILABLE:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
+    etag = inventory_versions.etag('network')
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     try:
-        networks = docker_client.networks.list()
+        if await network_topology.ensure_current():
+            # Served from the topology graph without touching the daemon
+            network_list = [
+                {
+                    "id": net['id'][:12],
+                    "name": net['name'],
+                    "driver": net['driver'],
+                    "scope": net['scope'],
+                    "subnet": net['subnet'],
+                    "gateway": net['gateway'],
+                    "containers": net['containers'],
+                    "container_count": len(net['containers'])
+                }
+                for net in network_topology.network_members()
+            ]
+            return tagged({"networks": network_list, "count": len(network_list)}, etag)
+        
+        networks = await docker_io.run(docker_client.networks.list)
         network_list = []
         
         for net in networks:
@@ -993,11 +1541,27 @@ async def list_networks():
                 "container_count": len(containers_in_network)
             })
         
-        return {"networks": network_list, "count": len(network_list)}
+        return tagged({"networks": network_list, "count": len(network_list)}, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/networks/topology")
+async def get_network_topology(request: Request):
+    """Networks, containers, their addresses and published ports as one graph"""
+    if not DOCKER_AVAILABLE:
+        return JSONResponse({"error": "Docker not available"}, status_code=503)
+    
+    etag = inventory_versions.etag('topology')
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    if not await network_topology.ensure_current():
+        raise HTTPException(status_code=503, detail="Network topology not available (Docker event stream disconnected)")
+    return tagged({**network_topology.graph(), "status": network_topology.status()}, etag)
+
+
 @api_router.post("/networks/create")
 async def create_network(request: CreateNetworkRequest):
     if not DOCKER_AVAILABLE:
@@ -1012,7 +1576,8 @@ async def create_network(request: CreateNetworkRequest):
             )
             ipam_config = docker.types.IPAMConfig(pool_configs=[ipam_pool])
         
-        network = docker_client.networks.create(
+        network = await docker_io.run(
+            docker_client.networks.create,
             name=request.name,
             driver=request.driver,
             ipam=ipam_config,
@@ -1033,8 +1598,8 @@ async def delete_network(network_name: str):
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        network = docker_client.networks.get(network_name)
-        network.remove()
+        network = await docker_io.run(docker_client.networks.get, network_name)
+        await docker_io.run(network.remove)
         
         await log_activity("delete_network", network_name, "success", f"Network {network_name} deleted")
         return {"success": True, "message": f"Network {network_name} deleted"}
@@ -1047,39 +1612,99 @@ async def delete_network(network_name: str):
 
 
 # System
+def build_system_info(client) -> dict:
+    return format_system_info(client.info(), client.version(), client.df())
+
+
+def format_system_info(info: dict, version: dict, df: dict) -> dict:
+    return {
+        "docker_version": version.get('Version', 'Unknown'),
+        "api_version": version.get('ApiVersion', 'Unknown'),
+        "os": info.get('OperatingSystem', 'Unknown'),
+        "architecture": info.get('Architecture', 'Unknown'),
+        "cpus": info.get('NCPU', 0),
+        "memory_total_gb": round(info.get('MemTotal', 0) / (1024**3), 2),
+        "containers_total": info.get('Containers', 0),
+        "containers_running": info.get('ContainersRunning', 0),
+        "containers_paused": info.get('ContainersPaused', 0),
+        "containers_stopped": info.get('ContainersStopped', 0),
+        "images_count": info.get('Images', 0),
+        "storage_driver": info.get('Driver', 'Unknown'),
+        "disk_usage": {
+            "images": df.get('Images', []),
+            "containers": df.get('Containers', []),
+            "volumes": df.get('Volumes', [])
+        }
+    }
+
+
+async def cached_system_info(host_name: str, refresh: bool = False) -> dict:
+    timeout = float(os.environ.get('DOCKER_HOST_SLOW_TIMEOUT', '60'))
+    (info, info_age), (version, version_age), (df, df_age) = await asyncio.gather(
+        system_info_cache.get(host_name, "info", timeout=timeout, force=refresh),
+        system_info_cache.get(host_name, "version", timeout=timeout, force=refresh),
+        system_info_cache.get(host_name, "df", timeout=timeout, force=refresh)
+    )
+    result = format_system_info(info, version, df)
+    result['cache_age_seconds'] = {
+        "info": round(info_age, 1),
+        "version": round(version_age, 1),
+        "df": round(df_age, 1)
+    }
+    return result
+
+
 @api_router.get("/system/info")
-async def system_info():
-    if not DOCKER_AVAILABLE:
+async def system_info(host: Optional[str] = None, refresh: bool = False):
+    if not host_registry.hosts:
         return JSONResponse({"error": "Docker not available"}, status_code=503)
     
     try:
-        info = docker_client.info()
-        version = docker_client.version()
-        df = docker_client.df()
+        names = [host] if host else list(host_registry.hosts)
+        outcomes = await asyncio.gather(
+            *(cached_system_info(name, refresh) for name in names),
+            return_exceptions=True
+        )
+        results, errors = {}, {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, KeyError):
+                errors[name] = "unknown host"
+            elif isinstance(outcome, asyncio.TimeoutError):
+                errors[name] = "timed out"
+            elif isinstance(outcome, Exception):
+                errors[name] = str(outcome)
+            else:
+                results[name] = outcome
+        if not results:
+            raise HTTPException(status_code=502, detail=f"No Docker host answered: {errors}")
         
-        return {
-            "docker_version": version.get('Version', 'Unknown'),
-            "api_version": version.get('ApiVersion', 'Unknown'),
-            "os": info.get('OperatingSystem', 'Unknown'),
-            "architecture": info.get('Architecture', 'Unknown'),
-            "cpus": info.get('NCPU', 0),
-            "memory_total_gb": round(info.get('MemTotal', 0) / (1024**3), 2),
-            "containers_total": info.get('Containers', 0),
-            "containers_running": info.get('ContainersRunning', 0),
-            "containers_paused": info.get('ContainersPaused', 0),
-            "containers_stopped": info.get('ContainersStopped', 0),
-            "images_count": info.get('Images', 0),
-            "storage_driver": info.get('Driver', 'Unknown'),
-            "disk_usage": {
-                "images": df.get('Images', []),
-                "containers": df.get('Containers', []),
-                "volumes": df.get('Volumes', [])
-            }
-        }
+        # Top-level fields describe the requested (or local) host; every host is listed under "hosts"
+        primary = results.get(host or LOCAL_HOST) or next(iter(results.values()))
+        return {**primary, "hosts": results, "errors": errors}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/images/index")
+async def image_index_status():
+    """Size and freshness of the event-maintained image index"""
+    return image_index.status()
+
+
+@api_router.get("/stats/backend")
+async def stats_backend_status():
+    """Which stats backend is in use and how often it fell back to the Docker API"""
+    return container_stats_source.status()
+
+
+@api_router.get("/system/info/cache")
+async def system_info_cache_status():
+    """Age, fetch time and hit rates of the cached info/version/df calls"""
+    return system_info_cache.status()
+
+
 @api_router.get("/system/metrics/history")
 async def get_system_metrics_history(hours: int = 1):
     """Get historical system metrics"""
@@ -1095,6 +1720,49 @@ async def get_system_metrics_history(hours: int = 1):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Docker hosts
+@api_router.get("/docker/status")
+async def docker_status():
+    """Local daemon connection: availability, last error and reconnect backoff"""
+    return docker_connector.status()
+
+
+@api_router.get("/hosts")
+async def list_hosts():
+    return {"hosts": [h.info() for h in host_registry.hosts.values()], "count": len(host_registry.hosts)}
+
+
+@api_router.post("/hosts")
+async def add_host(config: DockerHostConfig):
+    if config.name == LOCAL_HOST:
+        raise HTTPException(status_code=400, detail=f"'{LOCAL_HOST}' is reserved for the local daemon")
+    
+    try:
+        host_registry.add(config.name, config.url)
+        system_info_cache.forget(config.name)
+        await db.docker_hosts.update_one({"name": config.name}, {"$set": config.model_dump()}, upsert=True)
+        await log_activity("add_host", None, "success", f"Docker host {config.name} added ({config.url})")
+        return {"success": True, "host": host_registry.get(config.name).info()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.delete("/hosts/{host_name}")
+async def remove_host(host_name: str):
+    if host_name == LOCAL_HOST:
+        raise HTTPException(status_code=400, detail="The local host can't be removed")
+    if not host_registry.remove(host_name):
+        raise HTTPException(status_code=404, detail="Host not found")
+    system_info_cache.forget(host_name)
+    
+    try:
+        await db.docker_hosts.delete_one({"name": host_name})
+        await log_activity("remove_host", None, "success", f"Docker host {host_name} removed")
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Templates
 @api_router.get("/templates")
 async def list_templates():
@@ -1187,15 +1855,177 @@ async def delete_webhook(webhook_id: str):
 
 
 @api_router.get("/activity-logs")
-async def get_activity_logs(limit: int = 50):
+async def get_activity_logs(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    event_type: Optional[str] = None,
+    container_name: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Newest first. Pass the returned ``next_cursor`` as ``cursor`` for older entries;
+    ``since``/``until`` are ISO dates or times (UTC unless an offset is given)."""
     try:
-        logs = await db.activity_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-        return {"logs": logs, "count": len(logs)}
+        return await activity_writer.page(
+            limit=max(1, min(limit, 1000)),
+            cursor=cursor,
+            event_type=event_type,
+            container_name=container_name,
+            status=status,
+            since=since,
+            until=until
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error getting activity logs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/activity-logs/writer")
+async def activity_writer_status():
+    return activity_writer.status()
+
+
+async def sweep_container_stats() -> list:
+    """Every local container with fresh stats, for the metrics snapshot"""
+    if not DOCKER_AVAILABLE:
+        return []
+    containers = await docker_io.run(docker_client.containers.list, all=True)
+    container_stats, _ = await get_container_infos(containers)
+    return container_stats
+
+
+def render_metrics() -> str:
+    """OpenMetrics text from in-memory state only - no Docker calls"""
+    writer = OpenMetricsWriter()
+    write_container_metrics(writer, container_snapshot.containers)
+    write_host_metrics(writer, host_metrics.latest())
+    
+    writer.gauge('container_snapshot_age_seconds', "Age of the container sweep the container metrics come from", 'seconds').add(container_snapshot.age())
+    writer.gauge('websocket_connections', "Connected /ws clients").add(len(manager.active_connections))
+    writer.gauge('docker_io_workers', "Docker I/O pool size").add(docker_io.max_workers)
+    writer.gauge('docker_io_in_flight', "Docker calls running on the I/O pool").add(docker_io.in_flight)
+    writer.counter('docker_io_calls', "Docker calls completed on the I/O pool").add(docker_io.completed)
+    writer.gauge('docker_events_connected', "Whether the Docker event stream is connected").add(int(docker_events.connected))
+    writer.counter('docker_events_connections', "Docker event stream (re)connections").add(docker_events.generation)
+    
+    stats_reads = writer.counter('stats_reads', "Container stats reads by source")
+    for source in ('cgroup', 'docker'):
+        stats_reads.add(container_stats_source.counts[source], source=source)
+    writer.counter('stats_cgroup_fallbacks', "cgroup stats reads that fell back to the Docker API").add(container_stats_source.counts['fallbacks'])
+    
+    cache_events = writer.counter('system_info_cache_events', "System info cache lookups and fetches by outcome")
+    for event, count in system_info_cache.stats.items():
+        cache_events.add(count, event=event)
+    
+    index = image_index.status()
+    writer.gauge('images', "Images in the image index").add(index['images'])
+    writer.gauge('image_layers', "Distinct layers in the image index").add(index['layers'])
+    writer.gauge('images_reclaimable_bytes', "Bytes a prune of every unused image would free", 'bytes').add(image_index.reclaimable)
+    
+    volume_size = writer.gauge('volume_size_bytes', "Disk usage of a local volume at its last scan", 'bytes')
+    for volume_name, result in volume_scanner.sizes.items():
+        volume_size.add(result.get('size_bytes'), volume=volume_name)
+    
+    writer.gauge('activity_log_buffered', "Activity log entries waiting to be written").add(activity_writer.status()['buffered'])
+    writer.counter('activity_log_written', "Activity log entries written").add(activity_writer.stats['written'])
+    writer.counter('activity_log_dropped', "Activity log entries dropped while MongoDB was unavailable").add(activity_writer.stats['dropped'])
+    writer.counter('activity_log_write_errors', "Failed activity log batch writes").add(activity_writer.stats['errors'])
+    return writer.render()
+
+
+@api_router.get("/metrics")
+async def metrics():
+    """OpenMetrics exposition for Prometheus; rendered from the latest snapshots, never sweeps Docker"""
+    return Response(content=render_metrics(), media_type=OPENMETRICS_CONTENT_TYPE)
+
+
+@api_router.get("/debug/perf")
+async def debug_perf(kind: Optional[str] = None):
+    """Latency histograms (route, docker, docker_io, mongo, psutil, ws, loop), slowest in total first"""
+    return {**instrumentation.snapshot(kind), "profiler": {"running": profiler.running, "samples": profiler.samples}}
+
+
+@api_router.delete("/debug/perf")
+async def reset_debug_perf():
+    instrumentation.reset()
+    return {"message": "Latency histograms reset"}
+
+
+@api_router.post("/debug/profile")
+async def start_profile(seconds: float = Query(10.0, gt=0, le=60), interval_ms: float = Query(5.0, ge=1, le=100)):
+    """Sample every thread's stack for ``seconds``; read the result from GET /debug/profile"""
+    profiler.interval = interval_ms / 1000
+    try:
+        profiler.start(seconds)
+    except RuntimeError as e:
+        raise HTTPException(409, detail=str(e))
+    return {"message": f"Profiling for {seconds:g}s", "ends_at": profiler.ends_at}
+
+
+@api_router.get("/debug/profile")
+async def get_profile(format: str = 'json', thread: Optional[str] = None, top: int = Query(30, ge=1, le=500)):
+    """The last profile: top functions (json) or folded stacks for flamegraph tools (folded).
+    ``thread`` keeps only threads whose name starts with it, e.g. MainThread for the event loop."""
+    if format == 'folded':
+        return Response(content=profiler.folded(thread), media_type="text/plain")
+    if format != 'json':
+        raise HTTPException(400, detail="format must be json or folded")
+    return profiler.report(top, thread)
+
+
+@api_router.get("/proxy/status")
+async def proxy_status():
+    return wake_proxy.status()
+
+
+@api_router.get("/idle/status")
+async def idle_status():
+    """Containers scheduled for idle shutdown, soonest first"""
+    return idle_scheduler.status()
+
+
+@api_router.get("/prewarm/status")
+async def prewarm_status():
+    """Pre-warm profile, prewarmed containers and how many requests avoided a cold start"""
+    return prewarmer.status()
+
+
+@api_router.get("/nginx/status")
+async def nginx_status():
+    if nginx_config is None:
+        return JSONResponse({"error": "nginx config generation not enabled"}, status_code=503)
+    return nginx_config.status()
+
+
+@api_router.post("/nginx/sync")
+async def nginx_sync():
+    """Render the nginx config now; reloads nginx only if a file changed"""
+    if nginx_config is None:
+        return JSONResponse({"error": "nginx config generation not enabled"}, status_code=503)
+    
+    try:
+        changed = await nginx_config.sync()
+        return {"success": True, "changed": changed, "last_reload": nginx_config.last_reload}
+    except Exception as e:
+        logging.error(f"Error syncing nginx config: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/sleep/metrics")
+async def sleep_metrics():
+    """Memory reclaimed versus wake latency for each sleep strategy"""
+    return sleep_manager.metrics()
+
+
+@api_router.get("/readiness/latency")
+async def readiness_latency():
+    """Wake-to-ready latency per container"""
+    return {"containers": readiness.summary()}
+
+
 @api_router.get("/system/metrics")
 async def system_metrics():
     return get_system_metrics()
@@ -1224,6 +2054,8 @@ async def update_settings(settings: Settings):
         await db.settings.delete_many({})
         await db.settings.insert_one(settings_dict)
         
+        idle_scheduler.set_default_timeout(settings.default_idle_timeout)
+        
         await log_activity("update_settings", None, "success", "Application settings updated")
         await manager.broadcast({"type": "settings_updated", "settings": settings_dict})
         
@@ -1243,6 +2075,8 @@ async def reset_settings():
         await db.settings.delete_many({})
         await db.settings.insert_one(settings_dict)
         
+        idle_scheduler.set_default_timeout(default_settings.default_idle_timeout)
+        
         await log_activity("reset_settings", None, "success", "Settings reset to defaults")
         
         return {"success": True, "message": "Settings reset to defaults", "settings": settings_dict}
@@ -1253,34 +2087,38 @@ async def reset_settings():
 
 # WebSocket endpoint
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, format: str = 'json', fields: Optional[str] = None):
+    await manager.connect(websocket, format, parse_fields(fields))
     try:
         system_metrics = get_system_metrics()
-        await websocket.send_json({"type": "system_metrics", "data": system_metrics})
+        await manager.send(websocket, {"type": "system_metrics", "data": system_metrics})
         
         while True:
             try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=3.0)
+                data = await asyncio.wait_for(websocket.receive_text(), timeout=WS_TICK_INTERVAL)
+                # Control messages are JSON text in either format, e.g. {"type": "subscribe", "fields": "name,stats"}
+                try:
+                    request = json.loads(data)
+                    if isinstance(request, dict) and request.get('type') == 'subscribe':
+                        manager.subscribe(websocket, parse_fields(request.get('fields')))
+                except ValueError:
+                    pass
             except asyncio.TimeoutError:
+                tick_started = time.perf_counter()
                 if DOCKER_AVAILABLE:
                     try:
-                        containers = docker_client.containers.list(all=True)
-                        container_stats = [get_container_info(c) for c in containers]
+                        containers = await docker_io.run(docker_client.containers.list, all=True)
+                        container_stats, stats_frame = await get_container_infos(containers)
+                        container_snapshot.update(container_stats)
                         
-                        for container_stat in container_stats:
-                            if container_stat['status'] == 'running':
-                                await save_container_stats(
-                                    container_stat['name'],
-                                    container_stat['stats']
-                                )
+                        await save_container_stats([c for c in container_stats if c['status'] == 'running'])
                         
-                        await websocket.send_json({"type": "container_stats", "data": container_stats})
+                        await manager.send(websocket, {"type": "container_stats", "data": container_stats})
                     except:
                         pass
                 
                 system_metrics = get_system_metrics()
-                await websocket.send_json({"type": "system_metrics", "data": system_metrics})
+                await manager.send(websocket, {"type": "system_metrics", "data": system_metrics})
                 
                 # Save system metrics history
                 try:
@@ -1293,9 +2131,13 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Check alerts
                 try:
                     settings = await get_settings()
-                    await check_and_create_alerts(container_stats if DOCKER_AVAILABLE else [], system_metrics, settings)
+                    if DOCKER_AVAILABLE:
+                        await check_and_create_alerts(container_stats, system_metrics, settings, stats_frame)
+                    else:
+                        await check_and_create_alerts([], system_metrics, settings)
                 except:
                     pass
+                instrumentation.observe('ws', 'tick', time.perf_counter() - tick_started)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -1305,6 +2147,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
 
 app.include_router(api_router)
+# Also at the conventional path for scrapers pointed straight at the backend
+app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1320,6 +2164,156 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+async def ensure_indexes():
+    await activity_writer.ensure_indexes()
+    for collection, indexes in MONGO_INDEXES.items():
+        for keys in indexes:
+            await db[collection].create_index(keys)
+
+
+async def load_docker_hosts():
+    async for doc in db.docker_hosts.find({}, {"_id": 0}):
+        if doc['name'] not in host_registry.hosts:
+            host_registry.add(doc['name'], doc['url'])
+            system_info_cache.prefetch(doc['name'])
+
+
+async def load_idle_timeout():
+    settings = await get_settings()
+    idle_scheduler.set_default_timeout(settings.get('default_idle_timeout', idle_scheduler.default_timeout))
+
+
+async def initialize_storage(max_backoff: float = 60.0):
+    """MongoDB-backed setup, concurrently and off the startup path; failed steps are retried with
+    backoff, so a MongoDB that comes up after the backend is picked up without a restart"""
+    steps = {
+        "creating indexes": ensure_indexes,
+        "loading Docker hosts": load_docker_hosts,
+        "loading idle timeout setting": load_idle_timeout,
+        "loading route access history": load_route_access_history
+    }
+    backoff = 1.0
+    while steps:
+        results = await asyncio.gather(*(step() for step in steps.values()), return_exceptions=True)
+        for name, result in zip(list(steps), results):
+            if isinstance(result, Exception):
+                logging.error(f"Error {name}: {result}")
+            else:
+                del steps[name]
+        if steps:
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+
+async def on_docker_connect(client):
+    """The local daemon answered (at startup or after an outage): point everything at it"""
+    global docker_client, DOCKER_AVAILABLE
+    docker_client = client
+    DOCKER_AVAILABLE = True
+    local = host_registry.hosts.get(LOCAL_HOST)
+    if local is None or local.client is not client:
+        host_registry.add(LOCAL_HOST, None, client=client)
+    
+    async def resync_idle_scheduler():
+        # Containers may have started or stopped while we couldn't see them
+        await docker_io.run(idle_scheduler.sync)
+    
+    steps = {
+        "system info": lambda: system_info_cache.prefetch(LOCAL_HOST),
+        "image index": image_index.start,
+        "network topology": network_topology.start,
+        "volume sizes": volume_scanner.request_full_pass,
+        "nginx config": nginx_config.request_sync if nginx_config is not None else None,
+        "idle scheduler": resync_idle_scheduler,
+        "wake proxy routes": lambda: wake_proxy.refresh_routes(force=True)
+    }
+    # Every step runs even if an earlier one fails; any failure makes the connector run them all again
+    failed = []
+    for name, step in steps.items():
+        if step is None:
+            continue
+        try:
+            result = step()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logging.error(f"Error resyncing {name} after Docker connected: {e}")
+            failed.append(name)
+    if failed:
+        raise RuntimeError(f"resync failed for {', '.join(failed)}")
+
+
+async def on_docker_disconnect():
+    global DOCKER_AVAILABLE
+    DOCKER_AVAILABLE = False
+
+
+docker_connector = DockerConnector(
+    create_docker_client,
+    on_docker_connect,
+    on_docker_disconnect,
+    min_backoff=float(os.environ.get('DOCKER_RECONNECT_MIN', '1')),
+    max_backoff=float(os.environ.get('DOCKER_RECONNECT_MAX', '60')),
+    check_interval=float(os.environ.get('DOCKER_HEALTH_INTERVAL', '10'))
+)
+storage_init: Optional[asyncio.Task] = None
+
+
+async def start_background_services():
+    """Nothing here waits on Docker or MongoDB: the Docker connection and MongoDB setup continue in the background"""
+    global storage_init
+    instrumentation.start()
+    host_metrics.start()
+    activity_writer.start()
+    route_access_writer.start()
+    storage_init = asyncio.create_task(initialize_storage())
+    
+    for host_name in host_registry.hosts:
+        system_info_cache.prefetch(host_name)
+    system_info_cache.start()
+    
+    # Everything below tolerates the daemon being unreachable and picks it up once it connects
+    docker_events.subscribe(inventory_versions.handle_event)
+    docker_events.subscribe(readiness.handle_event)
+    docker_events.subscribe(image_index.handle_event)
+    docker_events.subscribe(network_topology.handle_event)
+    docker_events.subscribe(volume_scanner.handle_event)
+    docker_events.subscribe(sleep_manager.handle_event)
+    docker_events.subscribe(container_stats_source.handle_event)
+    docker_events.subscribe(idle_scheduler.handle_event)
+    docker_events.subscribe(prewarmer.handle_event)
+    if nginx_config is not None:
+        docker_events.subscribe(nginx_config.handle_event)
+    docker_events.start(asyncio.get_running_loop())
+    docker_connector.start()
+    
+    volume_scanner.start()
+    container_snapshot.start(sweep_container_stats)
+    idle_scheduler.start()
+    prewarmer.start()
+    if WAKE_PROXY_PORT:
+        try:
+            await wake_proxy.start(port=WAKE_PROXY_PORT)
+        except OSError as e:
+            logging.error(f"Wake proxy could not listen on port {WAKE_PROXY_PORT}: {e}")
+
+
+async def stop_background_services():
+    if storage_init is not None and not storage_init.done():
+        storage_init.cancel()
+    await docker_connector.stop()
+    await wake_proxy.stop()
+    await idle_scheduler.stop()
+    await prewarmer.stop()
+    await system_info_cache.stop()
+    await host_metrics.stop()
+    await volume_scanner.stop()
+    await container_snapshot.stop()
+    await instrumentation.stop()
+    profiler.stop()
+    docker_events.stop()
+    host_registry.close()
+    docker_io.shutdown()
+    await activity_writer.stop()
+    await route_access_writer.stop()
     client_mongo.close()
@@ -0,0 +1,193 @@
+"""Per-container sleep strategies.
+
+The ``dockerwakeup.sleep_strategy`` label picks how an idle container is put
+to sleep:
+
+* ``stop`` (default) - frees all memory, wakes with a full cold start
+* ``pause`` - freezes the cgroup; memory stays resident but wake is near-instant
+* ``checkpoint`` - CRIU checkpoint then restore; needs an experimental daemon
+  with CRIU installed and falls back to ``stop`` when that isn't available
+
+Memory reclaimed on sleep and wake-to-ready latency are recorded per strategy
+so the trade-off can be compared.
+"""
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+
+
+SLEEP_STRATEGY_LABEL = 'dockerwakeup.sleep_strategy'
+STRATEGIES = ('stop', 'pause', 'checkpoint')
+DEFAULT_STRATEGY = 'stop'
+CHECKPOINT_NAME = 'dockerwakeup-sleep'
+# Daemon error messages that mean checkpointing can't work here at all, as opposed to failing for one container
+UNSUPPORTED_MARKERS = ('experimental', 'not supported', 'not implemented')
+
+
+class CheckpointError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.unsupported = any(marker in message.lower() for marker in UNSUPPORTED_MARKERS)
+
+
+def _engine_request(api, method: str, path: str, **kwargs):
+    """Call an Engine API endpoint docker-py has no wrapper for, through the client's own session"""
+    response = api.request(method, f"{api.base_url}/v{api.api_version}{path}", **kwargs)
+    if response.status_code >= 400:
+        try:
+            message = response.json().get('message', '')
+        except ValueError:
+            message = response.text
+        raise CheckpointError(response.status_code, message)
+    return response
+
+
+class SleepManager:
+    def __init__(self, get_docker_client: Callable[[], Any], history: int = 100):
+        self._get_docker_client = get_docker_client
+        self.checkpoint_supported: Optional[bool] = None  # unknown until the first attempt
+        self._asleep: Dict[str, str] = {}  # container -> strategy it was put to sleep with
+        self._waking: Dict[str, str] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {
+            strategy: {
+                "sleeps": 0,
+                "wakes": 0,
+                "fallbacks": 0,
+                "memory_reclaimed_bytes": 0,
+                "memory_retained_bytes": 0,
+                "wake_latencies": deque(maxlen=history)
+            }
+            for strategy in STRATEGIES
+        }
+
+    @staticmethod
+    def strategy_for(labels: Dict[str, str]) -> str:
+        strategy = (labels or {}).get(SLEEP_STRATEGY_LABEL, DEFAULT_STRATEGY).strip().lower()
+        if strategy not in STRATEGIES:
+            logging.error(f"Unknown {SLEEP_STRATEGY_LABEL} '{strategy}', using {DEFAULT_STRATEGY}")
+            return DEFAULT_STRATEGY
+        return strategy
+
+    @staticmethod
+    def _memory_usage(container) -> int:
+        try:
+            stats = container.stats(stream=False, one_shot=True)
+            memory = stats.get('memory_stats') or {}
+            # Page cache is reclaimable anyway; report what the workload actually holds
+            cache = (memory.get('stats') or {}).get('inactive_file', 0)
+            return max(memory.get('usage', 0) - cache, 0)
+        except Exception:
+            return 0
+
+    # Sleeping
+    def _checkpoint(self, container):
+        api = self._get_docker_client().api
+        path = f"/containers/{quote(container.id, safe='')}/checkpoints"
+        try:
+            _engine_request(api, 'DELETE', f"{path}/{CHECKPOINT_NAME}")
+        except CheckpointError:
+            pass  # no checkpoint left over from a previous sleep
+        _engine_request(api, 'POST', path, json={"CheckpointID": CHECKPOINT_NAME, "Exit": True})
+
+    def sleep(self, container_name: str) -> str:
+        """Put a container to sleep with its labelled strategy; returns the strategy actually used"""
+        container = self._get_docker_client().containers.get(container_name)
+        strategy = self.strategy_for(container.labels)
+        memory = self._memory_usage(container)
+
+        used = strategy
+        if strategy == 'pause':
+            container.pause()
+        elif strategy == 'checkpoint' and self.checkpoint_supported is not False:
+            try:
+                self._checkpoint(container)
+                self.checkpoint_supported = True
+            except Exception as e:
+                logging.error(f"Checkpoint of {container_name} failed, stopping instead: {e}")
+                if isinstance(e, CheckpointError) and e.unsupported:
+                    self.checkpoint_supported = False
+                self._metrics['checkpoint']['fallbacks'] += 1
+                container.stop()
+                used = 'stop'
+        else:
+            if strategy == 'checkpoint':
+                self._metrics['checkpoint']['fallbacks'] += 1
+                used = 'stop'
+            container.stop()
+
+        metrics = self._metrics[used]
+        metrics['sleeps'] += 1
+        if used == 'pause':
+            metrics['memory_retained_bytes'] += memory
+        else:
+            metrics['memory_reclaimed_bytes'] += memory
+        self._asleep[container_name] = used
+        return used
+
+    # Waking
+    def wake(self, container) -> bool:
+        """Bring a sleeping container back the way it was put to sleep; returns False if it was already running"""
+        if container.status == 'running':
+            return False
+
+        name = container.name
+        strategy = self._asleep.pop(name, None)
+        if container.status == 'paused':
+            self._waking[name] = strategy or 'pause'
+            container.unpause()
+            return True
+
+        if strategy == 'checkpoint':
+            api = self._get_docker_client().api
+            try:
+                _engine_request(api, 'POST', f"/containers/{quote(container.id, safe='')}/start",
+                                params={'checkpoint': CHECKPOINT_NAME})
+                self._waking[name] = 'checkpoint'
+                return True
+            except Exception as e:
+                logging.error(f"Restore of {name} from checkpoint failed, starting fresh: {e}")
+                self._metrics['checkpoint']['fallbacks'] += 1
+
+        self._waking[name] = 'stop' if strategy else None
+        container.start()
+        return True
+
+    def on_ready(self, container_name: str, seconds: float):
+        """Readiness hook: attribute the wake latency to the strategy the container slept with"""
+        strategy = self._waking.pop(container_name, None)
+        if strategy:
+            metrics = self._metrics[strategy]
+            metrics['wakes'] += 1
+            metrics['wake_latencies'].append(seconds)
+
+    def handle_event(self, event: Dict[str, Any]):
+        """Containers started or unpaused outside the wake path still count as woken"""
+        if event.get('Type') != 'container' or event.get('Action') not in ('start', 'unpause', 'destroy'):
+            return
+        name = event.get('Actor', {}).get('Attributes', {}).get('name', '')
+        strategy = self._asleep.pop(name, None)
+        if strategy and event.get('Action') != 'destroy':
+            self._waking.setdefault(name, strategy)
+
+    def metrics(self) -> Dict[str, Any]:
+        result = {}
+        for strategy, metrics in self._metrics.items():
+            latencies = sorted(metrics['wake_latencies'])
+            sleeps = metrics['sleeps']
+            result[strategy] = {
+                "sleeps": sleeps,
+                "wakes": metrics['wakes'],
+                "fallbacks": metrics['fallbacks'],
+                "memory_reclaimed_mb": round(metrics['memory_reclaimed_bytes'] / (1024 * 1024), 2),
+                "memory_retained_mb": round(metrics['memory_retained_bytes'] / (1024 * 1024), 2),
+                "avg_memory_reclaimed_mb": round(metrics['memory_reclaimed_bytes'] / sleeps / (1024 * 1024), 2) if sleeps else 0,
+                "avg_wake_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                "p50_wake_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                "max_wake_ms": round(latencies[-1] * 1000, 1) if latencies else None
+            }
+        return {
+            "strategies": result,
+            "checkpoint_supported": self.checkpoint_supported,
+            "asleep": dict(self._asleep)
+        }
@@ -0,0 +1,178 @@
+"""Vectorized stats for every container in one tick.
+
+Collecting stats is per container (one read each), but everything derived
+from them is not: raw counters for all containers go into NumPy arrays and
+CPU/memory percentages, I/O rates from deltas against the previous tick, and
+alert threshold checks are computed in one pass over those arrays.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Raw counters pulled out of one Docker-style stats dict, in column order
+RAW_FIELDS = (
+    'cpu_total', 'precpu_total', 'system_cpu', 'presystem_cpu', 'online_cpus',
+    'memory_usage', 'memory_limit', 'rx_bytes', 'tx_bytes', 'read_bytes', 'write_bytes'
+)
+IO_COLUMNS = slice(7, 11)
+MB = 1024 * 1024
+
+RATE_FIELDS = ('net_rx_bytes_per_sec', 'net_tx_bytes_per_sec', 'block_read_bytes_per_sec', 'block_write_bytes_per_sec')
+STATS_FIELDS = ('cpu_percent', 'memory_mb', 'memory_limit_mb', 'memory_percent') + RATE_FIELDS
+LATEST_FIELDS = ('cpu_percent', 'memory_mb')
+
+
+def raw_counters(stats: Dict[str, Any]) -> Tuple[float, ...]:
+    """One row of RAW_FIELDS from a stats dict (Docker API or cgroup reader)"""
+    cpu, precpu = stats['cpu_stats'], stats['precpu_stats']
+    # cgroup v2 hosts report online_cpus but no percpu_usage
+    online_cpus = cpu.get('online_cpus') or len(cpu['cpu_usage'].get('percpu_usage') or [0])
+    memory = stats['memory_stats']
+    networks = (stats.get('networks') or {}).values()
+    read = write = 0
+    # cgroup v1 reports "Read"/"Write"; v2 reports "read"/"write"
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = (entry.get('op') or '').lower()
+        if op == 'read':
+            read += entry.get('value', 0)
+        elif op == 'write':
+            write += entry.get('value', 0)
+    return (
+        cpu['cpu_usage']['total_usage'], precpu['cpu_usage']['total_usage'],
+        cpu.get('system_cpu_usage', 0), precpu.get('system_cpu_usage', 0), online_cpus,
+        memory.get('usage', 0), memory.get('limit', 1),
+        sum(n.get('rx_bytes', 0) for n in networks), sum(n.get('tx_bytes', 0) for n in networks),
+        read, write
+    )
+
+
+class StatsFrame:
+    """Derived stats for a batch of containers, one array element per container"""
+
+    def __init__(self, names: Sequence[str], columns: Dict[str, np.ndarray]):
+        self.names = list(names)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows(self) -> List[Dict[str, float]]:
+        """Per-container stats dicts, rounded the way the API has always reported them"""
+        rounded = [np.round(self.columns[field], 1 if field in RATE_FIELDS else 2).tolist() for field in STATS_FIELDS]
+        return [dict(zip(STATS_FIELDS, values)) for values in zip(*rounded)]
+
+    @classmethod
+    def from_rows(cls, containers: List[Dict[str, Any]]) -> 'StatsFrame':
+        """Rebuild a frame from container dicts that already carry ``stats``"""
+        return cls(
+            [c['name'] for c in containers],
+            {
+                field: np.array([c['stats'].get(field, 0) for c in containers], dtype=np.float64)
+                for field in STATS_FIELDS
+            }
+        )
+
+    def over_thresholds(self, cpu_percent: float = 0, net_mb_per_sec: float = 0,
+                        disk_mb_per_sec: float = 0) -> Dict[str, List[Tuple[int, float]]]:
+        """``(index, value)`` of containers above each threshold; a threshold of 0 disables that check"""
+        c = self.columns
+        checks = {
+            "container_cpu": (cpu_percent, c['cpu_percent']),
+            "container_network_io": (net_mb_per_sec, (c['net_rx_bytes_per_sec'] + c['net_tx_bytes_per_sec']) / MB),
+            "container_disk_io": (disk_mb_per_sec, (c['block_read_bytes_per_sec'] + c['block_write_bytes_per_sec']) / MB)
+        }
+        result = {}
+        for name, (threshold, values) in checks.items():
+            over = np.flatnonzero(values > threshold) if threshold else np.empty(0, dtype=np.intp)
+            result[name] = list(zip(over.tolist(), np.round(values[over], 2).tolist()))
+        return result
+
+
+class StatsPipeline:
+    """Turns raw counter rows into a StatsFrame, keeping I/O counters between ticks for rates"""
+
+    def __init__(self, max_age: float = 600.0):
+        self.max_age = max_age
+        self._index: Dict[str, int] = {}  # container id -> row in the state arrays
+        self._io = np.zeros((0, 4))
+        self._latest = np.zeros((0, len(LATEST_FIELDS)))  # last derived values, for sorting without fresh stats
+        self._seen = np.zeros(0)  # monotonic time each row was last updated
+        self._lock = threading.Lock()
+
+    def compute(self, keys: Sequence[str], names: Sequence[str], raw: Sequence[Optional[Tuple[float, ...]]],
+                now: Optional[float] = None) -> StatsFrame:
+        """``raw[i]`` is None for containers whose stats couldn't be read; they report zeros"""
+        now = now if now is not None else time.monotonic()
+        n = len(keys)
+        valid = np.array([r is not None for r in raw], dtype=bool)
+        counters = np.zeros((n, len(RAW_FIELDS)))
+        if valid.any():
+            counters[valid] = np.array([r for r in raw if r is not None], dtype=np.float64)
+
+        cpu_delta = counters[:, 0] - counters[:, 1]
+        system_delta = counters[:, 2] - counters[:, 3]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cpu_percent = np.where(system_delta > 0, cpu_delta / system_delta * counters[:, 4] * 100, 0.0)
+            memory_mb = counters[:, 5] / MB
+            limit_mb = counters[:, 6] / MB
+            memory_percent = np.where(limit_mb > 0, memory_mb / limit_mb * 100, 0.0)
+
+        io = counters[:, IO_COLUMNS]
+        rates = np.zeros((n, 4))
+        with self._lock:
+            rows = np.array([self._index.get(k, -1) for k in keys], dtype=np.intp)
+            known = (rows >= 0) & valid
+            if known.any():
+                elapsed = now - self._seen[rows[known]]
+                delta = np.maximum(io[known] - self._io[rows[known]], 0)  # counters restart with the container
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rates[known] = np.where(elapsed[:, None] > 0, delta / elapsed[:, None], 0.0)
+            self._store(keys, rows, valid, io, np.column_stack([cpu_percent, memory_mb]), now)
+
+        columns = {
+            "cpu_percent": cpu_percent,
+            "memory_mb": memory_mb,
+            "memory_limit_mb": limit_mb,
+            "memory_percent": memory_percent
+        }
+        columns.update({field: rates[:, i] for i, field in enumerate(RATE_FIELDS)})
+        return StatsFrame(names, columns)
+
+    def latest(self, keys: Sequence[str], field: str) -> np.ndarray:
+        """Most recently computed value of a LATEST_FIELDS field per key, 0 for keys never computed"""
+        column = LATEST_FIELDS.index(field)
+        with self._lock:
+            rows = np.array([self._index.get(k, -1) for k in keys], dtype=np.intp)
+            values = np.zeros(len(keys))
+            known = rows >= 0
+            values[known] = self._latest[rows[known], column]
+        return values
+
+    def _store(self, keys: Sequence[str], rows: np.ndarray, valid: np.ndarray, io: np.ndarray,
+               latest: np.ndarray, now: float):
+        new = np.flatnonzero(valid & (rows < 0)).tolist()
+        if new:
+            start = len(self._seen)
+            for offset, i in enumerate(new):
+                self._index[keys[i]] = start + offset
+                rows[i] = start + offset
+            self._io = np.vstack([self._io, np.zeros((len(new), 4))])
+            self._latest = np.vstack([self._latest, np.zeros((len(new), len(LATEST_FIELDS)))])
+            self._seen = np.concatenate([self._seen, np.zeros(len(new))])
+        update = rows[valid]
+        self._io[update] = io[valid]
+        self._latest[update] = latest[valid]
+        self._seen[update] = now
+
+        # Drop containers not seen for a while (removed, or on a host no longer polled)
+        stale = self._seen < now - self.max_age
+        if stale.any():
+            keep = np.flatnonzero(~stale)
+            remap = {old: new_row for new_row, old in enumerate(keep.tolist())}
+            self._index = {k: remap[r] for k, r in self._index.items() if r in remap}
+            self._io = self._io[keep]
+            self._latest = self._latest[keep]
+            self._seen = self._seen[keep]
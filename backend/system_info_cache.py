@@ -0,0 +1,165 @@
+"""Cached ``info()``, ``version()`` and ``df()`` per Docker host.
+
+The three calls differ wildly in cost and volatility: the version changes
+only on a daemon upgrade, ``info`` is cheap, and ``df`` walks every image,
+container and volume and can take tens of seconds. Each is cached with its
+own TTL. Concurrent callers share one in-flight fetch, a stale value is
+served while its refresh runs, and a background loop refreshes values that
+are due so requests rarely wait on the daemon at all.
+
+Only the local daemon is read through the shared Docker I/O pool. Remote
+hosts go through the registry's fan-out pool with a per-kind timeout, so an
+unreachable host holds at most one of its workers and never a handler's.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from docker_async import DockerExecutor
+from docker_hosts import LOCAL_HOST, DockerHostRegistry
+
+
+FETCHERS: Dict[str, Callable[[Any], Any]] = {
+    "version": lambda client: client.version(),
+    "info": lambda client: client.info(),
+    "df": lambda client: client.df()
+}
+
+DEFAULT_TTLS = {"version": 3600.0, "info": 10.0, "df": 300.0}
+DEFAULT_REMOTE_TIMEOUTS = {"version": 10.0, "info": 10.0, "df": 45.0}
+
+
+class SystemInfoCache:
+    def __init__(self, registry: DockerHostRegistry, executor: DockerExecutor,
+                 ttls: Optional[Dict[str, float]] = None, refresh_interval: float = 5.0,
+                 remote_timeouts: Optional[Dict[str, float]] = None):
+        self.registry = registry
+        self.executor = executor
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.remote_timeouts = {**DEFAULT_REMOTE_TIMEOUTS, **(remote_timeouts or {})}
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (host, kind) -> value, fetched_at, duration
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._errors: Dict[Tuple[str, str], Tuple[str, float]] = {}  # key -> (message, when)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "fetches": 0, "fetch_errors": 0}
+
+    # Fetching
+    async def _fetch(self, host_name: str, kind: str):
+        key = (host_name, kind)
+        started = time.monotonic()
+        self.stats['fetches'] += 1
+        try:
+            if host_name == LOCAL_HOST:
+                host = self.registry.get(host_name)
+                value = await self.executor.run(lambda: FETCHERS[kind](host.connect()))
+            else:
+                value = await self.registry.call(host_name, FETCHERS[kind], timeout=self.remote_timeouts[kind])
+        except Exception as e:
+            self.stats['fetch_errors'] += 1
+            self._errors[key] = (str(e) or type(e).__name__, time.monotonic())
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._errors.pop(key, None)
+        self._entries[key] = {"value": value, "fetched_at": time.monotonic(), "duration": time.monotonic() - started}
+        return value
+
+    def _refresh(self, host_name: str, kind: str) -> asyncio.Task:
+        """The in-flight fetch for a key, starting one if there is none"""
+        key = (host_name, kind)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(host_name, kind))
+            # Background refreshes may have no waiter; don't let their errors go unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    def age(self, host_name: str, kind: str) -> Optional[float]:
+        entry = self._entries.get((host_name, kind))
+        return time.monotonic() - entry['fetched_at'] if entry else None
+
+    async def get(self, host_name: str, kind: str, timeout: Optional[float] = None,
+                  force: bool = False) -> Tuple[Any, float]:
+        """``(value, age in seconds)``; only waits on the daemon when nothing is cached yet or ``force`` is set"""
+        entry = self._entries.get((host_name, kind))
+        if entry is not None and not force:
+            age = time.monotonic() - entry['fetched_at']
+            if age < self.ttls[kind]:
+                self.stats['hits'] += 1
+            else:
+                self.stats['stale_hits'] += 1
+                self._refresh(host_name, kind)
+            return entry['value'], age
+
+        self.stats['misses'] += 1
+        if (host_name, kind) in self._inflight:
+            self.stats['coalesced'] += 1
+        # Shield the shared fetch so one caller timing out doesn't cancel it for everyone else
+        value = await asyncio.wait_for(asyncio.shield(self._refresh(host_name, kind)), timeout=timeout)
+        return value, 0.0
+
+    def prefetch(self, host_name: str):
+        """Start fetching everything for a host so the first request finds it cached"""
+        for kind in FETCHERS:
+            if (host_name, kind) not in self._entries:
+                self._refresh(host_name, kind)
+
+    def forget(self, host_name: str):
+        for key in [k for k in self._entries if k[0] == host_name]:
+            del self._entries[key]
+        for key in [k for k in self._errors if k[0] == host_name]:
+            del self._errors[key]
+
+    # Background refresh
+    def refresh_due(self):
+        """Start refreshes for cached values whose TTL has run out"""
+        now = time.monotonic()
+        for (host_name, kind), entry in list(self._entries.items()):
+            if host_name not in self.registry.hosts:
+                self.forget(host_name)
+                continue
+            if now - entry['fetched_at'] < self.ttls[kind]:
+                continue
+            # Back off after a failure instead of retrying an unreachable host every tick
+            error = self._errors.get((host_name, kind))
+            if error is None or now - error[1] >= min(self.ttls[kind], 60.0):
+                self._refresh(host_name, kind)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logging.error(f"Error refreshing system info cache: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ttls": dict(self.ttls),
+            "entries": {
+                f"{host_name}/{kind}": {
+                    "age_seconds": round(time.monotonic() - entry['fetched_at'], 1),
+                    "fetch_ms": round(entry['duration'] * 1000, 1),
+                    "refreshing": (host_name, kind) in self._inflight,
+                    "last_error": self._errors.get((host_name, kind), (None,))[0]
+                }
+                for (host_name, kind), entry in self._entries.items()
+            },
+            "stats": dict(self.stats)
+        }
@@ -0,0 +1,229 @@
+"""Background disk usage scanner for local volumes.
+
+``docker_client.df()`` walks every volume (and more) inside the daemon on
+each call and blocks until done. Instead a background task walks the
+mountpoints of ``local``-driver volumes itself, one volume at a time in a
+worker thread, at a capped number of filesystem operations per second.
+
+Each directory's mtime and the bytes of its files are cached; a directory
+whose mtime hasn't changed isn't listed again. A directory's mtime only moves
+when entries are added, removed or renamed, not when a file grows in place
+(database files), so every ``full_rescan_interval`` a scan ignores the cache.
+
+Inside a container the host's volume directory has to be mounted, e.g.
+``/var/lib/docker/volumes:/host/volumes:ro`` with ``VOLUME_ROOT=/host/volumes``.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+# path -> (directory mtime_ns, bytes of the files directly in it, subdirectory names)
+DirectoryCache = Dict[str, Tuple[int, int, List[str]]]
+
+
+class VolumeSizeScanner:
+    def __init__(self, get_docker_client: Callable[[], Any], interval: float = 300.0,
+                 full_rescan_interval: float = 3600.0, max_ops_per_sec: int = 2000, root: Optional[str] = None):
+        self._get_docker_client = get_docker_client
+        self.interval = interval
+        self.full_rescan_interval = full_rescan_interval
+        self.max_ops_per_sec = max_ops_per_sec
+        self.root = root
+        self.sizes: Dict[str, Dict[str, Any]] = {}  # volume name -> last scan result
+        self.listeners: List[Callable[[], None]] = []  # called after a scan changes a size
+        self.stats = {"scans": 0, "directories_listed": 0, "directories_skipped": 0, "errors": 0}
+        self._caches: Dict[str, DirectoryCache] = {}
+        self._last_full: Dict[str, float] = {}
+        self._due: Set[str] = set()
+        self._full_requested = False
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ops = 0
+        self._window_start = time.monotonic()
+
+    def path_for(self, mountpoint: str) -> str:
+        """Where a volume's mountpoint is visible to us (``<root>/<name>/_data`` when VOLUME_ROOT is set)"""
+        if not self.root:
+            return mountpoint
+        return os.path.join(self.root, *mountpoint.rstrip('/').split('/')[-2:])
+
+    # Walking
+    def _throttle(self):
+        """Sleep as needed to stay under max_ops_per_sec; called once per stat/listing"""
+        if not self.max_ops_per_sec:
+            return
+        self._ops += 1
+        if self._ops >= max(1, self.max_ops_per_sec // 10):
+            ahead = self._ops / self.max_ops_per_sec - (time.monotonic() - self._window_start)
+            if ahead > 0:
+                time.sleep(ahead)
+            self._ops = 0
+            self._window_start = time.monotonic()
+
+    def scan_tree(self, root: str, cache: DirectoryCache, full: bool = False) -> Tuple[int, DirectoryCache, int, int]:
+        """Bytes under ``root``; returns (size, new cache, directories listed, directories skipped)"""
+        total, listed, skipped = 0, 0, 0
+        new_cache: DirectoryCache = {}
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                self._throttle()
+                cached = cache.get(path)
+                if cached is not None and not full and cached[0] == mtime:
+                    direct, subdirs = cached[1], cached[2]
+                    skipped += 1
+                else:
+                    direct, subdirs = 0, []
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            elif entry.is_file(follow_symlinks=False):
+                                direct += entry.stat(follow_symlinks=False).st_size
+                                self._throttle()
+                    listed += 1
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue  # removed while we walked, or not ours to read
+            new_cache[path] = (mtime, direct, subdirs)
+            total += direct
+            stack.extend(os.path.join(path, name) for name in subdirs)
+        return total, new_cache, listed, skipped
+
+    def scan_volume(self, name: str, mountpoint: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        full = started - self._last_full.get(name, float('-inf')) >= self.full_rescan_interval
+        path = self.path_for(mountpoint)
+        os.scandir(path).close()  # a missing or unreadable mountpoint is an error, not an empty volume
+        size, cache, listed, skipped = self.scan_tree(path, self._caches.get(name, {}), full)
+        self._caches[name] = cache
+        if full:
+            self._last_full[name] = started
+        self.stats['directories_listed'] += listed
+        self.stats['directories_skipped'] += skipped
+        return {
+            "size_bytes": size,
+            "last_scanned": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            "full": full
+        }
+
+    # Scheduling
+    async def scan_all(self, only: Optional[Set[str]] = None) -> bool:
+        """False when there was no Docker client to list volumes with"""
+        client = self._get_docker_client()
+        if client is None:
+            return False
+        volumes = (await asyncio.to_thread(client.api.volumes)).get('Volumes') or []
+        local = {v['Name']: v['Mountpoint'] for v in volumes if v.get('Driver') == 'local' and v.get('Mountpoint')}
+        for name in [n for n in self.sizes if n not in local]:
+            self.forget(name)
+        changed = False
+        for name, mountpoint in local.items():
+            if only is not None and name not in only:
+                continue
+            try:
+                result = await asyncio.to_thread(self.scan_volume, name, mountpoint)
+            except OSError as e:
+                # Typically the mountpoint isn't visible here (VOLUME_ROOT not mounted)
+                self.stats['errors'] += 1
+                self.sizes[name] = {**self.sizes.get(name, {"size_bytes": None, "last_scanned": None}), "error": str(e)}
+                continue
+            previous = self.sizes.get(name, {}).get('size_bytes')
+            self.sizes[name] = result
+            self.stats['scans'] += 1
+            changed = changed or previous != result['size_bytes']
+        if changed:
+            for listener in self.listeners:
+                listener()
+        return True
+
+    def forget(self, name: str):
+        self.sizes.pop(name, None)
+        self._caches.pop(name, None)
+        self._last_full.pop(name, None)
+
+    def handle_event(self, event: Dict[str, Any]):
+        if event.get('Type') != 'volume':
+            return
+        name = event.get('Actor', {}).get('ID', '')
+        action = event.get('Action')
+        if action == 'destroy':
+            self.forget(name)
+            for listener in self.listeners:
+                listener()
+        elif action in ('create', 'unmount'):
+            # New, or a container just stopped writing to it: measure it soon
+            self._due.add(name)
+            if self._wake is not None:
+                self._wake.set()
+
+    def request_full_pass(self):
+        """Scan every volume now rather than at the next interval, e.g. once Docker (re)connects"""
+        self._full_requested = True
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        next_full_pass = 0.0
+        while True:
+            full_pass = self._full_requested or time.monotonic() >= next_full_pass
+            self._full_requested = False
+            due, self._due = self._due, set()
+            scanned = True
+            try:
+                scanned = await self.scan_all(only=None if full_pass else due)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logging.error(f"Error scanning volume sizes: {e}")
+            self._wake.clear()
+            if not scanned:
+                # No Docker client: keep what was asked for and retry on the next wake (or after an interval)
+                self._full_requested = self._full_requested or full_pass
+                self._due |= due
+                timeout = self.interval
+            else:
+                if full_pass:
+                    next_full_pass = time.monotonic() + self.interval
+                if self._due or self._full_requested:
+                    continue
+                timeout = max(0.0, next_full_pass - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def get(self, name: str) -> Dict[str, Any]:
+        result = self.sizes.get(name) or {}
+        return {"size_bytes": result.get('size_bytes'), "last_scanned": result.get('last_scanned')}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "full_rescan_interval": self.full_rescan_interval,
+            "max_ops_per_sec": self.max_ops_per_sec,
+            "root": self.root,
+            "volumes": {name: dict(result) for name, result in self.sizes.items()},
+            "due": sorted(self._due),
+            "running": self._task is not None,
+            **self.stats
+        }
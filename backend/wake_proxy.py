@@ -0,0 +1,465 @@
+"""Wake-on-request reverse proxy.
+
+Requests are routed by the ``dockerwakeup.route`` container label. A sleeping
+container is woken through the Docker API on the first request; concurrent
+requests for the same route wait on that single wake-up and are forwarded once
+the readiness tracker reports the target ready. A running container the
+tracker hasn't seen become ready (just started by another path) is waited on
+the same way. WebSocket upgrades are
+tunnelled as raw streams; every other connection carries exactly one request
+and is closed after its response, so the proxy never has to frame keep-alive
+or pipelined traffic.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from docker_async import DockerExecutor
+from readiness import ReadinessTracker, container_address
+from sleep_strategy import SleepManager
+
+
+ROUTE_LABEL = 'dockerwakeup.route'
+URL_LABEL = 'dockerwakeup.docker_url'
+ROUTE_HEADER = 'X-DockerWakeUp-Route'
+LEGACY_PREFIX = '/proxy'
+MAX_HEAD_BYTES = 64 * 1024
+PIPE_CHUNK = 64 * 1024
+TRUSTED_PROXIES = ('127.0.0.1', '::1')
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection'}
+
+
+@dataclass
+class ProxyRoute:
+    route: str
+    container_name: str
+    docker_url: str = ''
+    host: Optional[str] = None  # set for domain routes, matched against the Host header
+    prefix: str = ''  # set for path routes, e.g. "/jellyfin"
+
+
+@dataclass
+class RequestHead:
+    method: str
+    target: str
+    version: str
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+
+    def header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    def is_upgrade(self) -> bool:
+        connection = (self.header('connection') or '').lower()
+        return 'upgrade' in connection and self.header('upgrade') is not None
+
+
+def parse_route(route: str, container_name: str, docker_url: str = '') -> ProxyRoute:
+    """Turn a label value into a path or domain route"""
+    value = route.strip()
+    if value and not value.startswith('/') and '.' in value:
+        return ProxyRoute(route=route, container_name=container_name, docker_url=docker_url,
+                          host=value.split('/', 1)[0].lower())
+    prefix = '/' + value.strip('/') if value.strip('/') else ''
+    return ProxyRoute(route=route, container_name=container_name, docker_url=docker_url, prefix=prefix)
+
+
+def request_host(head: RequestHead) -> str:
+    """Host header without the port; IPv6 literals come back without their brackets"""
+    host = (head.header('host') or '').strip().lower()
+    if host.startswith('['):
+        end = host.find(']')
+        return host[1:end] if end != -1 else host
+    if host.count(':') == 1:
+        return host.split(':', 1)[0]
+    return host
+
+
+def peer_host(writer: asyncio.StreamWriter) -> Optional[str]:
+    peer = writer.get_extra_info('peername')
+    if not peer:
+        return None
+    # IPv4 clients of a dual-stack socket show up as ::ffff:a.b.c.d
+    return peer[0][7:] if peer[0].startswith('::ffff:') else peer[0]
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    try:
+        raw = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Message head too large")
+    return [line for line in raw.decode('latin-1').split('\r\n') if line]
+
+
+def _parse_headers(lines: List[str]) -> List[Tuple[str, str]]:
+    headers = []
+    for line in lines:
+        key, _, value = line.partition(':')
+        headers.append((key.strip(), value.strip()))
+    return headers
+
+
+async def read_request_head(reader: asyncio.StreamReader) -> Optional[RequestHead]:
+    lines = await _read_head(reader)
+    if not lines:
+        return None
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise ValueError("Malformed request line")
+    return RequestHead(method=method, target=target, version=version, headers=_parse_headers(lines[1:]))
+
+
+def _simple_response(status: int, reason: str, body: str) -> bytes:
+    payload = body.encode('utf-8')
+    return (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: text/html; charset=utf-8\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode('latin-1') + payload
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            chunk = await reader.read(PIPE_CHUNK)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (OSError, RuntimeError):
+            pass
+
+
+async def _copy_body(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, length: int):
+    """Forward exactly ``length`` bytes of request body and nothing after it"""
+    try:
+        while length > 0:
+            chunk = await reader.read(min(length, PIPE_CHUNK))
+            if not chunk:
+                break
+            length -= len(chunk)
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+
+
+async def _relay_response(upstream: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Copy the upstream response to the client, marking it as the last one on the connection"""
+    while True:
+        lines = await _read_head(upstream)
+        if not lines:
+            return
+        status = lines[0].split(' ', 2)
+        informational = len(status) > 1 and status[1].startswith('1')
+        if not informational:
+            lines = [lines[0]] + [f"{k}: {v}" for k, v in _parse_headers(lines[1:]) if k.lower() not in HOP_BY_HOP]
+            lines.append("Connection: close")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        if not informational:
+            break
+    await _pipe(upstream, writer)
+
+
+async def _close(writer: asyncio.StreamWriter):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except (OSError, RuntimeError):
+        pass
+
+
+class WakeProxy:
+    """Reverse proxy that starts sleeping containers on demand"""
+
+    def __init__(self, get_docker_client: Callable[[], Any], readiness: ReadinessTracker,
+                 sleep_manager: Optional[SleepManager] = None, ready_timeout: float = 60.0,
+                 route_ttl: float = 10.0, executor: Optional[DockerExecutor] = None,
+                 trusted_proxies: Iterable[str] = TRUSTED_PROXIES):
+        self._get_docker_client = get_docker_client
+        self._run = executor.run if executor is not None else asyncio.to_thread
+        # Only these peers (the nginx in front of us) may name the route in ROUTE_HEADER
+        self.trusted_proxies = set(trusted_proxies)
+        self.readiness = readiness
+        self.sleep_manager = sleep_manager or SleepManager(get_docker_client)
+        self.ready_timeout = ready_timeout
+        self.route_ttl = route_ttl
+        self.routes: List[ProxyRoute] = []
+        self._routes_loaded_at = 0.0
+        self._wakeups: Dict[str, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.active: Dict[str, int] = {}
+        self.access_listeners: List[Callable[[str], None]] = []
+        self.request_listeners: List[Callable[[str, str, bool], None]] = []
+        self.stats = {"requests": 0, "cold_requests": 0, "wakeups": 0, "wake_failures": 0, "websocket_upgrades": 0}
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080):
+        self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_HEAD_BYTES)
+        logging.info(f"Wake proxy listening on {host}:{port}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def port(self) -> Optional[int]:
+        if not self._server or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    # Route table
+    def _load_routes(self) -> List[ProxyRoute]:
+        client = self._get_docker_client()
+        if client is None:
+            return []
+        routes = []
+        for container in client.containers.list(all=True, filters={"label": ROUTE_LABEL}):
+            labels = container.labels or {}
+            routes.append(parse_route(labels[ROUTE_LABEL], container.name, labels.get(URL_LABEL, '')))
+        # Longest prefix first so "/app/admin" wins over "/app"
+        routes.sort(key=lambda r: len(r.prefix), reverse=True)
+        return routes
+
+    async def refresh_routes(self, force: bool = False):
+        if not force and time.monotonic() - self._routes_loaded_at < self.route_ttl:
+            return
+        try:
+            self.routes = await self._run(self._load_routes)
+            self._routes_loaded_at = time.monotonic()
+        except Exception as e:
+            logging.error(f"Error loading proxy routes: {e}")
+
+    def match(self, head: RequestHead, trusted: bool = False) -> Optional[Tuple[ProxyRoute, str]]:
+        """Find the route for a request and the path to forward upstream"""
+        host = request_host(head)
+        path = head.target
+
+        # Generated nginx configs name domain routes explicitly; path routes arrive with their prefix
+        explicit = head.header(ROUTE_HEADER) if trusted else None
+        if explicit is not None:
+            for route in self.routes:
+                if route.route == explicit:
+                    return route, path
+
+        for route in self.routes:
+            if route.host and route.host == host:
+                return route, path
+
+        candidates = [path]
+        if path.startswith(LEGACY_PREFIX + '/'):
+            candidates.insert(0, path[len(LEGACY_PREFIX):])
+        for candidate in candidates:
+            for route in self.routes:
+                if route.host is not None or not route.prefix:
+                    continue
+                if candidate == route.prefix or candidate.startswith((route.prefix + '/', route.prefix + '?')):
+                    rest = candidate[len(route.prefix):]
+                    return route, rest if rest.startswith('/') else '/' + rest
+
+        for route in self.routes:
+            if route.host is None and not route.prefix:
+                return route, path
+        return None
+
+    # Wake-up
+    def _inspect(self, container_name: str):
+        return self._get_docker_client().containers.get(container_name)
+
+    def _start(self, container_name: str):
+        container = self._get_docker_client().containers.get(container_name)
+        self.sleep_manager.wake(container)
+        container.reload()
+        return container
+
+    @staticmethod
+    def resolve_target(route: ProxyRoute, container) -> Tuple[str, int]:
+        """Work out the upstream address of a running container"""
+        if route.docker_url:
+            url = urlsplit(route.docker_url if '://' in route.docker_url else f"http://{route.docker_url}")
+            return url.hostname, url.port or (443 if url.scheme == 'https' else 80)
+        return container_address(container.attrs, container.name) or (container.name, 80)
+
+    async def _wake(self, route: ProxyRoute) -> Tuple[Tuple[str, int], bool]:
+        container = await self._run(self._inspect, route.container_name)
+        if container.status == 'running':
+            address = self.resolve_target(route, container)
+            if not self.readiness.is_ready(route.container_name):
+                # Started by something else (pre-warm, the API, a bulk start) and maybe still booting;
+                # joins that start's readiness wait when there is one
+                await self.readiness.wait_ready(container, timeout=self.ready_timeout, address=address, record=False)
+            return address, False
+
+        logging.info(f"Waking {route.container_name} for route {route.route}")
+        self.stats['wakeups'] += 1
+        started_at = time.monotonic()
+        container = await self._run(self._start, route.container_name)
+        address = self.resolve_target(route, container)
+        await self.readiness.wait_ready(container, started_at, timeout=self.ready_timeout, address=address)
+        return address, True
+
+    async def ensure_awake(self, route: ProxyRoute) -> Tuple[Tuple[str, int], bool]:
+        """Start the route's container once, no matter how many requests are waiting.
+
+        Returns the upstream address and whether the request had to wait for a cold start.
+        """
+        pending = self._wakeups.get(route.container_name)
+        if pending is None:
+            pending = asyncio.ensure_future(self._wake(route))
+            self._wakeups[route.container_name] = pending
+            pending.add_done_callback(lambda _: self._wakeups.pop(route.container_name, None))
+        return await asyncio.shield(pending)
+
+    async def wake_container(self, container_name: str) -> bool:
+        """Wake a container for another path (pre-warm) through the same wake-up and readiness wait
+        requests use; True if it had to be started"""
+        route = next((r for r in self.routes if r.container_name == container_name), None)
+        _, started = await self.ensure_awake(route or ProxyRoute(route='', container_name=container_name))
+        return started
+
+    # Connection handling
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                head = await read_request_head(reader)
+            except ValueError:
+                writer.write(_simple_response(400, "Bad Request", "<h1>Bad request</h1>"))
+                await writer.drain()
+                return
+            if head is None:
+                return
+
+            self.stats['requests'] += 1
+            trusted = peer_host(writer) in self.trusted_proxies
+            await self.refresh_routes()
+            matched = self.match(head, trusted)
+            if matched is None:
+                await self.refresh_routes(force=True)
+                matched = self.match(head, trusted)
+            if matched is None:
+                writer.write(_simple_response(404, "Not Found", "<h1>No route for this request</h1>"))
+                await writer.drain()
+                return
+
+            route, upstream_path = matched
+            try:
+                (host, port), cold_start = await self.ensure_awake(route)
+            except Exception as e:
+                self.stats['wake_failures'] += 1
+                logging.error(f"Failed to wake {route.container_name}: {e}")
+                writer.write(_simple_response(503, "Service Unavailable",
+                                              f"<h1>{route.container_name} is starting up. Try again shortly.</h1>"))
+                await writer.drain()
+                return
+
+            name = route.container_name
+            if cold_start:
+                self.stats['cold_requests'] += 1
+            for listener in self.request_listeners:
+                try:
+                    listener(route.route, name, cold_start)
+                except Exception as e:
+                    logging.error(f"Error in proxy request listener: {e}")
+
+            self.active[name] = self.active.get(name, 0) + 1
+            self._notify_access(name)
+            try:
+                await self._forward(head, upstream_path, host, port, reader, writer)
+            finally:
+                self.active[name] -= 1
+                if not self.active[name]:
+                    del self.active[name]
+                self._notify_access(name)
+        except Exception as e:
+            logging.error(f"Wake proxy error: {e}")
+        finally:
+            await _close(writer)
+
+    def _notify_access(self, container_name: str):
+        for listener in self.access_listeners:
+            try:
+                listener(container_name)
+            except Exception as e:
+                logging.error(f"Error in proxy access listener: {e}")
+
+    async def _forward(self, head: RequestHead, path: str, host: str, port: int,
+                       reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            logging.error(f"Wake proxy could not reach {host}:{port}: {e}")
+            writer.write(_simple_response(502, "Bad Gateway", "<h1>Upstream unreachable</h1>"))
+            await writer.drain()
+            return
+
+        upgrade = head.is_upgrade()
+        if upgrade:
+            self.stats['websocket_upgrades'] += 1
+
+        client_addr = peer_host(writer)
+        forwarded_for = head.header('x-forwarded-for')
+        if client_addr:
+            forwarded_for = f"{forwarded_for}, {client_addr}" if forwarded_for else client_addr
+
+        skip = {'host', 'x-forwarded-for', 'x-forwarded-host', 'proxy-connection', 'keep-alive', ROUTE_HEADER.lower()}
+        if not upgrade:
+            skip.add('connection')
+        lines = [f"{head.method} {path} {head.version}", f"Host: {host}:{port}"]
+        lines += [f"{k}: {v}" for k, v in head.headers if k.lower() not in skip]
+        if forwarded_for:
+            lines.append(f"X-Forwarded-For: {forwarded_for}")
+        if head.header('host'):
+            lines.append(f"X-Forwarded-Host: {head.header('host')}")
+        if not upgrade:
+            # One request per upstream connection keeps framing out of the proxy
+            lines.append("Connection: close")
+        upstream_writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        if upgrade or 'chunked' in (head.header('transfer-encoding') or '').lower():
+            # Tunnels and chunked bodies have no length up front; the client is closed after this anyway
+            to_upstream = asyncio.ensure_future(_pipe(reader, upstream_writer))
+        else:
+            try:
+                length = int(head.header('content-length') or 0)
+            except ValueError:
+                length = 0
+            to_upstream = asyncio.ensure_future(_copy_body(reader, upstream_writer, length))
+        try:
+            if upgrade:
+                await _pipe(upstream_reader, writer)
+            else:
+                await _relay_response(upstream_reader, writer)
+        finally:
+            to_upstream.cancel()
+            await _close(upstream_writer)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "listening": self._server is not None,
+            "port": self.port,
+            "routes": [
+                {"route": r.route, "container": r.container_name, "docker_url": r.docker_url,
+                 "waking": r.container_name in self._wakeups,
+                 "active_connections": self.active.get(r.container_name, 0)}
+                for r in self.routes
+            ],
+            "stats": dict(self.stats)
+        }
@@ -220,6 +220,9 @@ const AutoDetectModal = ({ onClose, onSuccess }) => {
                             <div className="space-y-1 text-sm">
                               <div><span className="text-gray-400">Path:</span> <span className="text-white font-mono text-xs">{project.path}</span></div>
                               <div><span className="text-gray-400">Directory:</span> <span className="text-white font-mono text-xs">{project.directory}</span></div>
+                              {project.parse_error && (
+                                <div><span className="text-gray-400">Could not parse:</span> <span className="text-red-400 text-xs">{project.parse_error}</span></div>
+                              )}
                             </div>
                           </div>
                         </div>
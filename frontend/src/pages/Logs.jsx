@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Activity, RefreshCw } from 'lucide-react';
 import { toast } from 'sonner';
@@ -10,12 +10,26 @@ const API = `${BACKEND_URL}/api`;
 const Logs = () => {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [statusFilter, setStatusFilter] = useState('');
+  // Set once "Load older" has appended pages; refreshes then merge instead of replacing the list
+  const loadedOlder = useRef(false);
+
+  const logsUrl = (cursor) => {
+    const params = new URLSearchParams({ limit: '100' });
+    if (statusFilter) params.set('status', statusFilter);
+    if (cursor) params.set('cursor', cursor);
+    return `${API}/activity-logs?${params.toString()}`;
+  };
 
   const fetchLogs = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API}/activity-logs?limit=100`);
+      const response = await axios.get(logsUrl());
       setLogs(response.data.logs || []);
+      setNextCursor(response.data.next_cursor || null);
+      loadedOlder.current = false;
     } catch (error) {
       console.error('Error fetching logs:', error);
       toast.error('Failed to fetch activity logs');
@@ -24,11 +38,46 @@ const Logs = () => {
     }
   };
 
+  const refreshLogs = async () => {
+    if (!loadedOlder.current) {
+      fetchLogs();
+      return;
+    }
+    try {
+      const response = await axios.get(logsUrl());
+      setLogs((current) => {
+        const known = new Set(current.map((log) => log.id));
+        const fresh = (response.data.logs || []).filter((log) => !known.has(log.id));
+        // Newest first by (timestamp, id), the order the API pages in
+        return [...fresh, ...current].sort((a, b) =>
+          b.timestamp.localeCompare(a.timestamp) || b.id.localeCompare(a.id));
+      });
+    } catch (error) {
+      console.error('Error refreshing logs:', error);
+    }
+  };
+
+  const fetchOlder = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(logsUrl(nextCursor));
+      setLogs((current) => [...current, ...(response.data.logs || [])]);
+      setNextCursor(response.data.next_cursor || null);
+      loadedOlder.current = true;
+    } catch (error) {
+      console.error('Error fetching older logs:', error);
+      toast.error('Failed to fetch older activity logs');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchLogs();
-    const interval = setInterval(fetchLogs, 10000);
+    const interval = setInterval(refreshLogs, 10000);
     return () => clearInterval(interval);
-  }, []);
+  }, [statusFilter]);
 
   const getStatusColor = (status) => {
     return status === 'success' ? 'text-green-400' : 'text-red-400';
@@ -53,14 +102,26 @@ const Logs = () => {
                 </h1>
                 <p className="text-gray-400">{logs.length} recent activities</p>
               </div>
-              <button
-                onClick={fetchLogs}
-                data-testid="refresh-logs-button"
-                className="flex items-center gap-2 px-4 py-2 bg-blue-600 hover:bg-blue-700 text-white rounded-lg transition-colors"
-              >
-                <RefreshCw size={18} />
-                Refresh
-              </button>
+              <div className="flex items-center gap-3">
+                <select
+                  value={statusFilter}
+                  onChange={(e) => setStatusFilter(e.target.value)}
+                  data-testid="logs-status-filter"
+                  className="px-3 py-2 bg-gray-800 border border-gray-700 text-white rounded-lg"
+                >
+                  <option value="">All statuses</option>
+                  <option value="success">Success</option>
+                  <option value="error">Error</option>
+                </select>
+                <button
+                  onClick={fetchLogs}
+                  data-testid="refresh-logs-button"
+                  className="flex items-center gap-2 px-4 py-2 bg-blue-600 hover:bg-blue-700 text-white rounded-lg transition-colors"
+                >
+                  <RefreshCw size={18} />
+                  Refresh
+                </button>
+              </div>
             </div>
           </div>
 
@@ -104,6 +165,18 @@ const Logs = () => {
                 </div>
               ))
             )}
+            {!loading && nextCursor && (
+              <div className="text-center pt-2">
+                <button
+                  onClick={fetchOlder}
+                  disabled={loadingMore}
+                  data-testid="load-older-logs-button"
+                  className="px-4 py-2 bg-gray-700 hover:bg-gray-600 text-white rounded-lg transition-colors disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load older'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
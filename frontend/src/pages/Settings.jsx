@@ -61,7 +61,9 @@ const Settings = () => {
     enable_alerts: true,
     cpu_alert_threshold: 80,
     memory_alert_threshold: 80,
-    disk_alert_threshold: 85
+    disk_alert_threshold: 85,
+    container_net_io_alert_threshold: 0,
+    container_disk_io_alert_threshold: 0
   });
 
   const fetchSettings = async () => {
@@ -477,6 +479,32 @@ const Settings = () => {
                   />
                   <p className="text-xs text-gray-400 mt-1">Alert when disk usage exceeds this percentage</p>
                 </div>
+                <div>
+                  <Label htmlFor="container_net_io_alert_threshold" className="text-white">Container Network I/O Threshold (MB/s)</Label>
+                  <Input
+                    id="container_net_io_alert_threshold"
+                    type="number"
+                    min="0"
+                    value={settings.container_net_io_alert_threshold}
+                    onChange={(e) => handleChange('container_net_io_alert_threshold', parseInt(e.target.value))}
+                    className="bg-gray-900 border-gray-700 text-white mt-2"
+                    disabled={!settings.enable_alerts}
+                  />
+                  <p className="text-xs text-gray-400 mt-1">Alert when a container's rx+tx rate exceeds this (0 disables)</p>
+                </div>
+                <div>
+                  <Label htmlFor="container_disk_io_alert_threshold" className="text-white">Container Disk I/O Threshold (MB/s)</Label>
+                  <Input
+                    id="container_disk_io_alert_threshold"
+                    type="number"
+                    min="0"
+                    value={settings.container_disk_io_alert_threshold}
+                    onChange={(e) => handleChange('container_disk_io_alert_threshold', parseInt(e.target.value))}
+                    className="bg-gray-900 border-gray-700 text-white mt-2"
+                    disabled={!settings.enable_alerts}
+                  />
+                  <p className="text-xs text-gray-400 mt-1">Alert when a container's read+write rate exceeds this (0 disables)</p>
+                </div>
               </div>
             </div>
 
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules (server.py runs from backend/)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+# The fake Docker daemon and in-memory MongoDB come from the benchmark suite
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server.py with an in-memory MongoDB; its lifespan isn't run, so no background task starts"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:1')  # the Motor client it creates is never used
+    os.environ.setdefault('DB_NAME', 'test')
+    import server as module
+    from bench_server import MemoryDatabase
+
+    monkeypatch.setattr(module, 'db', MemoryDatabase())
+    return module
+
+
+@pytest.fixture
+def fake_docker(server, request):
+    """A fake local daemon serving ``request.param`` (default 20) containers; every fifth one is stopped"""
+    import docker
+    from bench_server import FakeDockerDaemon
+    from bench_stats_backends import API_VERSION
+
+    with FakeDockerDaemon(getattr(request, 'param', 20)) as daemon:
+        client = docker.DockerClient(base_url=daemon.url, version=API_VERSION)
+        server.host_registry.add(server.LOCAL_HOST, None, client=client)
+        try:
+            yield daemon
+        finally:
+            server.host_registry.remove(server.LOCAL_HOST)
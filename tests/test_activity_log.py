@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from activity_log import ActivityLogWriter, build_query, decode_cursor, encode_cursor, normalize_time
+from bench_server import MemoryCursor
+
+
+class FakeCollection:
+    """insert_many with MongoDB's unordered semantics and a unique _id index"""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail_after = None  # write this many documents, then drop the connection
+        self.invalid = set()  # messages rejected by a validation rule
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+        errors = []
+        for index, doc in enumerate(docs):
+            if self.fail_after is not None and index == self.fail_after:
+                self.fail_after = None
+                raise AutoReconnect("connection closed")
+            if doc['_id'] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            elif doc.get('message') in self.invalid:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc['_id']] = dict(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+def _entries(n):
+    return [{"id": str(i), "timestamp": f"2024-01-01T00:00:{i:02d}+00:00", "message": f"m{i}"} for i in range(n)]
+
+
+def test_retry_after_partial_write_neither_duplicates_nor_sticks():
+    async def main():
+        collection = FakeCollection()
+        writer = ActivityLogWriter(collection, batch_size=10)
+        for doc in _entries(6):
+            writer.log(doc)
+        collection.fail_after = 3
+        await writer.flush()
+        assert writer.status()['buffered'] == 6 and writer.stats['errors'] == 1
+
+        # The first three are already stored; their duplicate-key errors count as written
+        await writer.flush()
+        assert writer.status()['buffered'] == 0
+        assert sorted(d['message'] for d in collection.docs.values()) == [f"m{i}" for i in range(6)]
+        assert writer._retry_delay == 0.0
+    asyncio.run(main())
+
+
+def test_only_failed_documents_are_requeued():
+    async def main():
+        collection = FakeCollection()
+        collection.invalid = {'m2'}
+        writer = ActivityLogWriter(collection, batch_size=10)
+        for doc in _entries(4):
+            writer.log(doc)
+        await writer.flush()
+        assert [d['message'] for d in writer._buffer] == ['m2']
+        assert writer.stats['written'] == 3 and len(collection.docs) == 3
+
+        collection.invalid = set()
+        await writer.flush()
+        assert len(collection.docs) == 4 and not writer._buffer
+    asyncio.run(main())
+
+
+def test_first_page_reads_honour_the_retry_backoff():
+    class DownCollection(FakeCollection):
+        def __init__(self):
+            super().__init__()
+            self.attempts = 0
+
+        async def insert_many(self, docs, ordered=True):
+            self.attempts += 1
+            raise AutoReconnect("connection refused")
+
+        def find(self, query, projection=None):
+            return MemoryCursor([])
+
+    async def main():
+        collection = DownCollection()
+        writer = ActivityLogWriter(collection)
+        writer.log(_entries(1)[0])
+        await writer.page()
+        assert collection.attempts == 1 and writer._retry_delay > 0
+        # Polling the first page while MongoDB is down doesn't retry (and log) the batch every time
+        for _ in range(3):
+            await writer.page()
+        assert collection.attempts == 1 and writer.stats['errors'] == 1
+        assert writer.status()['buffered'] == 1
+    asyncio.run(main())
+
+
+def test_cursor_round_trip():
+    doc = {"timestamp": "2024-05-01T12:00:00+00:00", "id": "4f1c|x"}
+    assert decode_cursor(encode_cursor(doc)) == ("2024-05-01T12:00:00+00:00", "4f1c|x")
+    for bad in ('', 'not-base64!', encode_cursor({"timestamp": "", "id": "x"})):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_build_query():
+    assert build_query(event_type='start', container_name=None) == {"event_type": "start"}
+    assert build_query(since='2024-05-01T14:00:00+02:00', until='2024-05-02') == {
+        "timestamp": {"$gte": "2024-05-01T12:00:00+00:00", "$lt": "2024-05-02T00:00:00+00:00"}
+    }
+    cursor = encode_cursor({"timestamp": "2024-05-01T12:00:00+00:00", "id": "abc"})
+    assert build_query(cursor=cursor, status='error') == {"$and": [
+        {"status": "error"},
+        {"$or": [
+            {"timestamp": {"$lt": "2024-05-01T12:00:00+00:00"}},
+            {"timestamp": "2024-05-01T12:00:00+00:00", "id": {"$lt": "abc"}}
+        ]}
+    ]}
+
+
+def test_normalize_time():
+    assert normalize_time('2024-05-01T12:00:00Z') == '2024-05-01T12:00:00+00:00'
+    with pytest.raises(ValueError):
+        normalize_time('yesterday')
@@ -0,0 +1,112 @@
+import os
+from collections import namedtuple
+
+import pytest
+
+import cgroup_stats
+from cgroup_stats import CgroupStatsReader, CgroupUnavailable, parse_net_dev
+
+
+CONTAINER_ID = 'a' * 64
+PID = 4242
+NET_DEV = (
+    "Inter-|   Receive                                                |  Transmit\n"
+    " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n"
+    "    lo:     100       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0\n"
+    "  eth0:    1500      10    1    2    0     0          0         0     2500      20    3    4    0     0       0          0\n"
+)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    _write(str(tmp_path / 'proc' / str(PID) / 'net' / 'dev'), NET_DEV)
+    return str(tmp_path / 'proc')
+
+
+@pytest.fixture
+def cgroup_v2(tmp_path):
+    root = tmp_path / 'cgroup2'
+    directory = root / 'system.slice' / f'docker-{CONTAINER_ID}.scope'
+    _write(str(root / 'cgroup.controllers'), "cpuset cpu io memory pids\n")
+    _write(str(directory / 'cpu.stat'), "usage_usec 2000000\nuser_usec 1500000\nsystem_usec 500000\n")
+    _write(str(directory / 'memory.current'), "104857600\n")
+    _write(str(directory / 'memory.max'), "max\n")
+    _write(str(directory / 'memory.stat'), "anon 52428800\nfile 52428800\ninactive_file 1048576\n")
+    _write(str(directory / 'io.stat'), "8:0 rbytes=4096 wbytes=8192 rios=1 wios=2 dbytes=0 dios=0\n")
+    return root
+
+
+@pytest.fixture
+def cgroup_v1(tmp_path):
+    root = tmp_path / 'cgroup1'
+    cpu = root / 'cpu,cpuacct' / 'docker' / CONTAINER_ID
+    _write(str(cpu / 'cpuacct.usage'), "3000000000\n")
+    _write(str(cpu / 'cpuacct.usage_percpu'), "1000000000 2000000000\n")
+    memory = root / 'memory' / 'docker' / CONTAINER_ID
+    _write(str(memory / 'memory.usage_in_bytes'), "73400320\n")
+    _write(str(memory / 'memory.limit_in_bytes'), "268435456\n")
+    _write(str(memory / 'memory.stat'), "cache 1048576\nrss 72351744\ninactive_file 1048576\n")
+    _write(str(root / 'blkio' / 'docker' / CONTAINER_ID / 'blkio.throttle.io_service_bytes_recursive'),
+           "8:0 Read 4096\n8:0 Write 8192\n8:0 Total 12288\nTotal 12288\n")
+    return root
+
+
+def test_reads_cgroup_v2(cgroup_v2, proc_root):
+    reader = CgroupStatsReader(str(cgroup_v2), proc_root)
+    assert reader.version == 2
+    stats = reader.read(CONTAINER_ID, PID)
+    assert stats['cpu_stats']['cpu_usage'] == {"total_usage": 2_000_000_000}
+    assert stats['precpu_stats'] == stats['cpu_stats']
+    assert stats['memory_stats']['usage'] == 104857600
+    assert stats['memory_stats']['limit'] == reader.host_memory  # "max" means unlimited
+    assert stats['memory_stats']['stats']['inactive_file'] == 1048576
+    assert stats['blkio_stats']['io_service_bytes_recursive'] == [
+        {"major": 8, "minor": 0, "op": "read", "value": 4096},
+        {"major": 8, "minor": 0, "op": "write", "value": 8192},
+    ]
+    assert stats['networks']['eth0']['rx_bytes'] == 1500 and 'lo' not in stats['networks']
+
+    # The next read diffs against this one
+    _write(str(cgroup_v2 / 'system.slice' / f'docker-{CONTAINER_ID}.scope' / 'cpu.stat'), "usage_usec 2500000\n")
+    again = reader.read(CONTAINER_ID, PID)
+    assert again['precpu_stats']['cpu_usage']['total_usage'] == 2_000_000_000
+    assert again['cpu_stats']['cpu_usage']['total_usage'] == 2_500_000_000
+
+
+def test_reads_cgroup_v1(cgroup_v1, proc_root):
+    reader = CgroupStatsReader(str(cgroup_v1), proc_root)
+    assert reader.version == 1
+    stats = reader.read(CONTAINER_ID, PID)
+    assert stats['cpu_stats']['cpu_usage'] == {"total_usage": 3_000_000_000,
+                                               "percpu_usage": [1_000_000_000, 2_000_000_000]}
+    assert stats['memory_stats']['usage'] == 73400320
+    assert stats['memory_stats']['limit'] == min(268435456, reader.host_memory)
+    assert [e['op'] for e in stats['blkio_stats']['io_service_bytes_recursive']] == ['Read', 'Write']
+
+
+def test_missing_cgroup_or_pid_is_unavailable(cgroup_v2, proc_root):
+    reader = CgroupStatsReader(str(cgroup_v2), proc_root)
+    with pytest.raises(CgroupUnavailable):
+        reader.read('b' * 64, PID)
+    with pytest.raises(CgroupUnavailable):
+        reader.read(CONTAINER_ID, None)
+
+
+def test_system_cpu_usage_excludes_guest_time(cgroup_v2, proc_root, monkeypatch):
+    times = namedtuple('scputimes', 'user nice system idle iowait irq softirq steal guest guest_nice')
+    monkeypatch.setattr(cgroup_stats.psutil, 'cpu_times', lambda: times(10, 1, 5, 100, 2, 0, 0, 0, 4, 1))
+    reader = CgroupStatsReader(str(cgroup_v2), proc_root)
+    assert reader.read(CONTAINER_ID, PID)['cpu_stats']['system_cpu_usage'] == 118 * cgroup_stats.NANOSECONDS
+
+
+def test_parse_net_dev():
+    assert parse_net_dev(NET_DEV) == {"eth0": {
+        "rx_bytes": 1500, "rx_packets": 10, "rx_errors": 1, "rx_dropped": 2,
+        "tx_bytes": 2500, "tx_packets": 20, "tx_errors": 3, "tx_dropped": 4
+    }}
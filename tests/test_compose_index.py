@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from compose_index import ComposeIndex, parse_compose
+
+
+COMPOSE = b"""
+name: My-Stack
+services:
+  web:
+    image: nginx:1.25
+    ports:
+      - "8080:80"
+      - "127.0.0.1:8443:443/tcp"
+      - target: 53
+        published: 5353
+        protocol: udp
+    labels:
+      - dockerwakeup.route=/web
+    depends_on: [db]
+  db:
+    build: ./db
+    labels:
+      tier: data
+  worker:
+"""
+
+
+def test_parse_compose():
+    project = parse_compose(COMPOSE, '/srv/stack')
+    assert project['project_name'] == 'my-stack'
+    web = project['services']['web']
+    assert web['ports'] == [
+        {"host_port": "8080", "container_port": "80", "protocol": "tcp"},
+        {"host_port": "8443", "container_port": "443", "protocol": "tcp"},
+        {"host_port": "5353", "container_port": "53", "protocol": "udp"},
+    ]
+    assert web['labels'] == {"dockerwakeup.route": "/web"}
+    assert web['depends_on'] == ['db']
+    assert project['services']['db']['build'] is True
+    assert project['services']['db']['labels'] == {"tier": "data"}
+    assert project['services']['worker']['image'] is None
+
+
+def test_parse_compose_defaults_project_name_to_directory():
+    assert parse_compose(b"services: {}", '/srv/Media Server')['project_name'] == 'mediaserver'
+    assert parse_compose(b"", '/srv/empty') == {"project_name": "empty", "services": {}}
+
+
+@pytest.mark.parametrize("raw", [b"- a\n- b\n", b"just a string", b"services: [web, db]", b"services:\n  web: nginx\n"])
+def test_parse_compose_rejects_non_mappings(raw):
+    with pytest.raises(ValueError):
+        parse_compose(raw, '/srv/bad')
+
+
+def test_index_lists_unparseable_files_without_services(tmp_path):
+    files = {'good': COMPOSE, 'list': b"- not\n- a\n- mapping\n",
+             'tagged': b"services:\n  web:\n    ports: !reset []\n"}
+    paths = []
+    for name, raw in files.items():
+        path = tmp_path / name / 'compose.yml'
+        path.parent.mkdir()
+        path.write_bytes(raw)
+        paths.append(str(path))
+
+    index = ComposeIndex()
+    projects = index.refresh(paths)
+    assert [(p['project_name'], p['path'], p.get('parse_error') is not None) for p in projects] == [
+        ('my-stack', paths[0], False), ('list', paths[1], True), ('tagged', paths[2], True)]
+    assert projects[1]['services'] == {} and projects[1]['directory'] == str(tmp_path / 'list')
+    assert '!reset' in projects[2]['parse_error']
+
+    # The service-level join only covers the files it could read
+    containers = [{"name": "tagged-web-1", "status": "running", "image": "nginx",
+                   "labels": {"com.docker.compose.project": "tagged", "com.docker.compose.service": "web"}}]
+    joined = index.join(projects, containers)
+    assert [p['project_name'] for p in joined['projects']] == ['my-stack']
+    assert [p['project_name'] for p in joined['orphaned_projects']] == ['tagged']
+
+
+def test_refresh_keeps_entries_of_other_callers(tmp_path):
+    first, second = tmp_path / 'a' / 'compose.yml', tmp_path / 'b' / 'compose.yml'
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_bytes(b"services: {app: {image: busybox}}")
+    index = ComposeIndex()
+    index.refresh([str(first)])
+    index.refresh([str(second)])
+    assert set(index._entries) == {str(first), str(second)}
+
+    os.remove(first)
+    index.refresh([str(second)])
+    assert set(index._entries) == {str(second)}
+
+
+def test_concurrent_refreshes(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"p{i}" / 'compose.yml'
+        path.parent.mkdir()
+        path.write_bytes(f"services: {{s{i}: {{image: busybox}}}}".encode())
+        paths.append(str(path))
+    index = ComposeIndex()
+    results = []
+    threads = [threading.Thread(target=lambda p=p: results.append(index.refresh(p))) for p in (paths[:10], paths[10:]) * 5]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(len(r) == 10 for r in results)
+    assert len(index._entries) == 20
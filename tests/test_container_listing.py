@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+import pytest
+
+from stats_frame import StatsPipeline
+
+
+def get(server, url, **params):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+            return await client.get(url, params=params)
+
+    return asyncio.run(main())
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [c['name'] for c in response.json()['containers']]
+
+
+def test_no_paging_returns_every_container(server, fake_docker):
+    response = get(server, "/api/containers", fields='name', sort='created', order='asc')
+    body = response.json()
+    assert names(response) == [f"bench-{i}" for i in range(20)]
+    assert (body['total'], body['count'], body['page'], body['pages']) == (20, 20, 1, 1)
+
+
+def test_pages_through_total(server, fake_docker):
+    seen = []
+    for page in range(1, 5):
+        response = get(server, "/api/containers", fields='name', sort='created', order='asc', page=page, per_page=6)
+        body = response.json()
+        assert (body['total'], body['per_page'], body['pages'], body['page']) == (20, 6, 4, page)
+        seen += names(response)
+    assert seen == [f"bench-{i}" for i in range(20)]
+
+
+def test_page_alone_uses_the_per_page_setting(server, fake_docker):
+    server.db.settings.docs.append({"containers_per_page": 8, "show_stopped_containers": True})
+    body = get(server, "/api/containers", fields='name', page=3).json()
+    assert (body['per_page'], body['pages'], body['count']) == (8, 3, 4)
+
+
+def test_show_stopped_setting(server, fake_docker):
+    server.db.settings.docs.append({"show_stopped_containers": False})
+    assert len(names(get(server, "/api/containers", fields='name'))) == 16
+
+
+@pytest.mark.parametrize("params,expected", [
+    ({"status": "exited"}, [4, 9, 14, 19]),
+    ({"compose_project": "stack-2"}, [2, 9, 16]),
+    ({"label": "com.docker.compose.project=stack-3"}, [3, 10, 17]),
+    ({"name": "bench-1"}, [1] + list(range(10, 20))),
+    ({"status": "running", "compose_project": "stack-4"}, [11, 18]),
+])
+def test_filters(server, fake_docker, params, expected):
+    response = get(server, "/api/containers", fields='name', sort='created', order='asc', **params)
+    assert names(response) == [f"bench-{i}" for i in expected]
+
+
+def test_sort_by_name_and_created(server, fake_docker):
+    by_name = names(get(server, "/api/containers", fields='name', per_page=3))
+    assert by_name == ['bench-0', 'bench-1', 'bench-10']
+    # created defaults to newest first
+    assert names(get(server, "/api/containers", fields='name', sort='created', per_page=2)) == ['bench-19', 'bench-18']
+
+
+def test_sort_by_latest_cpu_and_memory(server, fake_docker, monkeypatch):
+    pipeline = StatsPipeline()
+    monkeypatch.setattr(server, 'stats_pipeline', pipeline)
+    # cpu_percent = index % 7 (ties broken by listing order), memory grows with the index
+    ids = [f"{i:064x}" for i in range(20)]
+    raw = [(i % 7, 0, 100, 0, 1, (i + 1) * 1024 * 1024, 1024 ** 3, 0, 0, 0, 0) for i in range(20)]
+    pipeline.compute(ids, [f"bench-{i}" for i in range(20)], raw)
+
+    by_cpu = names(get(server, "/api/containers", fields='name', sort='cpu', per_page=4))
+    assert [int(n.split('-')[1]) % 7 for n in by_cpu] == [6, 6, 5, 5]
+    assert names(get(server, "/api/containers", fields='name', sort='memory', per_page=3)) == ['bench-19', 'bench-18', 'bench-17']
+    assert names(get(server, "/api/containers", fields='name', sort='memory', order='asc', per_page=2)) == ['bench-0', 'bench-1']
+
+
+def test_rejects_unknown_sort_and_order(server, fake_docker):
+    assert get(server, "/api/containers", sort='size').status_code == 400
+    assert get(server, "/api/containers", order='up').status_code == 400
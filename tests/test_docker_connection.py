@@ -0,0 +1,68 @@
+import asyncio
+
+from docker_connection import DockerConnector
+
+
+class FakeClient:
+    def __init__(self):
+        self.up = True
+
+    def ping(self):
+        if not self.up:
+            raise ConnectionError("daemon down")
+
+
+def test_failed_on_connect_runs_again_until_it_succeeds():
+    client = FakeClient()
+    calls = []
+
+    async def on_connect(c):
+        calls.append(c)
+        if len(calls) < 3:
+            raise RuntimeError("resync failed")
+
+    async def on_disconnect():
+        calls.append('disconnect')
+
+    async def main():
+        connector = DockerConnector(lambda: client, on_connect, on_disconnect)
+        assert await connector.check()
+        assert connector.available and connector.status()['resync_pending']
+        assert await connector.check()
+        assert await connector.check()
+        assert not connector.status()['resync_pending']
+        assert await connector.check()
+        assert calls == [client, client, client]
+        assert connector.stats['connects'] == 1
+
+        # A later outage and reconnect runs it again
+        client.up = False
+        assert not await connector.check()
+        client.up = True
+        assert await connector.check()
+        assert calls[3:] == ['disconnect', client]
+        assert connector.stats['connects'] == 2
+
+    asyncio.run(main())
+
+
+def test_unreachable_daemon_is_retried():
+    attempts = []
+
+    def create_client():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise ConnectionError("no socket")
+        return FakeClient()
+
+    async def noop(*args):
+        pass
+
+    async def main():
+        connector = DockerConnector(create_client, noop, noop)
+        assert not await connector.check()
+        assert connector.status()['last_error'] == 'no socket'
+        assert await connector.check()
+        assert connector.available and connector.last_error is None
+
+    asyncio.run(main())
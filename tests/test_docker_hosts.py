@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+from docker_hosts import DockerHostRegistry
+
+
+class FakeClient:
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.release = threading.Event()
+
+    def info(self):
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return {"Name": self.name}
+
+    def close(self):
+        self.release.set()
+
+
+def test_unreachable_host_only_costs_its_timeout():
+    registry = DockerHostRegistry(timeout=0.2)
+    registry.add('local', None, client=FakeClient('local'))
+    registry.add('nas', 'tcp://10.255.255.1:2375', client=FakeClient('nas', delay=5))
+    registry.add('broken', 'tcp://10.0.0.9:2375', client=FakeClient('broken', error=ConnectionError("refused")))
+    try:
+        started = time.monotonic()
+        outcome = asyncio.run(registry.fan_out(lambda client: client.info(), hosts=['local', 'nas', 'broken', 'gone']))
+        elapsed = time.monotonic() - started
+    finally:
+        registry.close()
+
+    assert elapsed < 2
+    assert outcome['results'] == {'local': {"Name": "local"}}
+    assert outcome['errors'] == {'nas': 'timed out after 0.2s', 'broken': 'refused', 'gone': 'unknown host'}
+    assert set(outcome['timings_ms']) == {'local', 'nas', 'broken'}
+    assert registry.get('nas').last_error == 'timed out after 0.2s'
+    assert registry.get('local').last_ok is not None
+
+
+def test_parse_env():
+    assert DockerHostRegistry.parse_env('nas=ssh://admin@nas, media=tcp://10.0.0.5:2375,bad,=x') == {
+        'nas': 'ssh://admin@nas', 'media': 'tcp://10.0.0.5:2375'
+    }
+
+
+def test_unreachable_host_holds_at_most_one_worker():
+    registry = DockerHostRegistry(timeout=0.05, max_workers=4)
+    nas = FakeClient('nas', delay=5)
+    registry.add('local', None, client=FakeClient('local'))
+    registry.add('nas', 'tcp://10.255.255.1:2375', client=nas)
+
+    async def main():
+        outcomes = []
+        for _ in range(10):
+            outcomes.append(await registry.fan_out(lambda client: client.info()))
+        return outcomes
+
+    try:
+        outcomes = asyncio.run(main())
+        # Every round still reached the healthy host; the stuck one never took a second worker
+        assert all(o['results'] == {'local': {"Name": "local"}} for o in outcomes)
+        assert outcomes[0]['errors']['nas'].startswith('timed out')
+        assert all('still pending' in o['errors']['nas'] for o in outcomes[1:])
+        assert registry.get('nas').stuck == 1
+    finally:
+        registry.close()
+    nas.release.set()
+
+
+
+def test_clients_the_registry_creates_go_through_on_client(monkeypatch):
+    import docker_hosts
+    monkeypatch.setattr(docker_hosts.docker, 'DockerClient', lambda base_url, **kwargs: FakeClient(base_url))
+    seen = []
+    registry = DockerHostRegistry(on_client=seen.append)
+    local = FakeClient('local')
+    registry.add('local', None, client=local)  # passed in already set up
+    registry.add('nas', 'tcp://10.0.0.5:2375')
+    try:
+        outcome = asyncio.run(registry.fan_out(lambda client: client.info()))
+        # A host re-added through /api/hosts gets a new client, set up the same way
+        registry.add('nas', 'ssh://admin@nas')
+        asyncio.run(registry.fan_out(lambda client: client.info(), hosts=['nas']))
+    finally:
+        registry.close()
+    assert outcome['results'] == {'local': {"Name": "local"}, 'nas': {"Name": "tcp://10.0.0.5:2375"}}
+    assert [client.name for client in seen] == ['tcp://10.0.0.5:2375', 'ssh://admin@nas']
@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+import pytest
+
+from host_metrics import HostMetricsSampler, _busy_percent
+
+
+CpuTimes = namedtuple('CpuTimes', 'user nice system idle iowait guest guest_nice')
+NetIO = namedtuple('NetIO', 'bytes_sent bytes_recv')
+DiskIO = namedtuple('DiskIO', 'read_bytes write_bytes')
+
+
+def counters(t, busy, idle, sent, recv, read, write):
+    cpu = CpuTimes(busy, 0, 0, idle, 0, 0, 0)
+    return {"time": t, "cpu": cpu, "per_cpu": [cpu, cpu], "net": NetIO(sent, recv), "disk": DiskIO(read, write)}
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    sampler = HostMetricsSampler()
+    readings = []
+    monkeypatch.setattr(sampler, '_counters', lambda: readings.pop(0))
+    return sampler, readings
+
+
+def test_rates_from_consecutive_samples(sampler):
+    sampler, readings = sampler
+    readings += [counters(100.0, 10, 90, 1000, 5000, 0, 0), counters(102.0, 40, 110, 3000, 9000, 4096, 8192)]
+    first = sampler.sample()
+    assert first['net_rx_bytes_per_sec'] == 0.0 and first['sample_interval'] == 0.0
+
+    second = sampler.sample()
+    assert second['cpu_percent'] == 60.0  # 30 busy of 50 elapsed
+    assert second['cpu_per_core'] == [60.0, 60.0]
+    assert second['net_tx_bytes_per_sec'] == 1000.0
+    assert second['net_rx_bytes_per_sec'] == 2000.0
+    assert second['disk_read_bytes_per_sec'] == 2048.0
+    assert second['disk_write_bytes_per_sec'] == 4096.0
+    assert second['sample_interval'] == 2.0
+
+
+def test_counter_reset_reports_zero_not_negative(sampler):
+    sampler, readings = sampler
+    readings += [counters(0.0, 0, 0, 10_000, 10_000, 10_000, 10_000), counters(1.0, 1, 1, 50, 60, 70, 80)]
+    sampler.sample()
+    after_reset = sampler.sample()
+    assert after_reset['net_tx_bytes_per_sec'] == 0.0
+    assert after_reset['disk_write_bytes_per_sec'] == 0.0
+
+
+def test_guest_time_is_not_counted_twice():
+    before = CpuTimes(0, 0, 0, 0, 0, 0, 0)
+    # 50 of user time was spent running a guest; it's already inside user
+    after = CpuTimes(60, 0, 0, 40, 0, 50, 0)
+    assert _busy_percent(before, after) == 60.0
+
+
+def test_latest_is_the_background_sample_as_a_copy(sampler):
+    sampler, readings = sampler
+    readings += [counters(0.0, 0, 10, 0, 0, 0, 0)]
+    latest = sampler.latest()
+    latest['_id'] = 'added by mongo'
+    assert '_id' not in sampler.latest()
+    assert sampler.samples == 1  # the second call didn't sample again
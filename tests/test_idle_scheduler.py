@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+from idle_scheduler import IdleScheduler
+
+
+ROUTED = {'dockerwakeup.route': '/app'}
+
+
+def test_touch_from_worker_thread_runs_on_loop():
+    async def main():
+        scheduler = IdleScheduler(lambda: None, default_timeout=60)
+        scheduler.start()
+        try:
+            scheduler.track('app', ROUTED, last_access=time.time() - 30)
+            seen = []
+            original = scheduler._touch
+            scheduler._touch = lambda name: (seen.append(threading.get_ident()), original(name))
+            await asyncio.to_thread(scheduler.touch, 'app')
+            await asyncio.sleep(0)
+            assert seen == [threading.get_ident()]
+            assert time.time() - scheduler.last_access['app'] < 5
+        finally:
+            await scheduler.stop()
+    asyncio.run(main())
+
+
+def test_failed_sleep_keeps_container_tracked():
+    async def main():
+        scheduler = IdleScheduler(lambda: None, default_timeout=60)
+        attempts = []
+
+        def fail(name):
+            attempts.append(name)
+            raise RuntimeError("daemon went away")
+
+        scheduler.put_to_sleep = fail
+        scheduler.track('app', ROUTED, last_access=time.time() - 120)
+        scheduler.start()
+        try:
+            for _ in range(50):
+                if attempts:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+        finally:
+            await scheduler.stop()
+        assert attempts == ['app']
+        assert 'app' in scheduler._timeouts
+        # Retried after another idle period rather than in a tight loop
+        assert scheduler._deadlines['app'] > time.time() + 50
+    asyncio.run(main())
+
+
+def test_loop_survives_stale_heap_entries():
+    async def main():
+        scheduler = IdleScheduler(lambda: None, default_timeout=60)
+        slept = []
+        scheduler.put_to_sleep = lambda name: slept.append(name) or 'stop'
+        scheduler.track('app', ROUTED, last_access=time.time() - 120)
+        scheduler.untrack('app')
+        scheduler.track('db', ROUTED, last_access=time.time() - 120)
+        scheduler.start()
+        try:
+            for _ in range(50):
+                if slept:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await scheduler.stop()
+        assert slept == ['db']
+    asyncio.run(main())
+
+
+def test_network_counters_only_for_tracked_containers():
+    scheduler = IdleScheduler(lambda: None, default_timeout=60, network_threshold=100)
+    scheduler.track('app', ROUTED, last_access=time.time() - 30)
+    for total in (1000, 1050, 1200):
+        scheduler.observe_network('app', total)
+        scheduler.observe_network('unmanaged', total)
+    assert scheduler._network_bytes == {'app': 1200}
+    assert time.time() - scheduler.last_access['app'] < 5  # the 150-byte step counted as traffic
+
+    scheduler.handle_event({'Type': 'container', 'Action': 'destroy', 'Actor': {'Attributes': {'name': 'app'}}})
+    assert scheduler._network_bytes == {}
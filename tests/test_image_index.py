@@ -0,0 +1,172 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import docker
+import pytest
+
+from image_index import ImageIndex, chain_keys, layer_sizes
+
+
+def test_chain_keys_identify_a_layer_with_everything_below_it():
+    a = chain_keys(['sha256:base', 'sha256:app'])
+    b = chain_keys(['sha256:base', 'sha256:other', 'sha256:app'])
+    assert a[0] == b[0] == 'sha256:base'
+    # The same top layer on a different stack is a different chain
+    assert a[1] != b[2]
+
+
+def test_layer_sizes_from_history():
+    history = [{"Size": 300}, {"Size": 0}, {"Size": 200}, {"Size": 0}, {"Size": 100}]  # newest first
+    assert layer_sizes(history, 3) == [100, 200, 300]
+    # Metadata-only entries fill in for zero-byte layers only as far as the layer count needs them
+    assert layer_sizes(history, 4) == [100, 0, 200, 300]
+    assert layer_sizes([], 2) == [0, 0]
+
+
+def brute_force(index):
+    """Unique bytes per image and prune-reclaimable bytes, recomputed from scratch"""
+    holders = {}
+    for image_id, image in index.images.items():
+        for chain, size in zip(image['layers'], image['layer_sizes']):
+            holders.setdefault(chain, (size, set()))[1].add(image_id)
+    unique = {i: sum(size for size, images in holders.values() if images == {i}) for i in index.images}
+    reclaimable = sum(size for size, images in holders.values() if not any(index.usage.get(i) for i in images))
+    return unique, reclaimable
+
+
+def test_incremental_accounting_matches_a_full_recount():
+    rng = random.Random(43)
+    index = ImageIndex(lambda: None, SimpleNamespace(connected=True, generation=1))
+    bases = [[f"sha256:l{i}-{j}" for j in range(rng.randint(1, 4))] for i in range(4)]
+    for step in range(400):
+        op = rng.random()
+        with index._lock:
+            if op < 0.35:
+                diff_ids = rng.choice(bases) + [f"sha256:top{rng.randrange(6)}"] * rng.randint(0, 1)
+                image_id = f"img{rng.randrange(12)}"
+                index._add_image({"id": image_id, "tags": [], "size": 0, "created": "",
+                                  "layers": chain_keys(diff_ids), "layer_sizes": [100 + len(d) for d in diff_ids]})
+            elif op < 0.5 and index.images:
+                index._remove_image(rng.choice(list(index.images)))
+            elif op < 0.8:
+                index._add_container({"id": f"c{rng.randrange(15)}", "name": "c", "image": f"img{rng.randrange(12)}"})
+            else:
+                index._remove_container(f"c{rng.randrange(15)}")
+        unique, reclaimable = brute_force(index)
+        assert index.unique == unique, step
+        assert index.reclaimable == reclaimable, step
+
+
+class FakeApi:
+    def __init__(self):
+        self.images_by_id = {}
+        self.containers_by_id = {}
+        self.removed = []
+
+    def add_image(self, image_id, diff_ids, sizes, tags=()):
+        self.images_by_id[image_id] = {
+            "Id": image_id, "RepoTags": list(tags), "Size": sum(sizes), "Created": "2024-01-01",
+            "RootFS": {"Layers": diff_ids}, "history": [{"Size": s} for s in reversed(sizes)]
+        }
+
+    def images(self):
+        return [{"Id": i} for i in self.images_by_id]
+
+    def inspect_image(self, ref):
+        if ref not in self.images_by_id:
+            raise docker.errors.NotFound(ref)
+        return self.images_by_id[ref]
+
+    def history(self, image_id):
+        return self.images_by_id[image_id]['history']
+
+    def containers(self, all=False):
+        return [{"Id": c, "Names": [f"/{name}"], "ImageID": image} for c, (name, image) in self.containers_by_id.items()]
+
+    def remove_image(self, ref):
+        """Like the daemon without force: untags, and deletes an image once nothing refers to it"""
+        image = next((i for i in self.images_by_id.values() if ref in (i['Id'], *i['RepoTags'])), None)
+        if image is None:
+            raise docker.errors.NotFound(ref)
+        users = [c for c, (_, image_id) in self.containers_by_id.items() if image_id == image['Id']]
+        children = [i for i in self.images_by_id.values() if i.get('Parent') == image['Id']]
+        if ref != image['Id'] and (len(image['RepoTags']) > 1 or children):
+            image['RepoTags'].remove(ref)
+            return [{"Untagged": ref}]
+        if users or children or len(image['RepoTags']) > 1:
+            raise docker.errors.APIError("409 Conflict", explanation=f"conflict: unable to delete {ref}")
+        del self.images_by_id[image['Id']]
+        self.removed.append(image['Id'])
+        return [{"Deleted": image['Id']}]
+
+    def inspect_container(self, container_id):
+        if container_id not in self.containers_by_id:
+            raise docker.errors.NotFound(container_id)
+        name, image = self.containers_by_id[container_id]
+        return {"Id": container_id, "Name": f"/{name}", "Image": image}
+
+
+@pytest.fixture
+def index():
+    api = FakeApi()
+    api.add_image('base', ['sha256:os'], [1000], tags=['base:1'])
+    api.add_image('app', ['sha256:os', 'sha256:app'], [1000, 300], tags=['app:1'])
+    api.containers_by_id['c1'] = ('web', 'app')
+    client = SimpleNamespace(api=api)
+    return ImageIndex(lambda: client, SimpleNamespace(connected=True, generation=1)), api
+
+
+def test_build_and_events(index):
+    index, api = index
+
+    async def main():
+        assert await index.ensure_current()
+        app = index.describe('app')
+        assert (app['unique_size'], app['shared_size'], app['containers']) == (300, 1000, ['web'])
+        assert index.prune_estimate()['count'] == 1  # base is unused, but its only layer is shared with app
+
+        api.add_image('tool', ['sha256:tool'], [500], tags=['tool:1'])
+        index.handle_event({'Type': 'image', 'Action': 'pull', 'Actor': {'ID': 'tool'}})
+        index.handle_event({'Type': 'container', 'Action': 'destroy', 'Actor': {'ID': 'c1'}})
+        await asyncio.sleep(0.05)
+        return index.prune_estimate()
+
+    estimate = asyncio.run(main())
+    assert sorted(i['id'] for i in estimate['images']) == ['app', 'base', 'tool']
+    assert estimate['space_reclaimable_mb'] == round(1800 / 1024 / 1024, 2)
+    assert index.describe('tool')['reclaimable_size'] == 500
+    assert index.stats['rebuilds'] == 1 and index.stats['refreshes'] == 1
+
+
+def test_not_trusted_while_events_are_disconnected(index):
+    index, _ = index
+    index.events.connected = False
+    assert asyncio.run(index.ensure_current()) is False
+    assert index.status()['ready'] is False
+
+
+def test_prune_removes_exactly_what_the_index_reports(index):
+    index, api = index
+    api.add_image('tool', ['sha256:tool'], [500], tags=['tool:1', 'tool:latest'])
+    api.add_image('plugin', ['sha256:tool', 'sha256:plugin'], [500, 50])
+    api.images_by_id['plugin']['Parent'] = 'tool'
+    api.add_image('cache', ['sha256:cache'], [700], tags=['cache:1'])
+    client = SimpleNamespace(api=api)
+
+    async def main():
+        await index.ensure_current()
+        # Events the index missed: a new image it doesn't know, and a container for one it thinks unused
+        api.add_image('fresh', ['sha256:fresh'], [900])
+        api.containers_by_id['c2'] = ('worker', 'cache')
+        estimate = index.prune_estimate()
+        return estimate, await asyncio.to_thread(index.remove_unused, client, [i['id'] for i in estimate['images']])
+
+    estimate, result = asyncio.run(main())
+    assert sorted(i['id'] for i in estimate['images']) == ['base', 'cache', 'plugin', 'tool']
+    # plugin had to go before the tool image it was built on; the daemon refused cache
+    assert sorted(result['removed']) == ['base', 'plugin', 'tool']
+    assert api.removed.index('plugin') < api.removed.index('tool')
+    assert list(result['failed']) == ['cache'] and 'conflict' in result['failed']['cache']
+    assert sorted(api.images_by_id) == ['app', 'cache', 'fresh']
+    assert result['space_reclaimed_mb'] == round(550 / 1024 / 1024, 2)
@@ -0,0 +1,20 @@
+import pytest
+
+from instrumentation import docker_call_name
+
+
+@pytest.mark.parametrize("method,url,name", [
+    ('GET', 'http+docker://localhost/v1.43/containers/json?all=1&filters=%7B%7D', 'GET /containers/json'),
+    ('POST', 'http+docker://localhost/v1.43/containers/create?name=web', 'POST /containers/create'),
+    ('GET', 'http+docker://localhost/v1.43/containers/3f2a9c/stats?stream=0', 'GET /containers/{id}/stats'),
+    ('GET', 'http+docker://localhost/v1.43/containers/3f2a9c/json', 'GET /containers/{id}/json'),
+    ('DELETE', 'http+docker://localhost/v1.43/containers/3f2a9c?force=True', 'DELETE /containers/{id}'),
+    ('GET', 'http+docker://localhost/v1.43/images/ghcr.io/org/app:1.0/json', 'GET /images/{id}/json'),
+    ('GET', 'http+docker://localhost/v1.43/system/df', 'GET /system/df'),
+    ('GET', 'http+docker://localhost/v1.43/info', 'GET /info'),
+    ('GET', 'http+docker://localhost/_ping', 'GET /_ping'),
+    ('GET', 'http://10.0.0.5:2375/v1.41/networks/abc', 'GET /networks/{id}'),
+    ('GET', 'ssh://admin@nas/v1.41/version', 'GET /version'),
+])
+def test_docker_call_name(method, url, name):
+    assert docker_call_name(method, url) == name
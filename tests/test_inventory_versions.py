@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+from inventory_versions import InventoryVersions
+
+
+@pytest.fixture
+def versions():
+    return InventoryVersions(SimpleNamespace(connected=True, generation=1))
+
+
+@pytest.mark.parametrize("kind,action,changed", [
+    ('container', 'start', {'container'}),
+    ('container', 'rename', {'container', 'network'}),
+    ('network', 'connect', {'network', 'container'}),
+    ('network', 'disconnect', {'network', 'container'}),
+    ('network', 'create', {'network'}),
+    ('image', 'tag', {'image', 'container'}),
+    ('image', 'untag', {'image', 'container'}),
+    ('image', 'pull', {'image'}),
+    ('volume', 'create', {'volume'}),
+    ('plugin', 'enable', set()),
+])
+def test_events_invalidate_dependent_listings(versions, kind, action, changed):
+    before = {k: versions.etag(k) for k in versions.versions}
+    versions.handle_event({'Type': kind, 'Action': action})
+    assert {k for k in versions.versions if versions.etag(k) != before[k]} == changed
+
+
+def test_no_etag_while_events_disconnected(versions):
+    versions.events.connected = False
+    assert versions.etag('container', 1) is None
+
+
+def test_matches(versions):
+    etag = versions.etag('image', 'local')
+    assert InventoryVersions.matches(etag, etag)
+    assert InventoryVersions.matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert InventoryVersions.matches('*', etag)
+    assert not InventoryVersions.matches('"other"', etag)
+    assert not InventoryVersions.matches(None, etag)
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+from prometheus_client.openmetrics.parser import text_string_to_metric_families
+
+from metrics_exporter import CONTAINER_STATES, OpenMetricsWriter, write_container_metrics
+
+
+def parse(text):
+    """Every family, via the reference parser, which rejects anything outside the OpenMetrics grammar"""
+    return {family.name: family for family in text_string_to_metric_families(text)}
+
+
+CONTAINERS = [
+    {"id": "abc", "name": "web", "host": "local", "image": "nginx:1", "compose_project": "shop", "state": "running",
+     "stats": {"cpu_percent": 12.5, "memory_mb": 64.0, "memory_limit_mb": 512.0, "net_rx_bytes_per_sec": 1024.0,
+               "net_tx_bytes_per_sec": 0.0, "block_read_bytes_per_sec": 0.0, "block_write_bytes_per_sec": 4096.0}},
+    {"id": "def", "name": 'odd "name"\\with\nbreaks', "host": "local", "image": "redis", "compose_project": "",
+     "state": "exited", "stats": None},
+]
+
+
+def test_container_metrics_parse():
+    writer = OpenMetricsWriter()
+    write_container_metrics(writer, CONTAINERS)
+    writer.gauge('weird', "NaN and infinities").add(float('nan'), kind='nan').add(float('inf'), kind='inf')
+    families = parse(writer.render())
+
+    info = families['dockerdash_container']
+    assert info.type == 'info'
+    assert [s.labels for s in info.samples][0] == {
+        "name": "web", "host": "local", "id": "abc", "image": "nginx:1", "compose_project": "shop"}
+    # Escaped label values come back as they went in
+    assert info.samples[1].labels['name'] == CONTAINERS[1]['name']
+
+    state = families['dockerdash_container_state']
+    assert state.type == 'stateset'
+    running = {s.labels['dockerdash_container_state']: s.value for s in state.samples if s.labels['name'] == 'web'}
+    assert running == {value: int(value == 'running') for value in CONTAINER_STATES}
+
+    memory = families['dockerdash_container_memory_usage_bytes']
+    assert memory.unit == 'bytes'
+    # Stopped containers have no usage samples
+    assert [(s.labels['name'], s.value) for s in memory.samples] == [("web", 64 * 1024 * 1024)]
+    assert {s.labels['kind'] for s in families['dockerdash_weird'].samples} == {'nan', 'inf'}
+
+
+def test_metrics_endpoint_is_valid_openmetrics(server, monkeypatch):
+    monkeypatch.setattr(server.container_snapshot, 'containers', CONTAINERS)
+    server.activity_writer.stats['written'] += 2
+
+    async def scrape():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/metrics")
+
+    response = asyncio.run(scrape())
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/openmetrics-text; version=1.0.0')
+    assert response.text.endswith('# EOF\n')
+    families = parse(response.text)
+
+    assert families['dockerdash_host_cpu_percent'].type == 'gauge'
+    written = families['dockerdash_activity_log_written']
+    assert written.type == 'counter' and written.samples[0].name == 'dockerdash_activity_log_written_total'
+    assert written.samples[0].value >= 2
+    assert {s.labels['source'] for s in families['dockerdash_stats_reads'].samples} == {'cgroup', 'docker'}
+    assert len(families['dockerdash_container'].samples) == 2
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import docker
+import pytest
+
+from network_topology import NetworkTopology, container_record
+
+
+def endpoint(network_id, ip):
+    return {"NetworkID": network_id, "IPAddress": ip, "MacAddress": "", "Aliases": None}
+
+
+class FakeApi:
+    def __init__(self):
+        self.networks_by_id = {
+            "n1": {"Id": "n1", "Name": "frontend", "Driver": "bridge",
+                   "IPAM": {"Config": [{"Subnet": "172.20.0.0/16", "Gateway": "172.20.0.1"}]}},
+            "n2": {"Id": "n2", "Name": "backend", "Driver": "bridge", "Internal": True},
+        }
+        self.containers_by_id = {}
+        self.inspect_gate = None  # set to a threading.Event to hold container inspects
+
+    def add_container(self, container_id, name, state, networks, ports=()):
+        self.containers_by_id[container_id] = {
+            "Id": container_id, "Name": f"/{name}", "Config": {"Image": "nginx"}, "State": {"Status": state},
+            "NetworkSettings": {"Networks": {n: endpoint(n, ip) for n, ip in networks.items()},
+                                "Ports": {f"{p}/tcp": [{"HostIp": "", "HostPort": str(h)}] for p, h in ports}}
+        }
+
+    def networks(self):
+        return list(self.networks_by_id.values())
+
+    def containers(self, all=False):
+        # The listing shape of the same containers
+        return [{
+            "Id": c['Id'], "Names": [c['Name']], "Image": c['Config']['Image'], "State": c['State']['Status'],
+            "Ports": [{"PrivatePort": int(p.split('/')[0]), "PublicPort": int(b[0]['HostPort']), "Type": "tcp"}
+                      for p, b in c['NetworkSettings']['Ports'].items()],
+            "NetworkSettings": c['NetworkSettings']
+        } for c in self.containers_by_id.values()]
+
+    def inspect_network(self, network_id):
+        if network_id not in self.networks_by_id:
+            raise docker.errors.NotFound(network_id)
+        return self.networks_by_id[network_id]
+
+    def inspect_container(self, container_id):
+        if self.inspect_gate is not None:
+            self.inspect_gate.wait(5)
+        if container_id not in self.containers_by_id:
+            raise docker.errors.NotFound(container_id)
+        return self.containers_by_id[container_id]
+
+
+@pytest.fixture
+def topology():
+    api = FakeApi()
+    api.add_container("c1", "web", "running", {"n1": "172.20.0.2", "n2": "10.0.0.2"}, ports=[(80, 8080)])
+    api.add_container("c2", "db", "exited", {"n2": None})
+    topology = NetworkTopology(lambda: SimpleNamespace(api=api), SimpleNamespace(connected=True, generation=1))
+    return topology, api
+
+
+async def settle(topology):
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if not topology._flush_scheduled and not topology._sync_lock.locked():
+            return
+
+
+def test_listing_and_inspect_give_the_same_node(topology):
+    _, api = topology
+    listed = container_record(api.containers()[0])
+    inspected = container_record(api.inspect_container("c1"))
+    assert listed == inspected
+    assert listed['ports'] == [{"host_ip": "0.0.0.0", "host_port": 8080, "container_port": 80, "protocol": "tcp"}]
+
+
+def test_graph_from_two_list_calls(topology):
+    topology, _ = topology
+    assert asyncio.run(topology.ensure_current())
+    graph = topology.graph()
+    assert graph['counts'] == {"networks": 2, "containers": 2, "edges": 3}
+    assert {(e['network'], e['container'], e['attached']) for e in graph['edges']} == {
+        ("n1", "c1", True), ("n2", "c1", True), ("n2", "c2", False)}
+    members = {n['name']: n['containers'] for n in topology.network_members()}
+    # The stopped container keeps its configured edge but isn't attached
+    assert members == {"frontend": ["web"], "backend": ["web"]}
+
+
+def test_events_patch_the_graph(topology):
+    topology, api = topology
+
+    async def main():
+        await topology.ensure_current()
+        api.add_container("c2", "db", "running", {"n2": "10.0.0.3", "n1": "172.20.0.3"})
+        topology.handle_event({"Type": "container", "Action": "start", "Actor": {"ID": "c2"}})
+        await settle(topology)
+        assert topology.containers["c2"]['networks']["n1"]['ip_address'] == "172.20.0.3"
+
+        topology.handle_event({"Type": "network", "Action": "disconnect",
+                               "Actor": {"ID": "n1", "Attributes": {"container": "c1"}}})
+        assert "n1" not in topology.containers["c1"]['networks']
+
+        api.networks_by_id["n3"] = {"Id": "n3", "Name": "extra"}
+        topology.handle_event({"Type": "network", "Action": "create", "Actor": {"ID": "n3"}})
+        topology.handle_event({"Type": "network", "Action": "destroy", "Actor": {"ID": "n2"}})
+        await settle(topology)
+
+    asyncio.run(main())
+    assert sorted(n['name'] for n in topology.network_members()) == ["extra", "frontend"]
+    assert {(e['network'], e['container']) for e in topology.graph()['edges']} == {("n1", "c2")}
+    assert topology.stats['rebuilds'] == 1
+
+
+def test_destroy_during_a_fetch_is_not_undone(topology):
+    topology, api = topology
+
+    async def main():
+        await topology.ensure_current()
+        api.inspect_gate = threading.Event()
+        topology.handle_event({"Type": "container", "Action": "die", "Actor": {"ID": "c1"}})
+        await asyncio.sleep(0.02)  # the flush is now reading c1
+        topology.handle_event({"Type": "container", "Action": "destroy", "Actor": {"ID": "c1"}})
+        api.inspect_gate.set()  # ...and the stale read comes back
+        await settle(topology)
+
+    asyncio.run(main())
+    assert "c1" not in topology.containers
+
+
+def test_not_trusted_while_events_are_disconnected(topology):
+    topology, _ = topology
+    topology.events.connected = False
+    assert asyncio.run(topology.ensure_current()) is False
+    assert topology.status()['ready'] is False
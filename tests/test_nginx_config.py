@@ -0,0 +1,143 @@
+import asyncio
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from nginx_config import NginxConfigManager, render_route, valid_route
+from tests.test_wake_proxy import _request, _with_proxy
+
+
+class FakeDocker:
+    def __init__(self, routes):
+        self.routes = routes  # container name -> (route, host port[, sleep strategy])
+        self.containers = self
+
+    def list(self, all=False, filters=None):
+        return [
+            SimpleNamespace(name=name, labels={'dockerwakeup.route': route, **strategy},
+                            attrs={'NetworkSettings': {'Ports': {'80/tcp': [{'HostPort': str(port)}]}}})
+            for name, (route, port, *rest) in self.routes.items()
+            for strategy in [{'dockerwakeup.sleep_strategy': rest[0]} if rest else {}]
+        ]
+
+
+def _manager(tmp_path, routes, reload_command=None):
+    log = tmp_path / 'reloads.log'
+    command = reload_command or f'"{sys.executable}" -c "open(r\'{log}\', \'a\').write(\'reload\\n\')"'
+    docker = FakeDocker(routes)
+    conf_dir = tmp_path / 'conf'
+    manager = NginxConfigManager(lambda: docker, str(conf_dir), '127.0.0.1:8080', reload_command=command, debounce=0)
+    return manager, docker, conf_dir, log
+
+
+def _reloads(log):
+    return log.read_text().count('reload') if log.exists() else 0
+
+
+def test_writes_configs_and_reloads_only_on_change(tmp_path):
+    manager, docker, conf_dir, log = _manager(tmp_path, {
+        'jellyfin': ('/jellyfin', 8096),
+        'wiki': ('wiki.example.com', 3000),
+    })
+    changed = asyncio.run(manager.sync())
+    assert set(changed) == {'00-dockerwakeup-map.conf', 'jellyfin.conf', os.path.join('locations', 'jellyfin.conf'),
+                            'wiki_example_com.conf'}
+    assert 'location /jellyfin/ {' in (conf_dir / 'locations' / 'jellyfin.conf').read_text()
+    assert 'server_name wiki.example.com;' in (conf_dir / 'wiki_example_com.conf').read_text()
+    assert _reloads(log) == 1
+
+    assert asyncio.run(manager.sync()) == []
+    assert _reloads(log) == 1
+
+    del docker.routes['wiki']
+    assert asyncio.run(manager.sync()) == ['wiki_example_com.conf']
+    assert not (conf_dir / 'wiki_example_com.conf').exists()
+    assert _reloads(log) == 2
+
+
+def test_skips_invalid_root_and_colliding_routes(tmp_path):
+    manager, _, conf_dir, log = _manager(tmp_path, {
+        'app1': ('/app-1', 8001),
+        'app2': ('/app_1', 8002),           # same slug as /app-1
+        'dup': ('/app-1/', 8003),           # same prefix as /app-1
+        'root': ('/', 8004),
+        'evil': ('x.com; } server { listen 81', 8005),
+        'quote': ('/a"b', 8006),
+        'site1': ('Site.example.com', 8007),
+        'site2': ('site.example.com', 8008),  # same host, different case
+    })
+    asyncio.run(manager.sync())
+
+    assert set(manager.skipped) == {'app2', 'dup', 'root', 'evil', 'quote', 'site2'}
+    assert manager.skipped['root']['reason'].startswith('root route')
+    assert manager.skipped['evil']['reason'] == 'invalid route'
+    assert 'app1' in manager.skipped['dup']['reason']
+    assert sorted(os.listdir(conf_dir / 'locations')) == ['app_1.conf']
+    upstreams = ''.join(p.read_text() for p in conf_dir.glob('*.conf'))
+    assert upstreams.count('upstream dockerwakeup_app_1 ') == 1
+    assert '127.0.0.1:8001' in upstreams and '127.0.0.1:8002' not in upstreams
+    assert manager.status()['skipped'] == manager.skipped
+    assert _reloads(log) == 1
+
+
+def test_paused_and_checkpointed_routes_only_use_the_wake_proxy(tmp_path):
+    manager, _, conf_dir, _ = _manager(tmp_path, {
+        'stopped': ('/stopped', 8001, 'stop'),
+        'paused': ('/paused', 8002, 'pause'),
+        'frozen': ('/frozen', 8003, 'checkpoint'),
+    })
+    asyncio.run(manager.sync())
+    assert 'server 127.0.0.1:8001 max_fails=1' in (conf_dir / 'stopped.conf').read_text()
+    assert 'proxy_pass http://127.0.0.1:8080;' in (conf_dir / 'locations' / 'stopped.conf').read_text()
+    for name, port in (('paused', 8002), ('frozen', 8003)):
+        upstream = (conf_dir / f'{name}.conf').read_text()
+        # A paused container still accepts connections, so nginx would never fall back to the proxy
+        assert f'127.0.0.1:{port}' not in upstream
+        assert 'server 127.0.0.1:8080;' in upstream
+
+
+def nginx_request_to_wake_proxy(location, uri):
+    """The request nginx sends the wake proxy for ``uri``, following the rendered location snippet"""
+    blocks = dict(re.findall(r'location (\S+) \{\n(.*?)\n\}', location, re.S))
+    prefix = next(name for name in blocks if not name.startswith('@'))
+    block = blocks.get(next((name for name in blocks if name.startswith('@')), prefix))
+    target = re.search(r'proxy_pass http://([^/;]+)(/?);', block).group(2)
+    # A proxy_pass with a URI replaces the matched prefix with it; without one the URI goes on unchanged
+    path = target + uri[len(prefix):] if target else uri
+    variables = {'$host': 'example.test', '$http_upgrade': '', '$connection_upgrade': 'close'}
+    headers = [(name, variables.get(value, value).strip('"'))
+               for name, value in re.findall(r'proxy_set_header (\S+) (\S+);', block)
+               if name.startswith('X-DockerWakeUp') or name in ('Host', 'Connection')]
+    return f"GET {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers) + "\r\n"
+
+
+@pytest.mark.parametrize("strategy", ['stop', 'pause'])
+def test_path_route_wakes_through_an_untrusted_proxy_peer(strategy):
+    # nginx in another network namespace reaches the proxy from the bridge gateway, not loopback
+    async def test(proxy, upstream):
+        files = render_route('/app', 'app', 8096, f"127.0.0.1:{proxy.port}", strategy=strategy)
+        location = files[os.path.join('locations', 'app.conf')]
+        response = await _request(proxy.port, nginx_request_to_wake_proxy(location, '/app/api/items?x=1').encode())
+        assert response.endswith(b'GET /api/items?x=1 HTTP/1.1|')
+    _with_proxy({'app': '/app'}, test, trusted_proxies=[])
+
+
+def test_failed_reload_is_recorded(tmp_path):
+    manager, _, _, _ = _manager(tmp_path, {'app': ('/app', 8000)},
+                                reload_command=f'"{sys.executable}" -c "import sys; sys.exit(\'nginx: test failed\')"')
+    asyncio.run(manager.sync())
+    assert manager.stats['reload_failures'] == 1
+    assert manager.last_reload['exit_code'] == 1
+    assert 'test failed' in manager.last_reload['output']
+
+
+@pytest.mark.parametrize("route,valid", [
+    ('/jellyfin', True), ('jellyfin', True), ('/app/admin/', True), ('media.example.com', True),
+    ('/', True), ('', False), ('/a b', False), ('/a;b', False), ('/a"b', False), ('/../etc', False),
+    ('x.com;evil', False), ('-bad.example.com', False), ('/a{', False),
+])
+def test_valid_route(route, valid):
+    assert valid_route(route) is valid
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from prewarm import SLOT_SECONDS, Prewarmer, week_slot
+from readiness import ReadinessTracker
+from wake_proxy import WakeProxy
+
+
+@pytest.fixture(params=['UTC', 'America/New_York', 'Europe/Berlin', 'Australia/Lord_Howe'])
+def local_tz(request, monkeypatch):
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset is not available")
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_week_slot_monday_midnight_starts_a_week(local_tz):
+    monday = datetime(2024, 3, 4).timestamp()
+    week, slot = week_slot(monday)
+    assert slot == 0
+    assert week_slot(monday - 1) == (week - 1, 7 * 24 * 3600 // SLOT_SECONDS - 1)
+    assert week_slot(monday + 20 * 60) == (week, 1)
+
+
+def test_week_slot_is_stable_across_dst(local_tz):
+    # Walk a year of local Mondays; each must be exactly one week after the previous
+    day = datetime(2024, 1, 1)
+    previous = week_slot(day.timestamp())[0]
+    for _ in range(52):
+        day += timedelta(days=7)
+        week, slot = week_slot(day.timestamp())
+        assert (week, slot) == (previous + 1, 0)
+        # Sunday evening still belongs to the week that started on that Monday
+        assert week_slot((day + timedelta(days=6, hours=23, minutes=59)).timestamp())[0] == week
+        previous = week
+
+
+class SleepingContainer:
+    def __init__(self, name):
+        self.id = name
+        self.name = name
+        self.status = 'exited'
+        self.labels = {}
+        self.attrs = {}
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+        time.sleep(0.05)
+        self.status = 'running'
+
+    def reload(self):
+        pass
+
+
+class FakeDocker:
+    def __init__(self, container, labels):
+        self.container = container
+        self.labels = labels
+        self.containers = self
+
+    def list(self, all=False, filters=None):
+        return [SimpleNamespace(name=self.container.name, labels=self.labels)]
+
+    def get(self, name):
+        return self.container
+
+
+def test_prewarm_and_request_share_one_wake_up():
+    async def main():
+        upstream = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+        port = upstream.sockets[0].getsockname()[1]
+        container = SleepingContainer('app')
+        docker = FakeDocker(container, {'dockerwakeup.route': '/app', 'dockerwakeup.docker_url': f"127.0.0.1:{port}"})
+        proxy = WakeProxy(lambda: docker, ReadinessTracker())
+        prewarmer = Prewarmer(lambda: docker, wake=proxy.wake_container)
+        await proxy.refresh_routes(force=True)
+        try:
+            # A request arrives while the pre-warm is still starting the container
+            _, (address, cold_start) = await asyncio.gather(
+                prewarmer._warm('/app', 'app'), proxy.ensure_awake(proxy.routes[0]))
+        finally:
+            upstream.close()
+            await upstream.wait_closed()
+        return container, prewarmer, address, cold_start
+
+    container, prewarmer, address, cold_start = asyncio.run(main())
+    assert container.starts == 1
+    assert 'app' in prewarmer.prewarmed and prewarmer.stats['prewarms'] == 1
+    assert cold_start and address[0] == '127.0.0.1'
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+import readiness
+from readiness import ReadinessTracker
+
+
+class FakeContainer:
+    """Container with a healthcheck whose port is open long before it turns healthy"""
+
+    def __init__(self, port, healthy_after):
+        self.id = 'abc123'
+        self.name = 'app'
+        self.labels = {}
+        self.healthy_at = time.monotonic() + healthy_after
+        self.attrs = {}
+        self.port = port
+        self.reload()
+
+    def reload(self):
+        status = 'healthy' if time.monotonic() >= self.healthy_at else 'starting'
+        self.attrs = {
+            'Config': {'Healthcheck': {'Test': ['CMD', 'true']}},
+            'State': {'Health': {'Status': status}},
+            'NetworkSettings': {'Ports': {'80/tcp': [{'HostPort': str(self.port)}]}, 'Networks': {}},
+        }
+
+
+def test_healthcheck_waits_for_health_not_port(monkeypatch):
+    monkeypatch.setattr(readiness, 'HEALTH_POLL_INTERVAL', 0.01)
+
+    async def main():
+        server = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            container = FakeContainer(port, healthy_after=0.2)
+            latency = await ReadinessTracker().wait_ready(container, time.monotonic(), timeout=5)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return latency
+
+    assert asyncio.run(main()) >= 0.2
@@ -0,0 +1,81 @@
+import msgpack
+import numpy as np
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from serialization import encode_frame, parse_fields, project, project_all
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields(' , ') is None
+    assert parse_fields('name, status,stats.cpu_percent') == ['name', 'status', 'stats.cpu_percent']
+
+
+def test_project_keeps_requested_keys_and_nested_ones():
+    item = {"name": "app", "status": "running", "stats": {"cpu_percent": 1.5, "memory_mb": 20.0}, "labels": {}}
+    assert project(item, ['name', 'stats.cpu_percent', 'missing', 'stats.nope']) == {
+        "name": "app", "stats": {"cpu_percent": 1.5}
+    }
+    # A dotted field on a non-dict value keeps the whole value
+    assert project(item, ['status.x']) == {"status": "running"}
+    assert project_all([item], None) == [item]
+
+
+def test_frames_round_trip_in_both_formats():
+    message = {"type": "container_stats", "data": [{"name": "app", "stats": {"cpu_percent": np.float64(2.5)}}]}
+    text = encode_frame(message)
+    assert isinstance(text, str) and orjson.loads(text)['data'][0]['stats']['cpu_percent'] == 2.5
+    binary = encode_frame({"type": "system_metrics", "data": {"cpu_percent": 2.5, "name": "host"}}, 'msgpack')
+    assert isinstance(binary, bytes)
+    assert msgpack.unpackb(binary) == {"type": "system_metrics", "data": {"cpu_percent": 2.5, "name": "host"}}
+
+
+@pytest.fixture
+def ws_client(server, fake_docker, monkeypatch):
+    monkeypatch.setattr(server, 'docker_client', server.host_registry.get(server.LOCAL_HOST).client)
+    monkeypatch.setattr(server, 'DOCKER_AVAILABLE', True)
+    monkeypatch.setattr(server, 'WS_TICK_INTERVAL', 0.05)
+    return TestClient(server.app)
+
+
+def receive(ws, fmt):
+    return msgpack.unpackb(ws.receive_bytes()) if fmt == 'msgpack' else orjson.loads(ws.receive_text())
+
+
+def next_stats(ws, fmt):
+    while True:
+        message = receive(ws, fmt)
+        if message['type'] == 'container_stats':
+            return message['data']
+
+
+@pytest.mark.parametrize('fake_docker', [3], indirect=True)
+def test_msgpack_frames_with_a_projection(ws_client):
+    with ws_client.websocket_connect("/ws?format=msgpack&fields=name,stats.cpu_percent") as ws:
+        assert receive(ws, 'msgpack')['type'] == 'system_metrics'
+        rows = next_stats(ws, 'msgpack')
+    assert sorted(r['name'] for r in rows) == ['bench-0', 'bench-1', 'bench-2']
+    assert all(set(r) == {'name', 'stats'} and set(r['stats']) == {'cpu_percent'} for r in rows)
+
+
+@pytest.mark.parametrize('fake_docker', [2], indirect=True)
+def test_msgpack_subprotocol_and_subscribe(ws_client):
+    with ws_client.websocket_connect("/ws", subprotocols=['msgpack']) as ws:
+        assert ws.accepted_subprotocol == 'msgpack'
+        assert 'image' in next_stats(ws, 'msgpack')[0]
+        # Control messages stay JSON text; the projection applies from the next tick
+        ws.send_text('{"type": "subscribe", "fields": "name,status"}')
+        for _ in range(5):
+            rows = next_stats(ws, 'msgpack')
+            if set(rows[0]) == {'name', 'status'}:
+                break
+        assert all(set(r) == {'name', 'status'} for r in rows)
+
+
+@pytest.mark.parametrize('fake_docker', [2], indirect=True)
+def test_json_frames_by_default(ws_client):
+    with ws_client.websocket_connect("/ws?fields=name") as ws:
+        assert ws.accepted_subprotocol is None
+        assert next_stats(ws, 'json') == [{"name": "bench-0"}, {"name": "bench-1"}]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from sleep_strategy import SleepManager
+
+
+class FakeResponse:
+    def __init__(self, status_code, message=''):
+        self.status_code = status_code
+        self.text = message
+
+    def json(self):
+        return {"message": self.text}
+
+
+class FakeAPI:
+    base_url = 'http+docker://localhost'
+    api_version = '1.43'
+
+    def __init__(self, checkpoint_response):
+        self.checkpoint_response = checkpoint_response
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        if method == 'POST' and url.endswith('/checkpoints'):
+            return self.checkpoint_response
+        return FakeResponse(404, 'no such checkpoint')
+
+
+class FakeContainer:
+    id = 'abc'
+    name = 'app'
+    labels = {'dockerwakeup.sleep_strategy': 'checkpoint'}
+    status = 'running'
+
+    def __init__(self):
+        self.stopped = False
+
+    def stats(self, **kwargs):
+        return {}
+
+    def stop(self):
+        self.stopped = True
+
+
+def _sleep(response):
+    container = FakeContainer()
+    api = FakeAPI(response)
+    client = SimpleNamespace(api=api, containers=SimpleNamespace(get=lambda name: container))
+    manager = SleepManager(lambda: client)
+    used = manager.sleep('app')
+    return manager, container, api, used
+
+
+def test_checkpoint_success_uses_public_session_api():
+    manager, container, api, used = _sleep(FakeResponse(201))
+    assert used == 'checkpoint' and not container.stopped
+    assert manager.checkpoint_supported is True
+    assert ('POST', 'http+docker://localhost/v1.43/containers/abc/checkpoints') in api.calls
+
+
+@pytest.mark.parametrize("message", [
+    "checkpoint is only supported in experimental mode",
+    "Checkpoint/Restore is not supported on this platform",
+])
+def test_unsupported_daemon_disables_checkpointing(message):
+    manager, container, _, used = _sleep(FakeResponse(400, message))
+    assert used == 'stop' and container.stopped
+    assert manager.checkpoint_supported is False
+
+
+def test_transient_checkpoint_failure_keeps_checkpointing_enabled():
+    manager, container, _, used = _sleep(FakeResponse(500, "criu failed: type NOTIFY errno 0"))
+    assert used == 'stop' and container.stopped
+    assert manager.checkpoint_supported is None
@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+from stats_frame import MB, RATE_FIELDS, StatsFrame, StatsPipeline, raw_counters
+
+
+def docker_stats(rx=0, tx=0, blkio=None, cpu=(0, 0), system=(0, 0), online_cpus=1, memory=0, limit=1):
+    return {
+        "cpu_stats": {"cpu_usage": {"total_usage": cpu[0]}, "system_cpu_usage": system[0], "online_cpus": online_cpus},
+        "precpu_stats": {"cpu_usage": {"total_usage": cpu[1]}, "system_cpu_usage": system[1]},
+        "memory_stats": {"usage": memory, "limit": limit},
+        "networks": {"eth0": {"rx_bytes": rx, "tx_bytes": tx}},
+        "blkio_stats": {"io_service_bytes_recursive": blkio or []}
+    }
+
+
+def io(rx, tx, read, write):
+    return raw_counters(docker_stats(rx, tx, [{"op": "read", "value": read}, {"op": "write", "value": write}]))
+
+
+def rates(frame):
+    return [{k: v for k, v in row.items() if k.endswith('_per_sec')} for row in frame.rows()]
+
+
+def test_blkio_ops_from_cgroup_v1_and_v2():
+    v1 = [{"major": 8, "op": "Read", "value": 100}, {"major": 8, "op": "Write", "value": 200},
+          {"major": 8, "op": "Read", "value": 50}, {"major": 8, "op": "Total", "value": 350}]
+    v2 = [{"major": 8, "op": "read", "value": 150}, {"major": 8, "op": "write", "value": 200}]
+    assert raw_counters(docker_stats(blkio=v1))[9:] == raw_counters(docker_stats(blkio=v2))[9:] == (150, 200)
+    # Several interfaces add up; containers without networks or blkio report zeros
+    stats = docker_stats()
+    stats['networks'] = {"eth0": {"rx_bytes": 10, "tx_bytes": 1}, "eth1": {"rx_bytes": 5, "tx_bytes": 2}}
+    assert raw_counters(stats)[7:9] == (15, 3)
+    assert raw_counters({**docker_stats(), "networks": None, "blkio_stats": None})[7:] == (0, 0, 0, 0)
+
+
+def test_rates_are_deltas_over_elapsed_time():
+    pipeline = StatsPipeline()
+    first = pipeline.compute(['a'], ['app'], [io(1000, 2000, 4096, 8192)], now=10.0)
+    assert rates(first) == [dict.fromkeys(rates(first)[0], 0.0)]  # nothing to compare against yet
+
+    second = pipeline.compute(['a'], ['app'], [io(3000, 2500, 4096, 16384)], now=12.0)
+    assert rates(second) == [{"net_rx_bytes_per_sec": 1000.0, "net_tx_bytes_per_sec": 250.0,
+                              "block_read_bytes_per_sec": 0.0, "block_write_bytes_per_sec": 4096.0}]
+
+
+def test_counter_reset_reports_zero_then_resumes():
+    pipeline = StatsPipeline()
+    pipeline.compute(['a'], ['app'], [io(10_000, 10_000, 10_000, 10_000)], now=0.0)
+    # The container restarted and its counters began again from zero
+    reset = pipeline.compute(['a'], ['app'], [io(100, 200, 300, 400)], now=1.0)
+    assert set(rates(reset)[0].values()) == {0.0}
+    resumed = pipeline.compute(['a'], ['app'], [io(600, 200, 300, 1400)], now=2.0)
+    assert rates(resumed)[0]['net_rx_bytes_per_sec'] == 500.0
+    assert rates(resumed)[0]['block_write_bytes_per_sec'] == 1000.0
+
+
+def test_unreadable_stats_keep_the_previous_counters():
+    pipeline = StatsPipeline()
+    pipeline.compute(['a', 'b'], ['app', 'db'], [io(0, 0, 0, 0), io(0, 0, 0, 0)], now=0.0)
+    missing = pipeline.compute(['a', 'b'], ['app', 'db'], [None, io(100, 0, 0, 0)], now=1.0)
+    assert rates(missing)[0]['net_rx_bytes_per_sec'] == 0.0
+    assert rates(missing)[1]['net_rx_bytes_per_sec'] == 100.0
+    # a's rate spans both intervals, measured from its last good reading
+    later = pipeline.compute(['a'], ['app'], [io(400, 0, 0, 0)], now=2.0)
+    assert rates(later)[0]['net_rx_bytes_per_sec'] == pytest.approx(200.0)
+
+
+def scalar_stats(stats, previous, elapsed):
+    """The per-container computation the vectorized pipeline replaced"""
+    cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats']['cpu_usage']['total_usage']
+    system_delta = stats['cpu_stats']['system_cpu_usage'] - stats['precpu_stats']['system_cpu_usage']
+    cpu_percent = cpu_delta / system_delta * stats['cpu_stats']['online_cpus'] * 100 if system_delta > 0 else 0
+    mem_usage = stats['memory_stats']['usage'] / (1024 * 1024)
+    mem_limit = stats['memory_stats']['limit'] / (1024 * 1024)
+    counters = raw_counters(stats)[7:]
+    if previous is None:
+        io_rates = [0.0] * 4
+    else:
+        io_rates = [round(max(c - p, 0) / elapsed, 1) for c, p in zip(counters, previous)]
+    return {
+        "cpu_percent": round(cpu_percent, 2),
+        "memory_mb": round(mem_usage, 2),
+        "memory_limit_mb": round(mem_limit, 2),
+        "memory_percent": round(mem_usage / mem_limit * 100 if mem_limit > 0 else 0, 2),
+        **dict(zip(RATE_FIELDS, io_rates))
+    }, counters
+
+
+def test_vectorized_pass_matches_the_scalar_path():
+    rng = random.Random(39)
+    pipeline = StatsPipeline()
+    keys = [f"c{i}" for i in range(200)]
+    totals = {k: [rng.randrange(10 ** 9) for _ in range(4)] for k in keys}
+    previous = {}
+    for tick in range(3):
+        samples = []
+        for k in keys:
+            # Some counters go backwards (restarts), some CPU windows are empty
+            totals[k] = [t + rng.randrange(-10 ** 6, 10 ** 7) for t in totals[k]]
+            cpu = rng.randrange(10 ** 9)
+            system = rng.choice([0, rng.randrange(1, 10 ** 10)])
+            samples.append(docker_stats(
+                rx=totals[k][0], tx=totals[k][1],
+                blkio=[{"op": "Read", "value": totals[k][2]}, {"op": "Write", "value": totals[k][3]}],
+                cpu=(cpu + rng.randrange(10 ** 8), cpu), system=(system * 2, system), online_cpus=rng.randint(1, 16),
+                memory=rng.randrange(4 * 1024 ** 3), limit=rng.choice([8 * 1024 ** 3, 0])
+            ))
+        frame = pipeline.compute(keys, keys, [raw_counters(s) for s in samples], now=tick * 2.5)
+
+        expected = []
+        for k, stats in zip(keys, samples):
+            row, previous[k] = scalar_stats(stats, previous.get(k), 2.5)
+            expected.append(row)
+        assert frame.rows() == pytest.approx(expected, abs=0.011)
+        assert pipeline.latest(keys, 'cpu_percent').round(2).tolist() == pytest.approx(
+            [row['cpu_percent'] for row in expected], abs=0.011)
+
+
+def test_over_thresholds_and_rebuilt_frames():
+    rows = [
+        {"name": "quiet", "stats": {"cpu_percent": 5.0, "net_rx_bytes_per_sec": 0.0}},
+        {"name": "busy", "stats": {"cpu_percent": 95.5, "net_rx_bytes_per_sec": 3 * MB, "block_write_bytes_per_sec": 6 * MB}},
+    ]
+    frame = StatsFrame.from_rows(rows)
+    assert frame.over_thresholds(cpu_percent=80, net_mb_per_sec=2, disk_mb_per_sec=5) == {
+        "container_cpu": [(1, 95.5)], "container_network_io": [(1, 3.0)], "container_disk_io": [(1, 6.0)]
+    }
+    # A threshold of 0 turns its check off
+    assert frame.over_thresholds() == {"container_cpu": [], "container_network_io": [], "container_disk_io": []}
+
+
+def test_containers_not_seen_for_max_age_are_dropped():
+    pipeline = StatsPipeline(max_age=10)
+    pipeline.compute(['old', 'kept'], ['old', 'kept'], [io(0, 0, 0, 0), io(0, 0, 0, 0)], now=0.0)
+    pipeline.compute(['kept'], ['kept'], [io(100, 0, 0, 0)], now=5.0)
+    frame = pipeline.compute(['kept'], ['kept'], [io(200, 0, 0, 0)], now=15.0)
+    assert list(pipeline._index) == ['kept']
+    assert rates(frame)[0]['net_rx_bytes_per_sec'] == 10.0
+    # Seen again after eviction: a fresh start, no rate against the forgotten counters
+    back = pipeline.compute(['old'], ['old'], [io(500, 0, 0, 0)], now=16.0)
+    assert rates(back)[0]['net_rx_bytes_per_sec'] == 0.0
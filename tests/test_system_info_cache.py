@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from docker_async import DockerExecutor
+from docker_hosts import DockerHostRegistry
+from system_info_cache import SystemInfoCache
+
+
+class FakeClient:
+    def __init__(self, name, hang=False):
+        self.name = name
+        self.hang = hang
+        self.release = threading.Event()
+        self.calls = {"info": 0, "version": 0, "df": 0}
+
+    def _answer(self, kind):
+        self.calls[kind] += 1
+        if self.hang:
+            self.release.wait(5)
+        return {"Name": self.name, "call": self.calls[kind]}
+
+    def info(self):
+        return self._answer("info")
+
+    def version(self):
+        return self._answer("version")
+
+    def df(self):
+        return self._answer("df")
+
+    def close(self):
+        self.release.set()
+
+
+@pytest.fixture
+def setup():
+    registry = DockerHostRegistry(timeout=1, max_workers=4)
+    executor = DockerExecutor(max_workers=1)
+    local = FakeClient('local')
+    registry.add('local', None, client=local)
+    yield registry, executor, local
+    registry.close()
+    executor.shutdown()
+
+
+def test_fresh_values_are_served_from_cache(setup):
+    registry, executor, local = setup
+    cache = SystemInfoCache(registry, executor, ttls={"info": 60})
+
+    async def main():
+        first = await cache.get('local', 'info')
+        second = await cache.get('local', 'info')
+        return first, second
+
+    (value, age), (again, again_age) = asyncio.run(main())
+    assert value == again == {"Name": "local", "call": 1}
+    assert age == 0.0 and again_age >= 0.0
+    assert local.calls['info'] == 1
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+
+
+def test_stale_value_is_served_while_it_refreshes(setup):
+    registry, executor, local = setup
+    cache = SystemInfoCache(registry, executor, ttls={"info": 0.05})
+
+    async def main():
+        await cache.get('local', 'info')
+        await asyncio.sleep(0.1)
+        stale, age = await cache.get('local', 'info')
+        # The refresh runs in the background; the next read gets the new value
+        await asyncio.gather(*cache._inflight.values())
+        fresh, _ = await cache.get('local', 'info')
+        return stale, age, fresh
+
+    stale, age, fresh = asyncio.run(main())
+    assert stale['call'] == 1 and age >= 0.05
+    assert fresh['call'] == 2
+    assert cache.stats['stale_hits'] == 1
+
+
+def test_concurrent_misses_share_one_fetch(setup):
+    registry, executor, local = setup
+    cache = SystemInfoCache(registry, executor)
+
+    async def main():
+        return await asyncio.gather(*(cache.get('local', 'df') for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert {r[0]['call'] for r in results} == {1}
+    assert local.calls['df'] == 1
+    assert cache.stats['coalesced'] == 4
+
+
+def test_refresh_due_backs_off_after_errors(setup):
+    registry, executor, local = setup
+    cache = SystemInfoCache(registry, executor, ttls={"info": 30})
+
+    async def main():
+        await cache.get('local', 'info')
+        cache._entries[('local', 'info')]['fetched_at'] -= 60
+        cache._errors[('local', 'info')] = ("boom", time.monotonic())
+        cache.refresh_due()
+        backed_off = dict(cache._inflight)
+        cache._errors[('local', 'info')] = ("boom", time.monotonic() - 60)
+        cache.refresh_due()
+        retried = dict(cache._inflight)
+        await asyncio.gather(*retried.values())
+        return backed_off, retried
+
+    backed_off, retried = asyncio.run(main())
+    assert backed_off == {}
+    assert list(retried) == [('local', 'info')]
+    assert local.calls['info'] == 2
+
+
+def test_hanging_remote_host_leaves_docker_io_free(setup):
+    registry, executor, local = setup
+    nas = FakeClient('nas', hang=True)
+    registry.add('nas', 'tcp://10.255.255.1:2375', client=nas)
+    cache = SystemInfoCache(registry, executor, remote_timeouts={"info": 0.05, "version": 0.05, "df": 0.05})
+
+    async def main():
+        cache.prefetch('nas')
+        # The single docker-io worker still answers local reads while nas hangs
+        value, _ = await asyncio.wait_for(cache.get('local', 'info'), timeout=1)
+        outcomes = await asyncio.gather(*(cache.get('nas', kind) for kind in ('info', 'version', 'df')),
+                                        return_exceptions=True)
+        calls = sum(nas.calls.values())
+        retry = await asyncio.gather(cache.get('nas', 'info', force=True), return_exceptions=True)
+        return value, outcomes, calls, retry
+
+    try:
+        value, outcomes, calls, retry = asyncio.run(main())
+        assert value['Name'] == 'local'
+        assert all(isinstance(o, asyncio.TimeoutError) for o in outcomes)
+        assert executor.in_flight == 0
+        # Timed-out calls stay stuck on the fan-out pool; further reads fail fast instead of taking workers
+        assert registry.get('nas').stuck == calls
+        assert isinstance(retry[0], ConnectionError)
+        assert sum(nas.calls.values()) == calls
+    finally:
+        nas.release.set()
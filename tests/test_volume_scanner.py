@@ -0,0 +1,119 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import volume_scanner
+from volume_scanner import VolumeSizeScanner
+
+
+class FakeVolumesClient:
+    def __init__(self, mountpoints):
+        self.mountpoints = mountpoints
+        self.api = SimpleNamespace(volumes=self.volumes)
+
+    def volumes(self):
+        return {"Volumes": [{"Name": name, "Driver": "local", "Mountpoint": path}
+                            for name, path in self.mountpoints.items()]}
+
+
+def make_volume(tmp_path, name, files):
+    path = tmp_path / name / '_data'
+    path.mkdir(parents=True)
+    for file_name, size in files.items():
+        (path / file_name).write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_full_pass_waits_for_docker_to_connect(tmp_path):
+    client = None
+    scanner = VolumeSizeScanner(lambda: client, interval=300, max_ops_per_sec=0)
+    mountpoint = make_volume(tmp_path, 'data', {'a': 100})
+
+    async def main():
+        nonlocal client
+        scanner.start()
+        await asyncio.sleep(0.05)  # the first pass finds no client
+        assert scanner.sizes == {}
+        client = FakeVolumesClient({'data': mountpoint})
+        scanner.request_full_pass()
+        for _ in range(50):
+            if scanner.sizes:
+                break
+            await asyncio.sleep(0.01)
+        await scanner.stop()
+
+    asyncio.run(main())
+    assert scanner.get('data')['size_bytes'] == 100
+
+
+def test_throttle_holds_the_op_rate(monkeypatch):
+    clock = {"now": 0.0, "slept": 0.0}
+
+    def sleep(seconds):
+        clock['now'] += seconds
+        clock['slept'] += seconds
+    monkeypatch.setattr(volume_scanner.time, 'monotonic', lambda: clock['now'])
+    monkeypatch.setattr(volume_scanner.time, 'sleep', sleep)
+    scanner = VolumeSizeScanner(lambda: None, max_ops_per_sec=100)
+    for _ in range(1000):
+        scanner._throttle()
+    assert clock['slept'] == pytest.approx(10.0)
+    # Time already spent elsewhere counts towards the budget
+    clock['slept'] = 0.0
+    for _ in range(1000):
+        clock['now'] += 0.02
+        scanner._throttle()
+    assert clock['slept'] == 0.0
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path):
+    scanner = VolumeSizeScanner(lambda: None, max_ops_per_sec=0)
+    root = make_volume(tmp_path, 'data', {'a': 100})
+    os.makedirs(os.path.join(root, 'sub'))
+    with open(os.path.join(root, 'sub', 'b'), 'wb') as f:
+        f.write(b'x' * 50)
+    size, cache, listed, skipped = scanner.scan_tree(root, {})
+    assert (size, listed, skipped) == (150, 2, 0)
+    # A file growing in place doesn't move its directory's mtime; only a full scan sees it
+    with open(os.path.join(root, 'a'), 'ab') as f:
+        f.write(b'x' * 10)
+    assert scanner.scan_tree(root, cache)[0::2] == (150, 0)
+    assert scanner.scan_tree(root, cache, full=True)[0::2] == (160, 2)
+
+
+def test_volume_events_trigger_targeted_rescans(tmp_path):
+    mountpoints = {'data': make_volume(tmp_path, 'data', {'a': 100})}
+    scanner = VolumeSizeScanner(lambda: FakeVolumesClient(mountpoints), interval=300, max_ops_per_sec=0)
+    changes = []
+    scanner.listeners.append(lambda: changes.append(dict(scanner.sizes)))
+
+    async def wait_for(condition):
+        for _ in range(100):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("scanner didn't get there")
+
+    async def main():
+        scanner.start()
+        await wait_for(lambda: 'data' in scanner.sizes)
+        mountpoints['new'] = make_volume(tmp_path, 'new', {'b': 20})
+        with open(os.path.join(mountpoints['data'], 'c'), 'wb') as f:
+            f.write(b'x' * 5)
+        scanner.handle_event({'Type': 'volume', 'Action': 'create', 'Actor': {'ID': 'new'}})
+        await wait_for(lambda: 'new' in scanner.sizes)
+        # Only the volume the event named was scanned; 'data' waits for the next pass
+        assert scanner.stats['scans'] == 2
+        assert scanner.get('data')['size_bytes'] == 100
+
+        scanner.handle_event({'Type': 'volume', 'Action': 'unmount', 'Actor': {'ID': 'data'}})
+        await wait_for(lambda: scanner.get('data')['size_bytes'] == 105)
+
+        scanner.handle_event({'Type': 'volume', 'Action': 'destroy', 'Actor': {'ID': 'new'}})
+        await scanner.stop()
+
+    asyncio.run(main())
+    assert sorted(scanner.sizes) == ['data']
+    assert [sorted(c) for c in changes] == [['data'], ['data', 'new'], ['data', 'new'], ['data']]
@@ -0,0 +1,184 @@
+import asyncio
+from types import SimpleNamespace
+
+from readiness import ReadinessTracker
+from wake_proxy import ROUTE_HEADER, RequestHead, WakeProxy, parse_route, request_host
+
+
+class FakeUpstream:
+    """HTTP/1.1 server that echoes what it received and honours keep-alive"""
+
+    def __init__(self):
+        self.requests = []
+        self.server = None
+
+    async def start(self, port=0):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    raw = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                head = raw.decode('latin-1')
+                length = 0
+                for line in head.split('\r\n'):
+                    if line.lower().startswith('content-length:'):
+                        length = int(line.split(':', 1)[1])
+                body = await reader.readexactly(length) if length else b''
+                self.requests.append((head, body))
+                payload = head.split('\r\n', 1)[0].encode() + b'|' + body
+                writer.write(b"HTTP/1.1 200 OK\r\nConnection: keep-alive\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+                if 'connection: close' in head.lower():
+                    break
+        finally:
+            writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class FakeContainer:
+    def __init__(self, name):
+        self.id = name
+        self.name = name
+        self.status = 'running'
+        self.labels = {}
+        self.attrs = {}
+
+    def reload(self):
+        pass
+
+
+class FakeDocker:
+    def __init__(self, routes):
+        self.routes = routes  # container name -> labels
+        self.containers = self
+
+    def list(self, all=False, filters=None):
+        return [SimpleNamespace(name=name, labels=labels) for name, labels in self.routes.items()]
+
+    def get(self, name):
+        return FakeContainer(name)
+
+
+async def _request(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout=5)
+    writer.close()
+    return response
+
+
+def _with_proxy(routes, test, **kwargs):
+    async def main():
+        upstream = FakeUpstream()
+        upstream_port = await upstream.start()
+        labels = {name: {'dockerwakeup.route': route, 'dockerwakeup.docker_url': f"127.0.0.1:{upstream_port}"}
+                  for name, route in routes.items()}
+        docker = FakeDocker(labels)
+        proxy = WakeProxy(lambda: docker, ReadinessTracker(), **kwargs)
+        await proxy.start(host='127.0.0.1', port=0)
+        try:
+            await test(proxy, upstream)
+        finally:
+            await proxy.stop()
+            await upstream.stop()
+    asyncio.run(main())
+
+
+def test_forwards_one_request_and_closes_client():
+    async def test(proxy, upstream):
+        response = await _request(proxy.port, (
+            b"POST /app/submit HTTP/1.1\r\nHost: example.test\r\nContent-Length: 5\r\n\r\nhello"
+            b"GET /app/second HTTP/1.1\r\nHost: example.test\r\n\r\n"
+        ))
+        head, _, body = response.partition(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 200 OK')
+        assert b'Connection: close' in head and b'keep-alive' not in head
+        assert body == b'POST /submit HTTP/1.1|hello'
+        # The pipelined second request was neither forwarded nor glued onto the first body
+        assert len(upstream.requests) == 1
+        assert upstream.requests[0][1] == b'hello'
+    _with_proxy({'app': '/app'}, test)
+
+
+def test_route_header_only_from_trusted_peers():
+    raw = f"GET /other HTTP/1.1\r\nHost: example.test\r\n{ROUTE_HEADER}: /app\r\n\r\n".encode()
+
+    async def untrusted(proxy, upstream):
+        response = await _request(proxy.port, raw)
+        assert response.startswith(b'HTTP/1.1 404')
+        assert upstream.requests == []
+    _with_proxy({'app': '/app'}, untrusted, trusted_proxies=[])
+
+    async def trusted(proxy, upstream):
+        response = await _request(proxy.port, raw)
+        assert response.startswith(b'HTTP/1.1 200')
+        # Consumed by the proxy, never passed on to the container
+        assert ROUTE_HEADER.lower() not in upstream.requests[0][0].lower()
+    _with_proxy({'app': '/app'}, trusted)
+
+
+def test_domain_route_with_port():
+    async def test(proxy, upstream):
+        response = await _request(proxy.port, b"GET /x HTTP/1.1\r\nHost: App.Example.com:8080\r\n\r\n")
+        assert response.endswith(b'GET /x HTTP/1.1|')
+    _with_proxy({'app': 'app.example.com'}, test)
+
+
+def test_running_container_still_booting_is_waited_for():
+    async def main():
+        # Reserve a port for the upstream that only starts listening later
+        probe = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+        upstream_port = probe.sockets[0].getsockname()[1]
+        probe.close()
+        await probe.wait_closed()
+
+        docker = FakeDocker({'app': {'dockerwakeup.route': '/app', 'dockerwakeup.docker_url': f"127.0.0.1:{upstream_port}"}})
+        tracker = ReadinessTracker()
+        proxy = WakeProxy(lambda: docker, tracker, ready_timeout=5)
+        await proxy.start(host='127.0.0.1', port=0)
+        upstream = FakeUpstream()
+        try:
+            # Another path (pre-warm, the API) just started the container and is waiting for it
+            started = asyncio.ensure_future(tracker.wait_ready(docker.get('app'), address=('127.0.0.1', upstream_port)))
+            request = asyncio.ensure_future(_request(proxy.port, b"GET /app/x HTTP/1.1\r\nHost: example.test\r\n\r\n"))
+            await asyncio.sleep(0.2)
+            assert not request.done()
+            await upstream.start(upstream_port)
+            response = await request
+            await started
+            assert response.startswith(b'HTTP/1.1 200')
+            assert tracker.is_ready('app')
+
+            # Once it stops it has to prove itself again
+            tracker.handle_event({'Type': 'container', 'Action': 'die', 'Actor': {'Attributes': {'name': 'app'}}})
+            assert not tracker.is_ready('app')
+        finally:
+            await proxy.stop()
+            if upstream.server:
+                await upstream.stop()
+    asyncio.run(main())
+
+
+def test_request_host():
+    def host(value):
+        return request_host(RequestHead('GET', '/', 'HTTP/1.1', [('Host', value)]))
+    assert host('Example.com:8080') == 'example.com'
+    assert host('example.com') == 'example.com'
+    assert host('[::1]:8080') == '::1'
+    assert host('[2001:db8::1]') == '2001:db8::1'
+
+
+def test_parse_route():
+    assert parse_route('media.example.com', 'jellyfin').host == 'media.example.com'
+    assert parse_route('/jellyfin/', 'jellyfin').prefix == '/jellyfin'
+    assert parse_route('/', 'root').prefix == ''